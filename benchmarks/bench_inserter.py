@@ -0,0 +1,57 @@
+"""Micro-benchmark: one-pass splice vs. one-insert-per-block on large documents.
+
+    python benchmarks/bench_inserter.py [--lines 10000] [--blocks 300] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from blog_image_agent.markdown_utils import insert_block_after_line, insert_blocks_after_lines  # noqa: E402
+
+
+def _document(num_lines: int, rng: random.Random) -> str:
+    lines = []
+    for i in range(num_lines):
+        if i % 40 == 0:
+            lines.append(f"## Section {i // 40}")
+        elif i % 7 == 0:
+            lines.append("")
+        else:
+            lines.append(" ".join(rng.choice(["alpha", "beta", "gamma", "delta", "omega"]) for _ in range(12)))
+    return "\n".join(lines) + "\n"
+
+
+def _one_at_a_time(text: str, blocks: list[tuple[int, str]]) -> str:
+    for line, block in sorted(blocks, key=lambda b: b[0], reverse=True):
+        text = insert_block_after_line(text, line, block)
+    return text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=10_000)
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    text = _document(args.lines, rng)
+    blocks = [(rng.randrange(args.lines), f"![img {i}](assets/img-{i}.png) <!-- ai-image anchor:a{i} -->") for i in range(args.blocks)]
+
+    assert insert_blocks_after_lines(text, blocks) == _one_at_a_time(text, blocks)
+
+    legacy = min(timeit.repeat(lambda: _one_at_a_time(text, blocks), number=1, repeat=args.repeat))
+    single = min(timeit.repeat(lambda: insert_blocks_after_lines(text, blocks), number=1, repeat=args.repeat))
+    print(f"{args.lines} lines, {args.blocks} blocks")
+    print(f"  one-at-a-time: {legacy * 1000:8.2f} ms")
+    print(f"  single pass:   {single * 1000:8.2f} ms  ({legacy / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Per-stage and end-to-end pipeline benchmarks over a synthetic corpus, saved as JSON.
+
+    python benchmarks/bench_pipeline.py [--sizes small,medium,large,xlarge] [--repeat 5]
+        [--latency 0.2] [--skip-e2e] [--output results.json] [--compare baseline.json]
+
+Stages: extract_anchors, _heuristic_plan, plan_insertions, _generate_placeholder and
+encode_image (webp and png, which replaced the old _to_webp helper). End to end: process_blog
+in DRY_RUN and against a local FakeOpenAIServer with ``--latency`` seconds per request.
+Results go to ``benchmarks/results/<commit>.json`` by default; ``--compare`` prints the
+ratio to an earlier file and exits non-zero if any benchmark regressed past ``--threshold``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# FakeOpenAIServer is a test helper (tests/fake_openai.py), not part of the package.
+sys.path.insert(1, str(ROOT / "tests"))
+
+from corpus import SIZES, generate_post  # noqa: E402
+
+from blog_image_agent.config import AgentConfig  # noqa: E402
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator, SourceImage, encode_image  # noqa: E402
+from blog_image_agent.markdown_utils import extract_anchors  # noqa: E402
+from blog_image_agent.pipeline import process_blog  # noqa: E402
+from blog_image_agent.planner import _heuristic_plan  # noqa: E402
+from blog_image_agent.inserter import plan_insertions  # noqa: E402
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    # Sub-millisecond stages are looped so each sample spans at least ~10ms of work.
+    start = time.perf_counter()
+    fn()
+    number = max(1, int(0.01 / max(time.perf_counter() - start, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {"best_ms": min(samples), "median_ms": statistics.median(samples), "repeat": repeat, "number": number}
+
+
+@contextmanager
+def _env(**values: Optional[str]) -> Iterator[None]:
+    saved = {k: os.environ.get(k) for k in values}
+    for k, v in values.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_stages(sizes: Dict[str, int], repeat: int, max_images: int, tmp: Path) -> List[dict]:
+    results = []
+    for name, num_lines in sizes.items():
+        text = generate_post(num_lines)
+        anchors = extract_anchors(text)
+        # Insert after every 10th anchor so insertion cost grows with the post.
+        placements = [(a.anchor_id, f"assets/img-{i}.png", None) for i, a in enumerate(anchors[::10])]
+        stages = {
+            "extract_anchors": lambda: extract_anchors(text),
+            "_heuristic_plan": lambda: _heuristic_plan(anchors, "Synthetic", max_images),
+            "plan_insertions": lambda: plan_insertions(text, anchors, placements),
+        }
+        for stage, fn in stages.items():
+            results.append({"benchmark": stage, "size": name, "lines": num_lines, "anchors": len(anchors), **_timeit(fn, repeat)})
+
+    cfg = AgentConfig()
+    with _env(DRY_RUN="1"):
+        gen = ImageGenerator(
+            ImageGenConfig(cfg.image_model, cfg.default_width, cfg.default_height, cfg.compress_webp, cfg.webp_quality),
+            assets_dir=str(tmp / "stage-assets"),
+        )
+    width, height = cfg.default_width, cfg.default_height
+    image = gen._generate_placeholder("A benchmark prompt " * 10, width, height)
+    image_stages = {
+        "_generate_placeholder": lambda: gen._generate_placeholder("A benchmark prompt " * 10, width, height),
+        "encode_image[webp]": lambda: encode_image(SourceImage(image=image), "webp", cfg.encode_preset, cfg.webp_quality),
+        "encode_image[png]": lambda: encode_image(SourceImage(image=image), "png", cfg.encode_preset, cfg.webp_quality),
+    }
+    for stage, fn in image_stages.items():
+        results.append({"benchmark": stage, "size": f"{width}x{height}", **_timeit(fn, repeat)})
+    return results
+
+
+def bench_end_to_end(sizes: Dict[str, int], repeat: int, max_images: int, latency: float, tmp: Path) -> List[dict]:
+    from fake_openai import FakeOpenAIServer
+
+    # Caches off and rate limits lifted so every run does the full amount of work.
+    cfg = AgentConfig(image_cache=False, plan_cache=False, incremental=False, requests_per_minute=0, images_per_minute=0)
+    results = []
+    for name, num_lines in sizes.items():
+        post = tmp / f"{name}.md"
+        post.write_text(generate_post(num_lines), encoding="utf-8")
+
+        with _env(DRY_RUN="1"):
+            timing = _timeit(lambda: process_blog(str(post), str(tmp / "dry-assets"), cfg, max_images), repeat)
+        results.append({"benchmark": "process_blog[dry_run]", "size": name, "lines": num_lines, "max_images": max_images, **timing})
+
+        with FakeOpenAIServer(latency=latency) as server, _env(DRY_RUN=None, OPENAI_BASE_URL=server.base_url, OPENAI_API_KEY="bench"):
+            from blog_image_agent.backends import clear_backends
+
+            # A fresh backend and assets dir per server give a generator bound to this server's client.
+            clear_backends()
+            assets = tmp / f"fake-assets-{name}"
+            timing = _timeit(lambda: process_blog(str(post), str(assets), cfg, max_images), repeat)
+            clear_backends()
+            timing["api_requests"] = sum(server.requests.values())
+        results.append(
+            {
+                "benchmark": "process_blog[fake_openai]",
+                "size": name,
+                "lines": num_lines,
+                "max_images": max_images,
+                "latency_s": latency,
+                **timing,
+            }
+        )
+    return results
+
+
+def compare(current: List[dict], baseline_path: Path, threshold: float) -> bool:
+    baseline = {(r["benchmark"], r["size"]): r for r in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]}
+    regressed = False
+    print(f"\nvs {baseline_path}:")
+    for r in current:
+        old = baseline.get((r["benchmark"], r["size"]))
+        if not old or not old["best_ms"]:
+            continue
+        ratio = r["best_ms"] / old["best_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressed |= bool(flag)
+        print(f"  {r['benchmark']:<28} {r['size']:<10} {old['best_ms']:10.2f} -> {r['best_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+    return not regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma-separated names from: " + ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-images", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake OpenAI server latency per request, in seconds")
+    parser.add_argument("--skip-e2e", action="store_true", help="Only run the per-stage benchmarks")
+    parser.add_argument("--output", type=Path, default=None, help="Default: benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    sizes = {name: SIZES[name] for name in args.sizes.split(",")}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        results = bench_stages(sizes, args.repeat, args.max_images, tmp)
+        if not args.skip_e2e:
+            results += bench_end_to_end(sizes, args.repeat, args.max_images, args.latency, tmp)
+
+    for r in results:
+        print(f"{r['benchmark']:<28} {r['size']:<10} best {r['best_ms']:10.2f} ms  median {r['median_ms']:10.2f} ms")
+
+    commit = _commit()
+    output = args.output or ROOT / "benchmarks" / "results" / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"\nWrote {output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
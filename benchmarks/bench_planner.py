@@ -0,0 +1,63 @@
+"""Benchmark: planner throughput in posts/s for the local NumPy planner, the heuristic
+fallback and the LLM path (against LocalBackend with a simulated ``--latency`` per call).
+
+    python benchmarks/bench_planner.py [--posts 200] [--lines 400] [--max-images 5]
+        [--latency 0.8] [--llm-posts 5]
+
+The LLM path is sequential and latency-bound, so it runs over ``--llm-posts`` posts only.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from corpus import generate_post  # noqa: E402
+
+from blog_image_agent.backends import LocalBackend  # noqa: E402
+from blog_image_agent.markdown_utils import Anchor, extract_anchors  # noqa: E402
+from blog_image_agent.planner import _heuristic_plan, plan_placements  # noqa: E402
+
+
+def _run(label: str, posts: List[List[Anchor]], plan: Callable[[List[Anchor]], list]) -> None:
+    start = time.perf_counter()
+    placed = sum(len(plan(anchors)) for anchors in posts)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:>9}: {len(posts)} posts in {elapsed:.3f}s ({len(posts) / elapsed:,.1f} posts/s, "
+        f"{elapsed * 1000 / len(posts):.2f} ms/post), {placed} placements"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=400, help="Lines per synthetic post")
+    parser.add_argument("--max-images", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.8, help="Simulated seconds per LLM plan call")
+    parser.add_argument("--llm-posts", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.pop("DRY_RUN", None)
+    title = "Synthetic benchmark post"
+    posts = [extract_anchors(generate_post(args.lines, seed=i, title=title)) for i in range(args.posts)]
+    print(f"{args.posts} posts, {sum(map(len, posts)) / len(posts):.0f} anchors/post on average")
+
+    _run("local", posts, lambda anchors: plan_placements("m", anchors, title, args.max_images, mode="local"))
+    _run("heuristic", posts, lambda anchors: _heuristic_plan(anchors, title, args.max_images))
+    backend = LocalBackend(latency=args.latency, jitter=0.0)
+    _run(
+        "llm",
+        posts[: args.llm_posts],
+        lambda anchors: plan_placements("m", anchors, title, args.max_images, backend=backend),
+    )
+
+
+if __name__ == "__main__":
+    main()
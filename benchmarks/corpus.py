@@ -0,0 +1,67 @@
+"""Synthetic Markdown posts for benchmarks: headings, paragraphs, lists and fenced code blocks.
+
+    python benchmarks/corpus.py --out /tmp/corpus [--sizes small,medium,large,xlarge]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, List
+
+# Named post sizes, in lines.
+SIZES: Dict[str, int] = {"small": 200, "medium": 2_000, "large": 10_000, "xlarge": 50_000}
+
+_WORDS = (
+    "agent cache latency image prompt section reader pipeline markdown token budget render "
+    "layout request worker queue placement anchor design system context signal metric"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_post(num_lines: int, seed: int = 0, title: str = "Synthetic benchmark post") -> str:
+    """A deterministic post of about ``num_lines`` lines with a realistic mix of block types."""
+    rng = random.Random(seed)
+    lines: List[str] = [f"# {title}", ""]
+    section = 0
+    while len(lines) < num_lines:
+        roll = rng.random()
+        if roll < 0.08:
+            section += 1
+            level = 2 if rng.random() < 0.7 else 3
+            lines += [f"{'#' * level} Section {section}: {rng.choice(_WORDS)} {rng.choice(_WORDS)}", ""]
+        elif roll < 0.18:
+            body = [f"    value_{i} = compute({rng.choice(_WORDS)!r}, {rng.randint(0, 99)})" for i in range(rng.randint(3, 12))]
+            lines += ["```python", "def example():", *body, "    return value_0", "```", ""]
+        elif roll < 0.26:
+            lines += [f"- {_sentence(rng)}" for _ in range(rng.randint(2, 6))] + [""]
+        else:
+            lines += [" ".join(_sentence(rng) for _ in range(rng.randint(2, 5))) for _ in range(rng.randint(1, 4))] + [""]
+    return "\n".join(lines) + "\n"
+
+
+def write_corpus(out_dir: Path, sizes: Dict[str, int]) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, num_lines in sizes.items():
+        path = out_dir / f"{name}.md"
+        path.write_text(generate_post(num_lines, title=f"Synthetic {name} post"), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma-separated names from: " + ", ".join(SIZES))
+    args = parser.parse_args()
+    for path in write_corpus(args.out, {name: SIZES[name] for name in args.sizes.split(",")}):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Asset store maintenance: find images referenced by illustrated posts, hardlink byte-identical
+copies and delete files nothing references any more (``blog-image-agent gc``)."""
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .cache import atomic_write_bytes
+from .manifest import AssetManifest
+from .prompt_index import PromptIndex
+
+ASSET_SUFFIXES = frozenset({".png", ".webp", ".jpg", ".jpeg", ".avif"})
+# Files that live in an assets dir but are not images and must never be collected.
+_RESERVED_NAMES = frozenset({AssetManifest.FILE_NAME, PromptIndex.FILE_NAME})
+
+_MARKER = "<!-- ai-image anchor:"
+# The inserter writes ``![alt](<relpath>) <!-- ai-image ...`` with the path unescaped, so it may
+# contain spaces or ")": take everything from the last "](" up to the ") <!-- ai-image" marker.
+_MD_LINK_RE = re.compile(r"^.*\]\((.+)\)\s*<!-- ai-image anchor:")
+_SRC_RE = re.compile(r'\bsrc="([^"]+)"')
+_SRCSET_RE = re.compile(r'\bsrcset="([^"]+)"')
+# Every encoding and width variant of one generated image shares the "img-<key>" stem.
+_KEY_RE = re.compile(r"^(img-[0-9a-f]{16})")
+
+
+def asset_key(name: str) -> str:
+    m = _KEY_RE.match(name)
+    return m.group(1) if m else name
+
+
+def references_in(markdown: str) -> List[str]:
+    """Image paths (as written, usually relative) on the agent's ``ai-image`` lines."""
+    refs: List[str] = []
+    for line in markdown.splitlines():
+        if _MARKER not in line:
+            continue
+        m = _MD_LINK_RE.match(line)
+        if m:
+            refs.append(m.group(1))
+        refs += [html.unescape(src) for src in _SRC_RE.findall(line)]
+        for srcset in _SRCSET_RE.findall(line):
+            refs += [html.unescape(c.strip().split(" ")[0]) for c in srcset.split(",") if c.strip()]
+    return refs
+
+
+def find_posts(posts_root: Path, output_suffix: str) -> List[Path]:
+    return sorted(p for p in posts_root.rglob(f"*{output_suffix}") if p.is_file())
+
+
+def find_references(posts: Iterable[Path]) -> Set[str]:
+    """Resolved paths of every asset referenced by ``posts``."""
+    referenced: Set[str] = set()
+    # Directories are resolved once each (there are few), so symlinked assets dirs still match.
+    real_dirs: Dict[str, str] = {}
+    for post in posts:
+        text = post.read_text(encoding="utf-8", errors="replace")
+        for ref in references_in(text):
+            if "://" in ref or ref.startswith("data:"):
+                continue
+            head, tail = os.path.split(os.path.normpath(os.path.join(post.parent, ref)))
+            real = real_dirs.get(head)
+            if real is None:
+                real = real_dirs[head] = os.path.realpath(head)
+            referenced.add(os.path.join(real, tail))
+    return referenced
+
+
+def iter_assets(assets_dir: Path) -> Iterator[os.DirEntry]:
+    """Image files under ``assets_dir``, skipping dot-dirs (e.g. the image cache), dot-files
+    (temp files, the asset index) and manifests."""
+    try:
+        entries = list(os.scandir(assets_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(".") or entry.name in _RESERVED_NAMES:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_assets(Path(entry.path))
+        elif entry.is_file(follow_symlinks=False) and os.path.splitext(entry.name)[1].lower() in ASSET_SUFFIXES:
+            yield entry
+
+
+def _sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    # A chunked loop rather than hashlib.file_digest, which needs Python 3.11.
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetIndex:
+    """Content hashes of the files in one assets dir, reused while (size, mtime) are unchanged."""
+
+    FILE_NAME = ".asset-index.json"
+
+    def __init__(self, assets_dir: Path):
+        self.path = assets_dir / self.FILE_NAME
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.entries: Dict[str, Dict[str, object]] = data.get("files", {}) if isinstance(data, dict) else {}
+
+    def lookup(self, name: str, st: os.stat_result) -> Optional[str]:
+        entry = self.entries.get(name)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return str(entry["sha256"])
+        return None
+
+    def update(self, name: str, st: os.stat_result, digest: str) -> None:
+        self.entries[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+    def save(self, keep: Iterable[str]) -> None:
+        keep = set(keep)
+        self.entries = {name: e for name, e in self.entries.items() if name in keep}
+        payload = json.dumps({"version": 1, "files": self.entries}, sort_keys=True)
+        atomic_write_bytes(self.path, payload.encode("utf-8"))
+
+
+@dataclass
+class Asset:
+    path: str
+    name: str  # relative to assets_dir; the key used in its AssetIndex
+    assets_dir: Path
+    stat: os.stat_result
+    sha256: Optional[str] = None
+
+
+@dataclass
+class GcReport:
+    posts: int = 0
+    scanned: int = 0
+    hashed: int = 0  # files (re)hashed because they were new or changed since the last run
+    referenced: int = 0
+    removed: List[Path] = field(default_factory=list)
+    removed_bytes: int = 0
+    linked: List[Tuple[Path, Path]] = field(default_factory=list)  # (duplicate, canonical copy)
+    linked_bytes: int = 0
+
+
+def _hardlink(canonical: Path, duplicate: Path) -> bool:
+    tmp = duplicate.with_name(f".{duplicate.name}.{os.getpid()}.link.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(canonical, tmp)
+    except OSError:  # different filesystem, or links unsupported
+        return False
+    os.replace(tmp, duplicate)
+    return True
+
+
+def collect_garbage(
+    posts_root: Path,
+    assets_dirs: Optional[Iterable[Path]] = None,
+    output_suffix: str = ".illustrated.md",
+    dedupe: bool = True,
+    dry_run: bool = False,
+    min_age_seconds: float = 3600.0,
+    workers: Optional[int] = None,
+) -> GcReport:
+    """Delete agent-generated assets no illustrated post under ``posts_root`` references, then
+    hardlink byte-identical survivors to one inode. ``assets_dirs`` defaults to the ``assets``
+    dir next to every Markdown file under ``posts_root`` (the pipeline's default location).
+
+    Only files named like the agent's output (``img-<16 hex>...``) are ever deleted; anything
+    else in an assets dir (hand-authored diagrams, screenshots) is left alone. An image counts
+    as referenced when any of its encodings or width variants is (they share
+    the ``img-<key>`` stem). Files younger than ``min_age_seconds`` are kept so a run that has
+    written images but not yet its Markdown is not collected.
+    """
+    report = GcReport()
+    posts = find_posts(posts_root, output_suffix)
+    report.posts = len(posts)
+    referenced_keys = {(os.path.dirname(p), asset_key(os.path.basename(p))) for p in find_references(posts)}
+    now = time.time()
+
+    if assets_dirs is None:
+        assets_dirs = {p.parent / "assets" for p in posts_root.rglob("*.md")}
+    # Resolved on both sides, so a symlinked path never makes a referenced file look orphaned.
+    dirs = sorted({Path(os.path.realpath(d)) for d in assets_dirs if Path(d).is_dir()})
+    assets: Dict[Path, List[Asset]] = {}
+    for d in dirs:
+        prefix = len(str(d)) + 1
+        assets[d] = [
+            Asset(entry.path, entry.path[prefix:], d, entry.stat(follow_symlinks=False)) for entry in iter_assets(d)
+        ]
+    report.scanned = sum(len(a) for a in assets.values())
+
+    kept: Dict[Path, List[Asset]] = {d: [] for d in dirs}
+    for d, dir_assets in assets.items():
+        for asset in dir_assets:
+            name = os.path.basename(asset.path)
+            if (os.path.dirname(asset.path), asset_key(name)) in referenced_keys:
+                report.referenced += 1
+                kept[d].append(asset)
+            elif not _KEY_RE.match(name) or now - asset.stat.st_mtime < min_age_seconds:
+                kept[d].append(asset)
+            else:
+                report.removed.append(Path(asset.path))
+                report.removed_bytes += asset.stat.st_size
+                if not dry_run:
+                    Path(asset.path).unlink(missing_ok=True)
+    if not dedupe:
+        return report
+
+    indexes = {d: AssetIndex(d) for d in dirs}
+    stale: List[Asset] = []
+    for d, dir_assets in kept.items():
+        for asset in dir_assets:
+            asset.sha256 = indexes[d].lookup(asset.name, asset.stat)
+            if asset.sha256 is None:
+                stale.append(asset)
+    # hashlib releases the GIL on large buffers, so threads hash files in parallel.
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        for asset, digest in zip(stale, pool.map(lambda a: _sha256(a.path), stale)):
+            asset.sha256 = digest
+            indexes[asset.assets_dir].update(asset.name, asset.stat, digest)
+    report.hashed = len(stale)
+
+    groups: Dict[Tuple[str, int], List[Asset]] = {}
+    for dir_assets in kept.values():
+        for asset in dir_assets:
+            groups.setdefault((str(asset.sha256), asset.stat.st_size), []).append(asset)
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda a: a.path)
+        canonical = group[0]
+        for dup in group[1:]:
+            if (dup.stat.st_dev, dup.stat.st_ino) == (canonical.stat.st_dev, canonical.stat.st_ino):
+                continue
+            if dry_run or _hardlink(Path(canonical.path), Path(dup.path)):
+                report.linked.append((Path(dup.path), Path(canonical.path)))
+                report.linked_bytes += dup.stat.st_size
+                if not dry_run:
+                    indexes[dup.assets_dir].update(dup.name, os.stat(dup.path), str(dup.sha256))
+
+    if not dry_run:
+        for d, index in indexes.items():
+            index.save(a.name for a in kept[d])
+    return report
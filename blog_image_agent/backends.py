@@ -0,0 +1,313 @@
+"""Generation backends: where planner completions and images come from.
+
+A backend turns a planning request into JSON text and an image prompt into encoded image
+bytes. ``openai`` is the default; ``local`` simulates API latency, jitter, failures and
+realistic image payloads so concurrency, caching and rate limiting can be tuned offline.
+Backends are chosen by ``AgentConfig.backend`` and new ones are added with
+:func:`register_backend`.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .config import AgentConfig
+
+
+@dataclass(frozen=True)
+class ImageRequest:
+    prompt: str
+    width: int
+    height: int
+
+
+class Backend:
+    """Interface for planning and image generation. Implementations must be thread-safe.
+
+    Subclasses implement the sync methods; the async and batch variants default to running
+    the sync ones in a thread and one after another. ``timeout`` (seconds) is only passed when
+    a run has a deadline; the request must end, or raise ``TimeoutError``, by then.
+    """
+
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def warm_up(self) -> None:
+        """Create clients/connections ahead of the first request (used by ``serve``)."""
+
+    def complete_json(self, model: str, system: str, user: str, timeout: Optional[float] = None) -> str:
+        raise NotImplementedError
+
+    def generate_image(self, model: str, prompt: str, width: int, height: int, timeout: Optional[float] = None) -> bytes:
+        raise NotImplementedError
+
+    async def acomplete_json(self, model: str, system: str, user: str) -> str:
+        return await asyncio.to_thread(self.complete_json, model, system, user)
+
+    async def agenerate_image(self, model: str, prompt: str, width: int, height: int) -> bytes:
+        return await asyncio.to_thread(self.generate_image, model, prompt, width, height)
+
+    def generate_images(self, model: str, requests: Sequence[ImageRequest]) -> List[bytes]:
+        return [self.generate_image(model, r.prompt, r.width, r.height) for r in requests]
+
+
+class OpenAIBackend(Backend):
+    name = "openai"
+
+    def __init__(self, client: Any = None, async_client: Any = None):
+        self._client = client
+        self._async_client = async_client
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return self._client is not None or importlib.util.find_spec("openai") is not None
+
+    @property
+    def client(self) -> Any:
+        # One client per backend keeps the HTTP connection pool warm across posts.
+        # Retries are owned by the RequestScheduler, not the SDK.
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                self._client = OpenAI(max_retries=0)
+            return self._client
+
+    @property
+    def async_client(self) -> Any:
+        with self._lock:
+            if self._async_client is None:
+                from openai import AsyncOpenAI
+
+                self._async_client = AsyncOpenAI(max_retries=0)
+            return self._async_client
+
+    def warm_up(self) -> None:
+        self.client
+
+    def complete_json(self, model: str, system: str, user: str, timeout: Optional[float] = None) -> str:
+        response = self.client.chat.completions.create(**_chat_request(model, system, user), **_timeout(timeout))
+        return response.choices[0].message.content or "{}"
+
+    def generate_image(self, model: str, prompt: str, width: int, height: int, timeout: Optional[float] = None) -> bytes:
+        response = self.client.images.generate(model=model, prompt=prompt, size=f"{width}x{height}", **_timeout(timeout))
+        return base64.b64decode(response.data[0].b64_json)
+
+    async def acomplete_json(self, model: str, system: str, user: str) -> str:
+        response = await self.async_client.chat.completions.create(**_chat_request(model, system, user))
+        return response.choices[0].message.content or "{}"
+
+    async def agenerate_image(self, model: str, prompt: str, width: int, height: int) -> bytes:
+        response = await self.async_client.images.generate(model=model, prompt=prompt, size=f"{width}x{height}")
+        return base64.b64decode(response.data[0].b64_json)
+
+
+def _timeout(timeout: Optional[float]) -> Dict[str, Any]:
+    # The SDK treats an explicit timeout=None as "no timeout", so only pass a real one.
+    return {"timeout": max(0.001, timeout)} if timeout is not None else {}
+
+
+def _chat_request(model: str, system: str, user: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.6,
+    }
+
+
+class SimulatedAPIError(Exception):
+    """A rate-limit/server error raised by the local backend; retryable like the real one."""
+
+    def __init__(self, status_code: int = 429, retry_after: Optional[float] = None):
+        super().__init__(f"Simulated API error {status_code}")
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+
+class LocalBackend(Backend):
+    """Offline stand-in for the API: sleeps for a jittered latency, fails at ``failure_rate``,
+    plans the first headings it is given and returns PNGs of the requested size."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        latency: float = 0.8,
+        image_latency: float = 6.0,
+        jitter: float = 0.3,
+        failure_rate: float = 0.0,
+        failure_status: int = 429,
+        retry_after: Optional[float] = 1.0,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.latency = latency
+        self.image_latency = image_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {"plan": 0, "image": 0}
+
+    def _delay(self, base: float) -> float:
+        with self._lock:
+            # Jitter is a fraction of the base latency, e.g. 0.3 -> +/-30%.
+            return max(0.0, base * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            fail = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+        if fail:
+            raise SimulatedAPIError(self.failure_status, self.retry_after)
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _wait(self, base: float, timeout: Optional[float]) -> None:
+        delay = self._delay(base)
+        if timeout is not None and delay > timeout:
+            self._sleep(timeout)
+            raise TimeoutError(f"Simulated request timed out after {timeout:.2f}s")
+        self._sleep(delay)
+
+    def complete_json(self, model: str, system: str, user: str, timeout: Optional[float] = None) -> str:
+        self._count("plan")
+        self._wait(self.latency, timeout)
+        self._maybe_fail()
+        return json.dumps({"placements": simulated_placements(user)})
+
+    def generate_image(self, model: str, prompt: str, width: int, height: int, timeout: Optional[float] = None) -> bytes:
+        self._count("image")
+        self._wait(self.image_latency, timeout)
+        self._maybe_fail()
+        return simulated_png(width, height)
+
+    async def acomplete_json(self, model: str, system: str, user: str) -> str:
+        self._count("plan")
+        await asyncio.sleep(self._delay(self.latency))
+        self._maybe_fail()
+        return json.dumps({"placements": simulated_placements(user)})
+
+    async def agenerate_image(self, model: str, prompt: str, width: int, height: int) -> bytes:
+        self._count("image")
+        await asyncio.sleep(self._delay(self.image_latency))
+        self._maybe_fail()
+        return simulated_png(width, height)
+
+    def generate_images(self, model: str, requests: Sequence[ImageRequest]) -> List[bytes]:
+        # A batch costs one round trip plus a small per-image increment.
+        for _ in requests:
+            self._count("image")
+        self._sleep(self._delay(self.image_latency) * (1 + 0.1 * max(0, len(requests) - 1)))
+        self._maybe_fail()
+        return [simulated_png(r.width, r.height) for r in requests]
+
+
+def simulated_placements(user_prompt: str) -> List[Dict[str, Any]]:
+    """Plan the first ``max_images`` headings (or anchors) of a planner user prompt."""
+    try:
+        user = json.loads(user_prompt)
+        anchors = user.get("anchors", [])
+        max_images = int(user.get("max_images", 1))
+    except (AttributeError, TypeError, ValueError):
+        anchors, max_images = [], 0
+    headings = [a for a in anchors if a.get("kind") == "heading"] or anchors
+    return [
+        {
+            "anchor_id": a["anchor_id"],
+            "position": "after",
+            "prompt": f"Editorial illustration for: {a.get('text_excerpt', '')}",
+            "alt_text": f"Illustration: {a.get('text_excerpt', '')}"[:120],
+            "caption": None,
+            "aspect_ratio": "16:9",
+        }
+        for a in headings[:max_images]
+    ]
+
+
+@lru_cache(maxsize=16)
+def simulated_png(width: int, height: int) -> bytes:
+    """A PNG with photo-like noise, so payload size and decode cost resemble real API output."""
+    from PIL import Image
+
+    seed = int.from_bytes(hashlib.sha256(f"{width}x{height}".encode()).digest()[:2], "big")
+    bands = [Image.effect_noise((width, height), 24 + i * 8) for i in range(3)]
+    noise = Image.merge("RGB", bands)
+    base = Image.new("RGB", (width, height), color=(60 + seed % 120, 90 + seed % 80, 140))
+    buf = io.BytesIO()
+    Image.blend(base, noise, 0.35).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+BackendFactory = Callable[["AgentConfig"], Backend]
+_REGISTRY: Dict[str, BackendFactory] = {}
+_INSTANCES: Dict[tuple, Backend] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    _REGISTRY[name] = factory
+
+
+def available_backends() -> List[str]:
+    return sorted(_REGISTRY)
+
+
+def get_backend(config: Optional["AgentConfig"] = None) -> Backend:
+    """Process-wide backend for ``config.backend``, shared by the planner and every image generator."""
+    if config is None:
+        from .config import AgentConfig
+
+        config = AgentConfig()
+    factory = _REGISTRY.get(config.backend)
+    if factory is None:
+        raise ValueError(f"Unknown backend {config.backend!r}; available: {', '.join(available_backends())}")
+    key = (
+        config.backend,
+        config.local_backend_latency,
+        config.local_backend_image_latency,
+        config.local_backend_jitter,
+        config.local_backend_failure_rate,
+    )
+    with _INSTANCES_LOCK:
+        backend = _INSTANCES.get(key)
+        if backend is None:
+            backend = factory(config)
+            _INSTANCES[key] = backend
+        return backend
+
+
+def clear_backends() -> None:
+    """Drop cached backend instances (e.g. after changing OPENAI_BASE_URL)."""
+    with _INSTANCES_LOCK:
+        _INSTANCES.clear()
+
+
+register_backend("openai", lambda config: OpenAIBackend())
+register_backend(
+    "local",
+    lambda config: LocalBackend(
+        latency=config.local_backend_latency,
+        image_latency=config.local_backend_image_latency,
+        jitter=config.local_backend_jitter,
+        failure_rate=config.local_backend_failure_rate,
+    ),
+)
@@ -0,0 +1,125 @@
+"""Per-post run budget: a wall-clock deadline plus caps on API calls and estimated cost.
+
+The planner and image generator ask the tracker before every request attempt (retries
+included) and pass the time left as the request timeout. Once the budget is spent, or too little
+time is left for another request, the remaining placements are filled from the image cache or
+with placeholders, and the Markdown is still written before the deadline.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BudgetExceeded(Exception):
+    """A request was not made (or was cut off) because the run budget ran out."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Run budget exceeded: {reason}")
+        self.reason = reason  # "deadline", "api_calls" or "cost"
+
+
+@dataclass
+class RunBudget:
+    deadline_seconds: float = 0.0  # wall clock for the whole post (0 = no deadline)
+    max_api_calls: int = 0  # plan and image request attempts, retries included (0 = unlimited)
+    max_cost: float = 0.0  # estimated spend in USD (0 = unlimited)
+    image_cost: float = 0.04
+    plan_cost: float = 0.001
+    # Held back from the deadline for inserting images and writing the Markdown
+    reserve_seconds: float = 1.0
+    # Share of the deadline plan requests may use; later the heuristic plan is used
+    plan_share: float = 0.5
+
+    @property
+    def enabled(self) -> bool:
+        return self.deadline_seconds > 0 or self.max_api_calls > 0 or self.max_cost > 0
+
+
+class RunTracker:
+    """Tracks one run against a :class:`RunBudget`; safe to share between image workers."""
+
+    def __init__(self, budget: RunBudget, clock: Callable[[], float] = time.monotonic):
+        self.budget = budget
+        self._clock = clock
+        self.started = clock()
+        self.api_calls = 0
+        self.cost = 0.0
+        self._durations: Dict[str, list] = {}
+        # What the budget cut short: {"stage": "plan" | "image", "reason": ..., "anchor_id": ...}
+        self.degraded: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def has_deadline(self) -> bool:
+        return self.budget.deadline_seconds > 0
+
+    def deadline_for(self, kind: str = "image") -> float:
+        """Clock time by which a ``kind`` request must finish (inf without a deadline)."""
+        if not self.has_deadline:
+            return math.inf
+        window = self.budget.deadline_seconds - self.budget.reserve_seconds
+        return self.started + (window * self.budget.plan_share if kind == "plan" else window)
+
+    @property
+    def deadline(self) -> float:
+        return self.deadline_for("image")
+
+    def remaining(self, kind: str = "image") -> float:
+        return max(0.0, self.deadline_for(kind) - self._clock())
+
+    def timeout(self, kind: str) -> Optional[float]:
+        """Per-request timeout so an in-flight call ends by the deadline (None without one)."""
+        return self.remaining(kind) if self.has_deadline else None
+
+    def expected_seconds(self, kind: str) -> float:
+        # Mean duration of this run's completed requests of that kind (0 before the first one).
+        with self._lock:
+            durations = self._durations.get(kind)
+            return sum(durations) / len(durations) if durations else 0.0
+
+    def observe(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._durations.setdefault(kind, []).append(seconds)
+
+    def acquire(self, kind: str) -> Optional[str]:
+        """Charge one ``kind`` ("plan" or "image") request, or return why it must be skipped:
+        "api_calls", "cost" or "deadline" (not enough time left for a typical request)."""
+        price = self.budget.plan_cost if kind == "plan" else self.budget.image_cost
+        expected = self.expected_seconds(kind)
+        with self._lock:
+            if self.budget.max_api_calls > 0 and self.api_calls >= self.budget.max_api_calls:
+                return "api_calls"
+            if self.budget.max_cost > 0 and self.cost + price > self.budget.max_cost + 1e-9:
+                return "cost"
+            if self.has_deadline and self._clock() + expected >= self.deadline_for(kind):
+                return "deadline"
+            self.api_calls += 1
+            self.cost += price
+        return None
+
+    def charge(self, kind: str) -> None:
+        """:meth:`acquire`, raising :class:`BudgetExceeded` when the request must be skipped."""
+        reason = self.acquire(kind)
+        if reason is not None:
+            raise BudgetExceeded(reason)
+
+    def degrade(self, stage: str, reason: str, anchor_id: Optional[str] = None) -> None:
+        entry: Dict[str, Any] = {"stage": stage, "reason": reason}
+        if anchor_id is not None:
+            entry["anchor_id"] = anchor_id
+        with self._lock:
+            self.degraded.append(entry)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "elapsed_seconds": round(self._clock() - self.started, 3),
+            "deadline_seconds": self.budget.deadline_seconds,
+            "api_calls": self.api_calls,
+            "max_api_calls": self.budget.max_api_calls,
+            "estimated_cost": round(self.cost, 4),
+            "max_cost": self.budget.max_cost,
+        }
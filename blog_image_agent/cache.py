@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+def image_cache_key(prompt: str, model: str, width: int, height: int, **format_settings: object) -> str:
+    payload = {
+        "prompt": prompt,
+        "model": model,
+        "width": width,
+        "height": height,
+        "format": format_settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """Place ``src`` at ``dest`` atomically, hardlinking when both live on the same filesystem."""
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+class ImageCache:
+    """Content-addressed store of generated images shared by any number of assets dirs.
+
+    Blobs are stored under their (key-derived) file name; ``manifest.json`` tracks size and
+    last access for LRU eviction once ``max_bytes`` is exceeded. Manifest updates are kept in
+    memory and written by :meth:`flush`, which merges with the file on disk.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir: str | Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._manifest_path = self.cache_dir / self.MANIFEST_NAME
+        self._entries: Dict[str, Dict[str, float]] = self._read_manifest()
+        self._dirty = False
+
+    def _read_manifest(self) -> Dict[str, Dict[str, float]]:
+        try:
+            data = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("entries", {}) if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        # Merge with whatever other processes sharing this cache wrote since we loaded it.
+        on_disk = self._read_manifest()
+        for name, entry in on_disk.items():
+            mine = self._entries.get(name)
+            if mine is None:
+                if (self.cache_dir / name).exists():
+                    self._entries[name] = entry
+            elif entry.get("last_access", 0) > mine.get("last_access", 0):
+                mine["last_access"] = entry["last_access"]
+        payload = json.dumps({"version": 1, "entries": self._entries}, sort_keys=True)
+        atomic_write_bytes(self._manifest_path, payload.encode("utf-8"))
+
+    def _lookup(self, name: str) -> Optional[Path]:
+        blob = self.cache_dir / name
+        if not blob.exists():
+            self._entries.pop(name, None)
+            return None
+        entry = self._entries.setdefault(name, {"size": blob.stat().st_size})
+        entry["last_access"] = time.time()
+        return blob
+
+    def restore(self, names: Iterable[str], dest_dir: str | Path) -> bool:
+        """Materialize every named blob into ``dest_dir``; returns False (a miss) if any is absent."""
+        names = list(names)
+        dest = Path(dest_dir)
+        with self._lock:
+            blobs = [self._lookup(name) for name in names]
+            if not all(blobs):
+                self.misses += 1
+                return False
+            for name, blob in zip(names, blobs):
+                assert blob is not None
+                _link_or_copy(blob, dest / name)
+            self.hits += 1
+            self._dirty = True
+            return True
+
+    def put(self, path: str | Path) -> None:
+        src = Path(path)
+        blob = self.cache_dir / src.name
+        with self._lock:
+            if src.resolve() != blob.resolve():
+                _link_or_copy(src, blob)
+            self._entries[src.name] = {"size": blob.stat().st_size, "last_access": time.time()}
+            self._evict()
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._save()
+            self._dirty = False
+
+    def total_bytes(self) -> int:
+        return int(sum(e.get("size", 0) for e in self._entries.values()))
+
+    def _evict(self) -> None:
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for name, entry in sorted(self._entries.items(), key=lambda kv: kv[1].get("last_access", 0)):
+            if total <= self.max_bytes:
+                break
+            (self.cache_dir / name).unlink(missing_ok=True)
+            total -= int(entry.get("size", 0))
+            del self._entries[name]
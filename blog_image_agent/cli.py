@@ -1,20 +1,112 @@
 from __future__ import annotations
 
+import json
 import os
-from pathlib import Path
-from typing import Optional
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import typer
-from dotenv import load_dotenv
-from rich import print
-from rich.console import Console
-from rich.panel import Panel
 
-from .config import AgentConfig, load_config
-from .pipeline import process_blog
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    from .config import AgentConfig
+
+# Everything beyond typer is imported inside the commands, so `--help` and DRY_RUN runs
+# do not pay for openai, PIL, pydantic or rich up front (see tests/test_startup.py).
 
 app = typer.Typer(add_completion=False, no_args_is_help=True)
-console = Console()
+
+
+@lru_cache(maxsize=1)
+def _console() -> Console:
+    from rich.console import Console
+
+    return Console()
+
+
+def _load_config(config_path: Optional[str]) -> AgentConfig:
+    from dotenv import load_dotenv
+    from pydantic import ValidationError
+
+    from .config import load_config
+
+    load_dotenv()
+    try:
+        return load_config(config_path)
+    except ValidationError as e:
+        error = e.errors()[0]
+        name = ".".join(str(part) for part in error["loc"])
+        raise typer.BadParameter(f"{name}: {error['msg']}", param_hint="config file or environment") from None
+
+
+def _apply_overrides(cfg: AgentConfig, **overrides: object) -> AgentConfig:
+    # CLI options default to None, meaning "keep the value from config/env".
+    from pydantic import ValidationError
+
+    for name, value in overrides.items():
+        if value is not None and value != "":
+            try:
+                setattr(cfg, name, value)
+            except ValidationError as e:
+                raise typer.BadParameter(f"{name}: {e.errors()[0]['msg']}") from None
+    return cfg
+
+
+def _parse_widths(value: Optional[str]) -> Optional[List[int]]:
+    if value is None:
+        return None
+    return [int(w) for w in value.split(",") if w.strip()]
+
+
+def _print_metrics(console: Console, report: Dict[str, Any]) -> None:
+    from rich.table import Table
+
+    table = Table(title="Stages")
+    table.add_column("Stage")
+    table.add_column("Count", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Max ms", justify="right")
+    for name, s in report["spans"].items():
+        table.add_row(name, str(s["count"]), f"{s['total_ms']:.1f}", f"{s['max_ms']:.1f}")
+    console.print(table)
+    if report["counters"]:
+        console.log("Counters: " + ", ".join(f"{k}={v}" for k, v in report["counters"].items()))
+
+
+def _write_metrics_json(path: str, payload: Any) -> None:
+    text = json.dumps(payload, indent=2, default=str)
+    if path == "-":
+        typer.echo(text)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+def _stream_events(
+    input: str,
+    assets_dir: Optional[str],
+    cfg: AgentConfig,
+    max_images: Optional[int],
+    profile: Optional[str],
+    profile_output: Optional[str],
+    metrics_json: Optional[str],
+) -> None:
+    # One JSON object per line, flushed as it happens, so consumers can act on each image
+    # (e.g. upload it) while later ones are still generating.
+    from .events import MarkdownWritten, event_to_dict
+    from .metrics import profiled
+    from .pipeline import process_blog_iter
+
+    result = None
+    with profiled(profile, profile_output):
+        for event in process_blog_iter(input, assets_dir, cfg, max_images):
+            typer.echo(json.dumps(event_to_dict(event), default=str))
+            if isinstance(event, MarkdownWritten):
+                result = event.result
+    if metrics_json and metrics_json != "-" and result is not None:
+        _write_metrics_json(metrics_json, result.metrics)
 
 
 @app.command()
@@ -25,38 +117,303 @@ def process(
     max_images: Optional[int] = typer.Option(None, "--max-images", help="Override maximum number of images"),
     image_model: Optional[str] = typer.Option(None, "--image-model", help="Override image model"),
     text_model: Optional[str] = typer.Option(None, "--text-model", help="Override text model"),
+    backend: Optional[str] = typer.Option(None, "--backend", help="Generation backend: openai or local (simulated, offline)"),
+    planner: Optional[str] = typer.Option(None, "--planner", help="Placement planner: llm or local (offline, NumPy)"),
     hero_image: Optional[bool] = typer.Option(None, "--hero-image/--no-hero-image", help="Enable/disable hero image planning"),
+    max_concurrency: Optional[int] = typer.Option(None, "--max-concurrency", help="Maximum number of images generated in parallel"),
+    plan_cache: Optional[bool] = typer.Option(None, "--plan-cache/--no-plan-cache", help="Reuse cached planner responses for unchanged posts"),
+    incremental: Optional[bool] = typer.Option(None, "--incremental/--full", help="Only replan and regenerate sections changed since the last run"),
+    image_format: Optional[str] = typer.Option(None, "--image-format", help="Format linked from the Markdown: png or webp"),
+    encode_preset: Optional[str] = typer.Option(None, "--encode-preset", help="Encoder preset: speed, balanced or size"),
+    responsive_widths: Optional[str] = typer.Option(None, "--responsive-widths", help="Comma-separated variant widths for <picture>/srcset output, e.g. 480,768"),
+    lqip: Optional[str] = typer.Option(None, "--lqip", help="Low-quality placeholder: none, webp or blurhash"),
+    reuse_threshold: Optional[float] = typer.Option(None, "--reuse-threshold", help="Reuse an existing image for prompts at least this similar (0-1, 0 = off)"),
+    byte_budget: Optional[int] = typer.Option(None, "--byte-budget", help="Per-image byte budget for lossy outputs; quality is searched to fit (0 = off)"),
+    budget_formats: Optional[str] = typer.Option(None, "--budget-formats", help="Comma-separated formats the budget search may pick from: webp,avif,jpeg"),
+    deadline: Optional[float] = typer.Option(None, "--deadline", help="Wall-clock seconds per post; placements that would miss it get cached images or placeholders (0 = none)"),
+    max_api_calls: Optional[int] = typer.Option(None, "--max-api-calls", help="Plan and image requests allowed per post (0 = unlimited)"),
+    max_cost: Optional[float] = typer.Option(None, "--max-cost", help="Estimated USD allowed per post (0 = unlimited)"),
+    metrics_json: Optional[str] = typer.Option(None, "--metrics-json", help="Write stage timings and counters as JSON to this path ('-' for stdout)"),
+    profile: Optional[str] = typer.Option(None, "--profile", help="Profile the run with cprofile or pyinstrument and print a stage report"),
+    profile_output: Optional[str] = typer.Option(None, "--profile-output", help="Save the profile here instead of printing it to stderr"),
+    events: Optional[str] = typer.Option(None, "--events", help="Stream progress events to stdout instead of logging; 'ndjson' is the only format"),
 ):
     """Process a blog: plan image placements, generate images, insert them, and write an illustrated Markdown file."""
-    load_dotenv()
+    from rich.panel import Panel
+
+    from .metrics import profiled
+    from .pipeline import process_blog
 
-    cfg = load_config(config_path)
+    if events is not None and events != "ndjson":
+        raise typer.BadParameter("only 'ndjson' is supported", param_hint="--events")
 
-    if image_model:
-        cfg.image_model = image_model
-    if text_model:
-        cfg.text_model = text_model
-    if max_images is not None:
-        cfg.max_images = max_images
-    if hero_image is not None:
-        cfg.hero_image = hero_image
+    console = _console()
+    cfg = _apply_overrides(
+        _load_config(config_path),
+        image_model=image_model,
+        text_model=text_model,
+        backend=backend,
+        planner=planner,
+        max_images=max_images,
+        hero_image=hero_image,
+        max_concurrency=max_concurrency,
+        plan_cache=plan_cache,
+        incremental=incremental,
+        image_format=image_format,
+        encode_preset=encode_preset,
+        responsive_widths=_parse_widths(responsive_widths),
+        lqip=lqip,
+        prompt_reuse_threshold=reuse_threshold,
+        byte_budget=byte_budget,
+        budget_formats=[f.strip() for f in budget_formats.split(",") if f.strip()] if budget_formats else None,
+        run_deadline_seconds=deadline,
+        run_max_api_calls=max_api_calls,
+        run_max_cost=max_cost,
+        metrics=True if (metrics_json or profile) else None,
+    )
+
+    if events:
+        _stream_events(input, assets_dir, cfg, max_images, profile, profile_output, metrics_json)
+        return
 
     console.print(Panel.fit("Blog Image Agent", title="Agent", border_style="blue"))
     console.log(f"Input: {input}")
     console.log(f"Assets dir: {assets_dir or cfg.assets_dir or '(auto under blog folder)'}")
-    console.log(f"Models: text={cfg.text_model} image={cfg.image_model}")
+    console.log(f"Models: text={cfg.text_model} image={cfg.image_model} backend={cfg.backend}")
+    console.log(f"Max concurrency: {cfg.max_concurrency}")
     console.log(f"DRY_RUN={'on' if os.getenv('DRY_RUN') else 'off'}")
 
-    result = process_blog(
-        input_markdown_path=input,
-        assets_dir=assets_dir,
-        config=cfg,
-        max_images_override=max_images,
-    )
+    with profiled(profile, profile_output):
+        result = process_blog(
+            input_markdown_path=input,
+            assets_dir=assets_dir,
+            config=cfg,
+            max_images_override=max_images,
+        )
 
     console.log(f"Wrote: {result.output_markdown_path}")
+    if cfg.plan_cache:
+        console.log(f"Plan cache: {result.plan_cache_hits} hit(s), {result.plan_cache_misses} miss(es)")
+    if cfg.incremental:
+        console.log(f"Reused images: {result.reused_placements}")
     for p in result.image_paths:
         console.log(f"Image: {p}")
+    if result.run_budget is not None:
+        b = result.run_budget
+        console.log(f"Run budget: {b['elapsed_seconds']:.1f}s, {b['api_calls']} API call(s), ~${b['estimated_cost']:.3f}")
+    for d in result.degraded:
+        where = f"image at {d['anchor_id']}" if d["stage"] == "image" else "plan (heuristic used)"
+        console.log(f"[yellow]Degraded {where}: {d['reason']}[/yellow]")
+    if result.metrics is not None:
+        _print_metrics(console, result.metrics)
+    if metrics_json:
+        _write_metrics_json(metrics_json, result.metrics)
+
+
+@app.command("process-dir")
+def process_dir(
+    input: str = typer.Option(..., "--input", help="Directory (searched recursively) or glob pattern of Markdown files"),
+    assets_dir: Optional[str] = typer.Option(None, "--assets-dir", help="Shared directory to store generated assets"),
+    config_path: Optional[str] = typer.Option(None, "--config", help="Optional YAML config file"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Number of worker processes (default: CPU count)"),
+    max_images: Optional[int] = typer.Option(None, "--max-images", help="Override maximum number of images"),
+    image_model: Optional[str] = typer.Option(None, "--image-model", help="Override image model"),
+    text_model: Optional[str] = typer.Option(None, "--text-model", help="Override text model"),
+    backend: Optional[str] = typer.Option(None, "--backend", help="Generation backend: openai or local (simulated, offline)"),
+    planner: Optional[str] = typer.Option(None, "--planner", help="Placement planner: llm or local (offline, NumPy)"),
+    hero_image: Optional[bool] = typer.Option(None, "--hero-image/--no-hero-image", help="Enable/disable hero image planning"),
+    max_concurrency: Optional[int] = typer.Option(None, "--max-concurrency", help="Maximum number of images generated in parallel per post"),
+    plan_cache: Optional[bool] = typer.Option(None, "--plan-cache/--no-plan-cache", help="Reuse cached planner responses for unchanged posts"),
+    incremental: Optional[bool] = typer.Option(None, "--incremental/--full", help="Only replan and regenerate sections changed since the last run"),
+    image_format: Optional[str] = typer.Option(None, "--image-format", help="Format linked from the Markdown: png or webp"),
+    encode_preset: Optional[str] = typer.Option(None, "--encode-preset", help="Encoder preset: speed, balanced or size"),
+    responsive_widths: Optional[str] = typer.Option(None, "--responsive-widths", help="Comma-separated variant widths for <picture>/srcset output, e.g. 480,768"),
+    lqip: Optional[str] = typer.Option(None, "--lqip", help="Low-quality placeholder: none, webp or blurhash"),
+    reuse_threshold: Optional[float] = typer.Option(None, "--reuse-threshold", help="Reuse an existing image for prompts at least this similar (0-1, 0 = off)"),
+    byte_budget: Optional[int] = typer.Option(None, "--byte-budget", help="Per-image byte budget for lossy outputs; quality is searched to fit (0 = off)"),
+    budget_formats: Optional[str] = typer.Option(None, "--budget-formats", help="Comma-separated formats the budget search may pick from: webp,avif,jpeg"),
+    deadline: Optional[float] = typer.Option(None, "--deadline", help="Wall-clock seconds per post; placements that would miss it get cached images or placeholders (0 = none)"),
+    max_api_calls: Optional[int] = typer.Option(None, "--max-api-calls", help="Plan and image requests allowed per post (0 = unlimited)"),
+    max_cost: Optional[float] = typer.Option(None, "--max-cost", help="Estimated USD allowed per post (0 = unlimited)"),
+    metrics_json: Optional[str] = typer.Option(None, "--metrics-json", help="Write stage timings and counters as JSON to this path ('-' for stdout)"),
+    profile: Optional[str] = typer.Option(None, "--profile", help="Profile the run with cprofile or pyinstrument and print a stage report"),
+    profile_output: Optional[str] = typer.Option(None, "--profile-output", help="Save the profile here instead of printing it to stderr"),
+):
+    """Process many blogs in parallel worker processes and print a per-file summary."""
+    from rich.panel import Panel
+    from rich.table import Table
+
+    from .metrics import merge_metrics, profiled
+    from .pipeline import iter_markdown_files, process_directory
+
+    console = _console()
+    cfg = _apply_overrides(
+        _load_config(config_path),
+        image_model=image_model,
+        text_model=text_model,
+        backend=backend,
+        planner=planner,
+        max_images=max_images,
+        hero_image=hero_image,
+        max_concurrency=max_concurrency,
+        plan_cache=plan_cache,
+        incremental=incremental,
+        image_format=image_format,
+        encode_preset=encode_preset,
+        responsive_widths=_parse_widths(responsive_widths),
+        lqip=lqip,
+        prompt_reuse_threshold=reuse_threshold,
+        byte_budget=byte_budget,
+        budget_formats=[f.strip() for f in budget_formats.split(",") if f.strip()] if budget_formats else None,
+        run_deadline_seconds=deadline,
+        run_max_api_calls=max_api_calls,
+        run_max_cost=max_cost,
+        metrics=True if (metrics_json or profile) else None,
+    )
+
+    inputs = iter_markdown_files(input, cfg.output_suffix)
+    if not inputs:
+        console.log(f"No Markdown files found for: {input}")
+        raise typer.Exit(code=1)
+
+    console.print(Panel.fit("Blog Image Agent", title="Batch", border_style="blue"))
+    console.log(f"Inputs: {len(inputs)} file(s) from {input}")
+    console.log(f"Workers: {workers or os.cpu_count()}  DRY_RUN={'on' if os.getenv('DRY_RUN') else 'off'}")
+
+    started = time.perf_counter()
+    # Worker processes are not profiled; the profile covers dispatch and result collection.
+    with profiled(profile, profile_output):
+        results = process_directory(
+            inputs=inputs,
+            assets_dir=assets_dir,
+            config=cfg,
+            max_images_override=max_images,
+            workers=workers,
+        )
+    elapsed = time.perf_counter() - started
+
+    table = Table(title="Results")
+    table.add_column("File")
+    table.add_column("Status")
+    table.add_column("Images", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Degraded", justify="right")
+    for r in results:
+        status = "[green]ok[/green]" if r.ok else f"[red]{r.error}[/red]"
+        table.add_row(str(r.input_path), status, str(len(r.image_paths)), f"{r.elapsed_seconds:.2f}", str(len(r.degraded)))
+    console.print(table)
+
+    failed = sum(1 for r in results if not r.ok)
+    rate = len(results) / elapsed * 60 if elapsed > 0 else 0.0
+    console.log(f"Processed {len(results)} post(s), {failed} failed, in {elapsed:.1f}s ({rate:.1f} posts/min)")
+    degraded = sum(len(r.degraded) for r in results)
+    if degraded:
+        console.log(f"[yellow]Run budget degraded {degraded} plan(s) or image(s)[/yellow]")
+    if cfg.plan_cache:
+        console.log(f"Plan cache hits: {sum(r.plan_cache_hits for r in results)}")
+    if cfg.metrics:
+        total = merge_metrics([r.metrics for r in results if r.metrics])
+        _print_metrics(console, total)
+        if metrics_json:
+            files = {str(r.input_path): r.metrics for r in results}
+            _write_metrics_json(metrics_json, {"total": total, "files": files})
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def gc(
+    posts: str = typer.Option(..., "--posts", help="Directory searched recursively for illustrated Markdown files"),
+    assets_dirs: Optional[List[str]] = typer.Option(None, "--assets-dir", help="Assets dir to clean (repeatable); default: ASSETS_DIR, else 'assets' next to each post"),
+    config_path: Optional[str] = typer.Option(None, "--config", help="Optional YAML config file"),
+    dedupe: bool = typer.Option(True, "--dedupe/--no-dedupe", help="Hardlink byte-identical assets to a single copy"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only report what would be removed or linked"),
+    min_age: float = typer.Option(3600, "--min-age", help="Keep unreferenced files younger than this many seconds"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Threads used to hash new or changed files"),
+):
+    """Remove assets no illustrated post references and dedupe identical files."""
+    from pathlib import Path
+
+    from .assets import collect_garbage
+
+    console = _console()
+    cfg = _load_config(config_path)
+    dirs = assets_dirs or ([cfg.assets_dir] if cfg.assets_dir else None)
+    report = collect_garbage(
+        Path(posts),
+        [Path(d) for d in dirs] if dirs else None,
+        output_suffix=cfg.output_suffix,
+        dedupe=dedupe,
+        dry_run=dry_run,
+        min_age_seconds=min_age,
+        workers=workers,
+    )
+    verb = "Would remove" if dry_run else "Removed"
+    for path in report.removed:
+        console.log(f"{verb}: {path}")
+    console.log(
+        f"Posts: {report.posts}  assets: {report.scanned} ({report.referenced} referenced, {report.hashed} hashed)"
+    )
+    console.log(f"{verb} {len(report.removed)} file(s), {report.removed_bytes / 1e6:.1f} MB")
+    if dedupe:
+        linked = "Would link" if dry_run else "Linked"
+        console.log(f"{linked} {len(report.linked)} duplicate(s), {report.linked_bytes / 1e6:.1f} MB")
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on"),
+    token: Optional[str] = typer.Option(
+        None, "--token", help="Shared secret clients send as 'Authorization: Bearer <token>' (default: SERVE_TOKEN)"
+    ),
+    allow_remote: bool = typer.Option(
+        False, "--allow-remote", help="Allow a non-loopback --host without a token (anyone who can connect may submit jobs)"
+    ),
+    port: int = typer.Option(8765, "--port", help="TCP port to listen on"),
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Listen on this Unix socket instead of TCP"),
+    config_path: Optional[str] = typer.Option(None, "--config", help="Optional YAML config file"),
+    workers: int = typer.Option(2, "--workers", help="Number of posts processed at the same time"),
+    queue_size: int = typer.Option(64, "--queue-size", help="Maximum number of waiting jobs before requests are rejected"),
+    image_model: Optional[str] = typer.Option(None, "--image-model", help="Override image model"),
+    text_model: Optional[str] = typer.Option(None, "--text-model", help="Override text model"),
+    backend: Optional[str] = typer.Option(None, "--backend", help="Generation backend: openai or local (simulated, offline)"),
+    max_concurrency: Optional[int] = typer.Option(None, "--max-concurrency", help="Maximum number of images generated in parallel per post"),
+):
+    """Run a local daemon that processes posts submitted with POST /jobs, keeping clients and caches warm."""
+    from rich.panel import Panel
+
+    from .server import JobQueue, is_loopback, make_server, warm_up
+
+    token = token or os.getenv("SERVE_TOKEN") or None
+    if not socket_path and not is_loopback(host) and not token and not allow_remote:
+        raise typer.BadParameter(
+            f"{host} is reachable from other machines; set --token (or SERVE_TOKEN), or pass --allow-remote",
+            param_hint="--host",
+        )
+
+    console = _console()
+    cfg = _apply_overrides(
+        _load_config(config_path),
+        image_model=image_model,
+        text_model=text_model,
+        backend=backend,
+        max_concurrency=max_concurrency,
+    )
+    warm_up(cfg)
+
+    queue = JobQueue(cfg, workers=workers, max_queue=queue_size)
+    server = make_server(queue, host=host, port=port, socket_path=socket_path, token=token)
+    console.print(Panel.fit("Blog Image Agent", title="Serve", border_style="blue"))
+    console.log(f"Listening on {socket_path or f'http://{host}:{port}'}  workers={workers} queue={queue_size}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.shutdown(wait=True)
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
 
 
 if __name__ == "__main__":
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Literal, Optional
 
-import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class AgentConfig(BaseModel):
+    # Env defaults and CLI overrides are checked too, so a typo fails before any work starts.
+    model_config = ConfigDict(validate_assignment=True, validate_default=True)
+
     text_model: str = Field(default=os.getenv("TEXT_MODEL", "gpt-4o-mini"))
     image_model: str = Field(default=os.getenv("IMAGE_MODEL", "gpt-image-1"))
     max_images: int = Field(default=int(os.getenv("MAX_IMAGES", "5")))
@@ -20,11 +22,101 @@ class AgentConfig(BaseModel):
 
     compress_webp: bool = Field(default=os.getenv("COMPRESS_WEBP", "true").lower() in {"1", "true", "yes"})
     webp_quality: int = Field(default=int(os.getenv("WEBP_QUALITY", "82")))
+    # Format the Markdown links to ("png" or "webp") and encoder preset ("speed", "balanced", "size")
+    image_format: Literal["png", "webp"] = Field(default=os.getenv("IMAGE_FORMAT", "png"))
+    encode_preset: Literal["speed", "balanced", "size"] = Field(default=os.getenv("ENCODE_PRESET", "balanced"))
+    # Per-image byte budget for lossy outputs (0 = fixed WEBP_QUALITY); quality is searched down to
+    # MIN_QUALITY and the compressed copy's format is picked from BUDGET_FORMATS (webp, avif, jpeg)
+    byte_budget: int = Field(default=int(os.getenv("BYTE_BUDGET", "0")))
+    min_quality: int = Field(default=int(os.getenv("MIN_QUALITY", "40")))
+    budget_formats: List[Literal["webp", "avif", "jpeg"]] = Field(
+        default_factory=lambda: [f.strip() for f in os.getenv("BUDGET_FORMATS", "webp").split(",") if f.strip()]
+    )
+    # Worker processes for budget searches (0 = search in the generating thread)
+    encode_workers: int = Field(default=int(os.getenv("ENCODE_WORKERS", "0")))
+    # Low-quality image placeholder: "none", "webp" (~20px inline data URI) or "blurhash"
+    lqip: Literal["none", "webp", "blurhash"] = Field(default=os.getenv("LQIP", "none"))
+    # How a placeholder is emitted: "attribute" (data-lqip / data-blurhash) or "style" (inline background)
+    lqip_style: Literal["attribute", "style"] = Field(default=os.getenv("LQIP_STYLE", "attribute"))
+    # Extra widths to emit as a <picture>/srcset block, e.g. "480,768"; empty keeps plain Markdown images
+    responsive_widths: List[int] = Field(
+        default_factory=lambda: [int(w) for w in os.getenv("RESPONSIVE_WIDTHS", "").split(",") if w.strip()]
+    )
+
+    # Sizes the image model accepts, e.g. "1024x1024,1536x1024"; empty uses the built-in per-model table.
+    # Images are requested at the nearest supported size and cropped/resized to the target locally.
+    image_api_sizes: List[str] = Field(
+        default_factory=lambda: [s.strip() for s in os.getenv("IMAGE_API_SIZES", "").split(",") if s.strip()]
+    )
 
     output_suffix: str = Field(default=os.getenv("OUTPUT_SUFFIX", ".illustrated.md"))
 
     assets_dir: Optional[str] = Field(default=os.getenv("ASSETS_DIR"))
 
+    # "llm" asks the text model (heuristic fallback offline); "local" scores anchors with NumPy, no API calls
+    planner: Literal["llm", "local"] = Field(default=os.getenv("PLANNER", "llm"))
+    # Posts with more anchors than this are planned in H2-aligned chunks, in parallel (0 disables)
+    plan_chunk_anchors: int = Field(default=int(os.getenv("PLAN_CHUNK_ANCHORS", "150")))
+
+    # Estimated-token cap for the anchor list sent to the planner; anchors are ranked locally (0 disables)
+    plan_token_budget: int = Field(default=int(os.getenv("PLAN_TOKEN_BUDGET", "6000")))
+
+    # Where plans and images come from: "openai", "local" (simulated latency/failures, no API calls)
+    # or any name added with backends.register_backend
+    backend: str = Field(default=os.getenv("BACKEND", "openai"))
+    local_backend_latency: float = Field(default=float(os.getenv("LOCAL_BACKEND_LATENCY", "0.8")))
+    local_backend_image_latency: float = Field(default=float(os.getenv("LOCAL_BACKEND_IMAGE_LATENCY", "6.0")))
+    # Fraction of the latency added or removed at random, e.g. 0.3 -> +/-30%
+    local_backend_jitter: float = Field(default=float(os.getenv("LOCAL_BACKEND_JITTER", "0.3")))
+    local_backend_failure_rate: float = Field(default=float(os.getenv("LOCAL_BACKEND_FAILURE_RATE", "0.0")))
+
+    max_concurrency: int = Field(default=int(os.getenv("MAX_CONCURRENCY", "4")))
+
+    # API rate limits shared by the planner and all image workers (<= 0 disables a limit)
+    requests_per_minute: float = Field(default=float(os.getenv("REQUESTS_PER_MINUTE", "500")))
+    images_per_minute: float = Field(default=float(os.getenv("IMAGES_PER_MINUTE", "50")))
+    api_max_retries: int = Field(default=int(os.getenv("API_MAX_RETRIES", "6")))
+    retry_base_delay: float = Field(default=float(os.getenv("RETRY_BASE_DELAY", "1.0")))
+    retry_max_delay: float = Field(default=float(os.getenv("RETRY_MAX_DELAY", "60")))
+
+    # Run budget per post (0 = unlimited): wall-clock deadline, plan + image requests and estimated
+    # USD cost. Placements it cannot pay for get cached images or placeholders; Markdown is still written.
+    run_deadline_seconds: float = Field(default=float(os.getenv("RUN_DEADLINE_SECONDS", "0")))
+    run_max_api_calls: int = Field(default=int(os.getenv("RUN_MAX_API_CALLS", "0")))
+    run_max_cost: float = Field(default=float(os.getenv("RUN_MAX_COST", "0")))
+    image_call_cost: float = Field(default=float(os.getenv("IMAGE_CALL_COST", "0.04")))
+    plan_call_cost: float = Field(default=float(os.getenv("PLAN_CALL_COST", "0.001")))
+    # Seconds kept back from the deadline for inserting images and writing the Markdown
+    run_reserve_seconds: float = Field(default=float(os.getenv("RUN_RESERVE_SECONDS", "1.0")))
+
+    # Collect per-stage spans and counters into PipelineResult.metrics
+    metrics: bool = Field(default=os.getenv("METRICS", "false").lower() in {"1", "true", "yes"})
+
+    incremental: bool = Field(default=os.getenv("INCREMENTAL", "false").lower() in {"1", "true", "yes"})
+
+    image_cache: bool = Field(default=os.getenv("IMAGE_CACHE", "true").lower() in {"1", "true", "yes"})
+    # Defaults to "<assets dir>/.cache"; point several assets dirs at one path to share it.
+    image_cache_dir: Optional[str] = Field(default=os.getenv("IMAGE_CACHE_DIR"))
+    image_cache_max_bytes: int = Field(default=int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024**3))))
+    # Reuse an image from the assets dir when a new prompt is at least this similar (MinHash Jaccard, 0 = off)
+    prompt_reuse_threshold: float = Field(default=float(os.getenv("PROMPT_REUSE_THRESHOLD", "0")))
+
+    plan_cache: bool = Field(default=os.getenv("PLAN_CACHE", "true").lower() in {"1", "true", "yes"})
+    # Defaults to "$XDG_CACHE_HOME/blog-image-agent" (or ~/.cache/blog-image-agent).
+    plan_cache_dir: Optional[str] = Field(default=os.getenv("PLAN_CACHE_DIR"))
+    plan_cache_ttl_seconds: int = Field(default=int(os.getenv("PLAN_CACHE_TTL_SECONDS", str(7 * 24 * 3600))))
+    plan_cache_max_entries: int = Field(default=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000")))
+
+    @field_validator("backend")
+    @classmethod
+    def _registered_backend(cls, value: str) -> str:
+        # Open set (register_backend), so it is checked against the registry instead of a Literal.
+        from .backends import available_backends
+
+        if value not in available_backends():
+            raise ValueError(f"Unknown backend {value!r}; available: {', '.join(available_backends())}")
+        return value
+
 
 def load_config(config_path: Optional[str]) -> AgentConfig:
     base = AgentConfig()
@@ -35,6 +127,8 @@ def load_config(config_path: Optional[str]) -> AgentConfig:
     if not path.exists():
         return base
 
+    import yaml
+
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f) or {}
 
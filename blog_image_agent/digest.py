@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .markdown_utils import Anchor
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "the and for are but not you with that this from have has was were will would can could "
+    "should your our their there here what when where which who how all any each into over "
+    "more most some such than then them they these those its it's also just very about".split()
+)
+# Excerpt lengths tried in turn until enough top candidates fit the budget.
+_EXCERPT_STEPS = (200, 120, 80, 40)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose and JSON)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def content_terms(text: str) -> List[str]:
+    """Lowercase words of three or more characters, stopwords removed."""
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def score_anchors(anchors: List[Anchor]) -> Dict[str, float]:
+    """Local relevance score per anchor: structure (heading level), substance (paragraph
+    length) and distinctiveness (mean TF-IDF of the anchor's terms across the post)."""
+    docs = [Counter(content_terms(a.text)) for a in anchors]
+    df: Counter[str] = Counter()
+    for terms in docs:
+        df.update(terms.keys())
+    n = len(anchors)
+
+    distinct: List[float] = []
+    for terms in docs:
+        total = sum(terms.values())
+        if not total:
+            distinct.append(0.0)
+            continue
+        distinct.append(sum((c / total) * math.log((1 + n) / (1 + df[t])) for t, c in terms.items()))
+    top = max(distinct, default=0.0) or 1.0
+
+    scores: Dict[str, float] = {}
+    for a, d in zip(anchors, distinct):
+        if a.kind == "heading":
+            structure = {1: 0.5, 2: 1.0, 3: 0.8}.get(a.level or 0, 0.4)
+        else:
+            structure = 0.8 * min(1.0, len(a.text.split()) / 80)
+        scores[a.anchor_id] = structure + d / top
+    return scores
+
+
+def _excerpt(text: str, limit: int) -> str:
+    return text[:limit] + ("…" if len(text) > limit else "")
+
+
+def _entry(a: Anchor, limit: int) -> Dict[str, object]:
+    return {
+        "anchor_id": a.anchor_id,
+        "kind": a.kind,
+        "level": a.level,
+        "text_excerpt": _excerpt(a.text, limit),
+        "start_line": a.start_line,
+    }
+
+
+def _cost(entry: Dict[str, object]) -> int:
+    return estimate_tokens(json.dumps(entry, ensure_ascii=False)) + 1
+
+
+@dataclass
+class AnchorDigest:
+    entries: List[Dict[str, object]]
+    estimated_tokens: int
+    full_tokens: int
+    excerpt_chars: int
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.full_tokens - self.estimated_tokens)
+
+
+def build_anchor_digest(anchors: List[Anchor], max_tokens: int, max_images: int = 5) -> AnchorDigest:
+    """Planner digest of ``anchors`` that fits ``max_tokens`` (``<= 0``: no limit).
+
+    Anchors are ranked locally and the best ones are kept, in document order. Excerpts are
+    shortened step by step until at least ``4 * max_images`` candidates (min. 8) fit.
+    """
+    full = [_entry(a, _EXCERPT_STEPS[0]) for a in anchors]
+    full_tokens = sum(_cost(e) for e in full)
+    if max_tokens <= 0 or full_tokens <= max_tokens:
+        return AnchorDigest(full, full_tokens, full_tokens, _EXCERPT_STEPS[0])
+
+    scores = score_anchors(anchors)
+    ranked = sorted(range(len(anchors)), key=lambda i: (-scores[anchors[i].anchor_id], i))
+    wanted = min(len(anchors), max(8, 4 * max_images))
+
+    chosen: List[int] = []
+    used = 0
+    limit = _EXCERPT_STEPS[0]
+    for limit in _EXCERPT_STEPS:
+        chosen, used = [], 0
+        for i in ranked:
+            cost = _cost(_entry(anchors[i], limit))
+            if used + cost > max_tokens:
+                continue
+            chosen.append(i)
+            used += cost
+        if len(chosen) >= wanted:
+            break
+
+    keep = set(chosen)
+    return AnchorDigest(
+        entries=[_entry(anchors[i], limit) for i in sorted(chosen)],
+        estimated_tokens=used,
+        full_tokens=full_tokens,
+        excerpt_chars=limit,
+        dropped=[a.anchor_id for i, a in enumerate(anchors) if i not in keep],
+    )
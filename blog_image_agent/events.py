@@ -0,0 +1,69 @@
+"""Progress events yielded by :func:`pipeline.process_blog_iter`, in the order they happen."""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    from .pipeline import PipelineResult
+
+
+@dataclass
+class AnchorsExtracted:
+    event: ClassVar[str] = "anchors"
+    input_path: Path
+    title: str
+    anchors: int
+
+
+@dataclass
+class PlanReady:
+    event: ClassVar[str] = "plan"
+    # Placement dicts in planner order: anchor_id, position, prompt, alt_text, caption, aspect_ratio
+    placements: List[Dict[str, Any]]
+    reused: int = 0
+
+
+@dataclass
+class ImageGenerated:
+    event: ClassVar[str] = "image"
+    anchor_id: str
+    path: Path
+    index: int  # position in planner order; events arrive in completion order
+    total: int
+    width: int
+    height: int
+    elapsed_ms: float
+    # True when an incremental run kept the image from the previous run
+    reused: bool = False
+    variants: List[Path] = field(default_factory=list)
+    # Byte-budget encoding results per format (see image_gen.GeneratedImage.encodings)
+    encodings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Set when the run budget left this placement with a placeholder ("deadline", "api_calls", "cost")
+    degraded: Optional[str] = None
+
+
+@dataclass
+class MarkdownWritten:
+    event: ClassVar[str] = "written"
+    output_path: Path
+    result: "PipelineResult"
+
+
+Event = Union[AnchorsExtracted, PlanReady, ImageGenerated, MarkdownWritten]
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def event_to_dict(event: Event) -> Dict[str, Any]:
+    """JSON-ready dict with an ``event`` type field, as written by ``--events ndjson``."""
+    return {"event": event.event, **_jsonable(asdict(event))}
@@ -1,18 +1,54 @@
 from __future__ import annotations
 
-import base64
-import hashlib
+import io
 import os
-from dataclasses import dataclass
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
-from PIL import Image, ImageDraw, ImageFont
+from .backends import Backend, get_backend
+from .budget import BudgetExceeded, RunTracker
+from .cache import ImageCache, atomic_write_bytes, image_cache_key
+from .manifest import AssetManifest
+from .metrics import NULL_METRICS, Metrics
+from .prompt_index import PromptIndex
+from .scheduler import RequestScheduler
+from .sizes import Size, fit_image, nearest_size, supported_sizes
 
-try:
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover - optional dependency for DRY_RUN
-    OpenAI = None  # type: ignore
+if TYPE_CHECKING:
+    from PIL import Image
+
+# PIL and .lqip are imported where they are used: a fully cached run never decodes an image.
+
+
+# Encoder settings per preset: "speed" favours CPU time, "size" favours smaller files.
+ENCODE_PRESETS: Dict[str, Dict[str, int]] = {
+    "speed": {"webp_method": 0, "png_compress_level": 1, "avif_speed": 10},
+    "balanced": {"webp_method": 4, "png_compress_level": 6, "avif_speed": 8},
+    "size": {"webp_method": 6, "png_compress_level": 9, "avif_speed": 6},
+}
+# Formats with a quality setting; candidates for byte-budget encoding.
+LOSSY_FORMATS = ("webp", "avif", "jpeg")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@lru_cache(maxsize=None)
+def format_supported(fmt: str) -> bool:
+    """Whether this Pillow build can write ``fmt``; AVIF needs Pillow >= 11.2 built with libavif."""
+    if fmt != "avif":
+        return True
+    from PIL import features
+
+    try:
+        return bool(features.check_module("avif"))
+    except ValueError:  # Pillow < 11.2 does not know the module at all
+        return False
 
 
 @dataclass
@@ -22,6 +58,35 @@ class ImageGenConfig:
     default_height: int
     compress_webp: bool
     webp_quality: int
+    cache_dir: Optional[str] = None
+    cache_max_bytes: int = 2 * 1024**3
+    image_format: str = "png"  # format referenced from the Markdown: "png" or "webp"
+    encode_preset: str = "balanced"
+    responsive_widths: Tuple[int, ...] = ()
+    lqip: str = "none"  # low-quality placeholder: "none", "webp" (inline data URI) or "blurhash"
+    reuse_threshold: float = 0.0  # reuse an image whose prompt is at least this similar (0 = off)
+    # Byte budget per lossy output (0 = fixed webp_quality). The companion output's format is
+    # chosen among budget_formats; quality is searched down to min_quality.
+    byte_budget: int = 0
+    min_quality: int = 40
+    budget_formats: Tuple[str, ...] = ("webp",)
+    encode_workers: int = 0  # process pool size for budget searches (0 = search in the calling thread)
+    # Sizes the image model accepts; empty uses the built-in table (sizes.SUPPORTED_SIZES)
+    api_sizes: Tuple[Size, ...] = ()
+
+
+@dataclass
+class GeneratedImage:
+    path: Path
+    width: int
+    height: int
+    # Downscaled copies per output format, widest first: {"png": [(768, path), (480, path)]}
+    variants: Dict[str, List[Tuple[int, Path]]] = field(default_factory=dict)
+    placeholder: Optional[str] = None
+    # Byte-budget results per lossy format: {"avif": {"quality": 61, "bytes": 118230, "within_budget": True}}
+    encodings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Why a run budget replaced this image with a placeholder ("deadline", "api_calls", "cost")
+    degraded: Optional[str] = None
 
 
 def _parse_aspect_ratio(aspect_ratio: str, default_width: int, default_height: int) -> Tuple[int, int]:
@@ -36,52 +101,494 @@ def _parse_aspect_ratio(aspect_ratio: str, default_width: int, default_height: i
         return default_width, default_height
 
 
+class SourceImage:
+    """Image data as received (encoded bytes) and/or decoded; decoding happens at most once."""
+
+    def __init__(self, data: Optional[bytes] = None, image: Optional[Image.Image] = None):
+        self.data = data
+        self._image = image
+
+    @property
+    def image(self) -> Image.Image:
+        if self._image is None:
+            from PIL import Image
+
+            assert self.data is not None
+            self._image = Image.open(io.BytesIO(self.data))
+            self._image.load()
+        return self._image
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        if self._image is None and self.is_png:
+            # Width and height from the IHDR chunk; a correctly sized PNG is never decoded here.
+            assert self.data is not None
+            return int.from_bytes(self.data[16:20], "big"), int.from_bytes(self.data[20:24], "big")
+        return self.image.size
+
+    @property
+    def is_png(self) -> bool:
+        return self.data is not None and self.data.startswith(_PNG_SIGNATURE)
+
+
+def encode_image(source: SourceImage, fmt: str, preset: str, quality: int) -> bytes:
+    """Encode to ``fmt``; ``quality`` applies to the lossy formats (webp, avif, jpeg)."""
+    if preset not in ENCODE_PRESETS:
+        raise ValueError(f"Unknown encode preset {preset!r}; expected one of {', '.join(ENCODE_PRESETS)}")
+    settings = ENCODE_PRESETS[preset]
+    if fmt == "png":
+        if source.is_png:
+            # API bytes are already a PNG; writing them as-is avoids a decode/encode round trip.
+            assert source.data is not None
+            return source.data
+        buf = io.BytesIO()
+        source.image.save(buf, format="PNG", compress_level=settings["png_compress_level"])
+        return buf.getvalue()
+    buf = io.BytesIO()
+    if fmt == "webp":
+        source.image.save(buf, format="WEBP", quality=quality, method=settings["webp_method"])
+    elif fmt == "avif":
+        source.image.save(buf, format="AVIF", quality=quality, speed=settings["avif_speed"])
+    elif fmt == "jpeg":
+        image = source.image if source.image.mode in {"RGB", "L"} else source.image.convert("RGB")
+        image.save(buf, format="JPEG", quality=quality, optimize=preset != "speed", progressive=True)
+    else:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    return buf.getvalue()
+
+
+@dataclass
+class BudgetEncoding:
+    fmt: str
+    quality: int
+    data: bytes = field(repr=False)
+    within_budget: bool
+
+    def summary(self) -> Dict[str, Any]:
+        return {"quality": self.quality, "bytes": len(self.data), "within_budget": self.within_budget}
+
+
+def search_encoding(
+    image: Image.Image,
+    formats: Sequence[str],
+    max_bytes: int,
+    min_quality: int,
+    max_quality: int = 95,
+    preset: str = "balanced",
+) -> BudgetEncoding:
+    """Binary-search, per format, the highest quality whose encoding fits ``max_bytes``.
+
+    Across formats the smallest fit wins (ties go to list order): quality numbers are not
+    comparable between encoders, so bytes are the only common measure of what fits best.
+    When nothing fits even at ``min_quality``, the smallest ``min_quality`` encoding is
+    returned with ``within_budget=False``.
+    """
+    source = SourceImage(image=image)
+    best: Optional[BudgetEncoding] = None
+    smallest: Optional[BudgetEncoding] = None
+    for fmt in formats:
+        top = encode_image(source, fmt, preset, max_quality)
+        if len(top) <= max_bytes:
+            found = BudgetEncoding(fmt, max_quality, top, True)
+        else:
+            floor = encode_image(source, fmt, preset, min_quality)
+            if len(floor) > max_bytes:
+                if smallest is None or len(floor) < len(smallest.data):
+                    smallest = BudgetEncoding(fmt, min_quality, floor, False)
+                continue
+            found = BudgetEncoding(fmt, min_quality, floor, True)
+            lo, hi = min_quality + 1, max_quality - 1
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                data = encode_image(source, fmt, preset, mid)
+                if len(data) <= max_bytes:
+                    found, lo = BudgetEncoding(fmt, mid, data, True), mid + 1
+                else:
+                    hi = mid - 1
+        if best is None or len(found.data) < len(best.data):
+            best = found
+    result = best or smallest
+    if result is None:
+        raise ValueError("search_encoding needs at least one format")
+    return result
+
+
+_ENCODE_POOLS: Dict[int, ProcessPoolExecutor] = {}
+_ENCODE_POOLS_LOCK = threading.Lock()
+
+
+def _encode_pool(workers: int) -> ProcessPoolExecutor:
+    # Shared by every generator in the process, so concurrent renders queue on one pool.
+    with _ENCODE_POOLS_LOCK:
+        pool = _ENCODE_POOLS.get(workers)
+        if pool is None:
+            pool = _ENCODE_POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
+
+
 class ImageGenerator:
-    def __init__(self, config: ImageGenConfig, assets_dir: str):
+    def __init__(
+        self,
+        config: ImageGenConfig,
+        assets_dir: str,
+        scheduler: Optional[RequestScheduler] = None,
+        backend: Optional[Backend] = None,
+    ):
+        unsupported = [f for f in config.budget_formats if not format_supported(f)]
+        if unsupported:
+            warnings.warn(
+                f"Pillow cannot encode {', '.join(unsupported)} here (AVIF needs Pillow >= 11.2); "
+                "leaving it out of budget_formats",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            kept = tuple(f for f in config.budget_formats if f not in unsupported)
+            config = replace(config, budget_formats=kept or ("webp",))
         self.config = config
+        self.scheduler = scheduler
         self.assets_dir = Path(assets_dir)
         self.assets_dir.mkdir(parents=True, exist_ok=True)
-        self._client = None
-        if not (os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"}) and OpenAI is not None:
+        self.cache = ImageCache(config.cache_dir, config.cache_max_bytes) if config.cache_dir else None
+        self.manifest = AssetManifest(self.assets_dir)
+        self.prompt_index = PromptIndex(self.assets_dir) if config.reuse_threshold > 0 else None
+        # None means "draw placeholders": DRY_RUN, or a backend that cannot be set up (e.g. no API key).
+        self.backend: Optional[Backend] = None
+        if not (os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"}):
             try:
-                self._client = OpenAI()
+                self.backend = backend or get_backend()
+                self.backend.warm_up()
             except Exception:
-                self._client = None
+                self.backend = None
+
+    def _cache_key(self, prompt: str, width: int, height: int) -> str:
+        return image_cache_key(
+            prompt,
+            self.config.image_model,
+            width,
+            height,
+            image_format=self.config.image_format,
+            encode_preset=self.config.encode_preset,
+            compress_webp=self.config.compress_webp,
+            webp_quality=self.config.webp_quality,
+            responsive_widths=sorted(self.config.responsive_widths),
+            **(
+                {"budget": [self.config.byte_budget, self.config.min_quality, list(self.config.budget_formats)]}
+                if self.config.byte_budget > 0
+                else {}
+            ),
+            # Images from a simulated backend must never be served to a real run.
+            **({"backend": self.backend.name} if self.backend is not None and self.backend.name != "openai" else {}),
+        )
+
+    def _reuse_group(self, width: int, height: int) -> str:
+        # Same model, size and output settings: only those images can stand in for each other.
+        return self._cache_key("", width, height)[:16]
+
+    def _filename_for_key(self, key: str, ext: str = "png") -> str:
+        return f"img-{key[:16]}.{ext}"
+
+    def _variant_filename(self, key: str, width: int, ext: str) -> str:
+        return f"img-{key[:16]}-{width}w.{ext}"
+
+    def _output_formats(self, companion: Optional[str] = None) -> List[str]:
+        formats = [self.config.image_format]
+        if companion and companion not in formats:
+            formats.append(companion)
+        return formats
 
-    def _filename_for_prompt(self, prompt: str, ext: str = "png") -> str:
-        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
-        return f"img-{digest}.{ext}"
+    def _companion_candidates(self) -> List[Optional[str]]:
+        """Possible formats of the compressed copy written next to the linked image.
+
+        It is webp, unless a byte budget lets the search pick among ``budget_formats``; the
+        extension then depends on the image, so lookups try each candidate in turn.
+        """
+        if not self.config.compress_webp:
+            return [None]
+        if self.config.byte_budget > 0:
+            formats = [f for f in self.config.budget_formats if f != self.config.image_format]
+            return list(formats) or [None]
+        return ["webp"]
+
+    def _search(self, image: Image.Image, formats: Sequence[str]) -> BudgetEncoding:
+        args = (tuple(formats), self.config.byte_budget, self.config.min_quality, 95, self.config.encode_preset)
+        if self.config.encode_workers > 0:
+            # A plain in-memory copy pickles cleanly; file-backed images (PngImageFile) do not.
+            return _encode_pool(self.config.encode_workers).submit(search_encoding, image.copy(), *args).result()
+        return search_encoding(image, *args)
 
     def generate(self, prompt: str, aspect_ratio: str, alt_text: str) -> Path:
+        return self.render(prompt=prompt, aspect_ratio=aspect_ratio, alt_text=alt_text).path
+
+    def render(
+        self,
+        prompt: str,
+        aspect_ratio: str,
+        alt_text: str,
+        metrics: Metrics = NULL_METRICS,
+        budget: Optional[RunTracker] = None,
+    ) -> GeneratedImage:
         width, height = _parse_aspect_ratio(aspect_ratio, self.config.default_width, self.config.default_height)
-        out_png = self.assets_dir / self._filename_for_prompt(prompt, "png")
+        key = self._cache_key(prompt, width, height)
+
+        if self.cache is not None:
+            with metrics.span("image_cache.restore"):
+                restored = self._restore(key, width, height)
+            if restored is not None:
+                metrics.incr("images.cache_hits")
+                self.manifest.record(restored.path.name, source="cache")
+                if self.prompt_index is not None:
+                    self.prompt_index.add(key, self._reuse_group(width, height), prompt)
+                return restored
+            metrics.incr("images.cache_misses")
+
+        if self.prompt_index is not None and self.backend is not None:
+            similar = self._reuse_similar(prompt, width, height, metrics)
+            if similar is not None:
+                return similar
 
-        if os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"} or self._client is None:
-            self._generate_placeholder(prompt=prompt, width=width, height=height, out_path=out_png)
+        if os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"} or self.backend is None:
+            with metrics.span("generate.placeholder"):
+                source = SourceImage(image=self._generate_placeholder(prompt=prompt, width=width, height=height))
+            generated = False
         else:
-            self._generate_openai(prompt=prompt, width=width, height=height, out_path=out_png)
+            # Cache hits and similar-prompt reuse above are free; only API requests are charged.
+            started = time.monotonic()
+            try:
+                with metrics.span("generate.api"):
+                    source, generated = self._generate_backend(
+                        prompt=prompt, width=width, height=height, metrics=metrics, budget=budget
+                    )
+            except BudgetExceeded as e:
+                return self._degraded(key, prompt, width, height, e.reason, metrics)
+            if budget is not None:
+                budget.observe("image", time.monotonic() - started)
+            if not generated:
+                metrics.incr("images.fallback_placeholder")
+
+        # Lossy outputs either use the fixed quality or are searched to fit the byte budget.
+        budgeted: Dict[str, BudgetEncoding] = {}
+        companion = self._companion_candidates()[0]
+        if self.config.byte_budget > 0:
+            with metrics.span("encode.budget_search"):
+                if self.config.image_format in LOSSY_FORMATS:
+                    budgeted[self.config.image_format] = self._search(source.image, [self.config.image_format])
+                candidates = [c for c in self._companion_candidates() if c is not None]
+                if candidates:
+                    chosen = self._search(source.image, candidates)
+                    budgeted[chosen.fmt] = chosen
+                    companion = chosen.fmt
+            for enc in budgeted.values():
+                metrics.incr(f"encode.budget.{enc.fmt}")
+                metrics.incr("encode.budget_bytes", len(enc.data))
+                if not enc.within_budget:
+                    metrics.incr("encode.over_budget")
+        result, all_paths = self._layout(key, width, height, companion)
+        result.encodings = {fmt: enc.summary() for fmt, enc in budgeted.items()}
+        qualities = {fmt: enc.quality for fmt, enc in budgeted.items()}
+
+        # Every output is encoded from the one in-memory source and written atomically.
+        with metrics.span("encode"):
+            for fmt, path in self._outputs(key, companion).items():
+                if fmt in budgeted:
+                    atomic_write_bytes(path, budgeted[fmt].data)
+                else:
+                    self._write_encoded(path, source, fmt)
+        if result.variants:
+            with metrics.span("encode.variants"):
+                self._write_variants(source.image, result.variants, qualities)
+
+        # Placeholders are never cached so a later live run still asks the API.
+        if generated and self.cache is not None:
+            for path in all_paths:
+                self.cache.put(path)
+        if generated and self.prompt_index is not None:
+            self.prompt_index.add(key, self._reuse_group(width, height), prompt)
+
+        if self.config.lqip != "none":
+            from .lqip import compute_placeholder
+
+            with metrics.span("lqip"):
+                result.placeholder = compute_placeholder(source.image, self.config.lqip)
+        self.manifest.record(
+            result.path.name,
+            prompt=prompt,
+            model=self.config.image_model,
+            width=width,
+            height=height,
+            source="api" if generated else "placeholder",
+            lqip=result.placeholder,
+            lqip_kind=self.config.lqip if result.placeholder else None,
+            **({"encodings": result.encodings} if result.encodings else {}),
+        )
+        return result
+
+    def render_degraded(self, prompt: str, aspect_ratio: str, reason: str, metrics: Metrics = NULL_METRICS) -> GeneratedImage:
+        """A placeholder for a placement the run budget could not pay for (see :meth:`_degraded`)."""
+        width, height = _parse_aspect_ratio(aspect_ratio, self.config.default_width, self.config.default_height)
+        return self._degraded(self._cache_key(prompt, width, height), prompt, width, height, reason, metrics)
+
+    def _degraded(self, key: str, prompt: str, width: int, height: int, reason: str, metrics: Metrics) -> GeneratedImage:
+        # A single file named apart from the real image ("img-<key>-degraded.png"), so a later run
+        # never mistakes it for a generated one; no companions, variants or LQIP.
+        metrics.incr("images.degraded")
+        with metrics.span("generate.placeholder"):
+            image = self._generate_placeholder(prompt=prompt, width=width, height=height)
+        path = self.assets_dir / f"img-{key[:16]}-degraded.{self.config.image_format}"
+        # Written under time pressure, so always with the fastest encoder settings.
+        data = encode_image(SourceImage(image=image), self.config.image_format, "speed", self.config.webp_quality)
+        atomic_write_bytes(path, data)
+        self.manifest.record(
+            path.name,
+            prompt=prompt,
+            model=self.config.image_model,
+            width=width,
+            height=height,
+            source="degraded",
+            degraded=reason,
+        )
+        return GeneratedImage(path=path, width=width, height=height, degraded=reason)
+
+    def _outputs(self, key: str, companion: Optional[str]) -> Dict[str, Path]:
+        return {fmt: self.assets_dir / self._filename_for_key(key, fmt) for fmt in self._output_formats(companion)}
+
+    def _layout(self, key: str, width: int, height: int, companion: Optional[str]) -> Tuple[GeneratedImage, List[Path]]:
+        outputs = self._outputs(key, companion)
+        widths = sorted({w for w in self.config.responsive_widths if 0 < w < width}, reverse=True)
+        result = GeneratedImage(
+            path=outputs[self.config.image_format],
+            width=width,
+            height=height,
+            variants={
+                fmt: [(w, self.assets_dir / self._variant_filename(key, w, fmt)) for w in widths]
+                for fmt in outputs
+            }
+            if widths
+            else {},
+        )
+        all_paths = list(outputs.values()) + [p for paths in result.variants.values() for _, p in paths]
+        return result, all_paths
+
+    def _restore(self, key: str, width: int, height: int, on_disk: bool = False) -> Optional[GeneratedImage]:
+        """The image for ``key`` if all its files are in the assets dir (``on_disk``) or the cache."""
+        for companion in self._companion_candidates():
+            result, all_paths = self._layout(key, width, height, companion)
+            if on_disk and all(p.exists() for p in all_paths):
+                break
+            if self.cache is not None and self.cache.restore((p.name for p in all_paths), self.assets_dir):
+                break
+        else:
+            return None
+        result.placeholder = self._cached_placeholder(result.path)
+        result.encodings = (self.manifest.get(result.path.name) or {}).get("encodings", {})
+        return result
 
-        if self.config.compress_webp:
-            self._to_webp(out_png, quality=self.config.webp_quality)
+    def _reuse_similar(self, prompt: str, width: int, height: int, metrics: Metrics) -> Optional[GeneratedImage]:
+        assert self.prompt_index is not None
+        with metrics.span("prompt_index.lookup"):
+            match = self.prompt_index.lookup(prompt, self._reuse_group(width, height), self.config.reuse_threshold)
+        if match is None:
+            return None
+        key, original, score = match
+        result = self._restore(key, width, height, on_disk=True)
+        if result is None:
+            # Files were removed since they were indexed; forget them and generate afresh.
+            self.prompt_index.discard(key)
+            return None
+        metrics.incr("images.reused_similar")
+        entry = self.manifest.get(result.path.name) or {}
+        reused_for = [r for r in entry.get("reused_for", []) if r.get("prompt") != prompt]
+        reused_for.append({"prompt": prompt, "similarity": round(score, 3)})
+        self.manifest.record(result.path.name, reused_for=reused_for)
+        return result
+
+    def _cached_placeholder(self, path: Path) -> Optional[str]:
+        if self.config.lqip == "none":
+            return None
+        entry = self.manifest.get(path.name) or {}
+        if entry.get("lqip_kind") == self.config.lqip and entry.get("lqip"):
+            return entry["lqip"]
+        from PIL import Image
+
+        from .lqip import compute_placeholder
+
+        with Image.open(path) as image:
+            placeholder = compute_placeholder(image, self.config.lqip)
+        self.manifest.record(path.name, lqip=placeholder, lqip_kind=self.config.lqip)
+        return placeholder
+
+    def _write_variants(
+        self, image: Image.Image, variants: Dict[str, List[Tuple[int, Path]]], qualities: Dict[str, int]
+    ) -> None:
+        # Resize widest-first, each step from the previous (larger) variant instead of the full image.
+        widths = [w for w, _ in next(iter(variants.values()))]
+        from PIL import Image
+
+        resized: Dict[int, Image.Image] = {}
+        current = image
+        for w in widths:
+            current = current.resize((w, max(1, round(image.height * w / image.width))), Image.LANCZOS)
+            resized[w] = current
+
+        # Encoders release the GIL, so the per-variant encodes run in parallel.
+        jobs = [(fmt, w, path) for fmt, paths in variants.items() for w, path in paths]
+        with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+            # Variants reuse the quality the budget search settled on for their format.
+            futures = [
+                pool.submit(self._write_encoded, path, SourceImage(image=resized[w]), fmt, qualities.get(fmt))
+                for fmt, w, path in jobs
+            ]
+            for f in futures:
+                f.result()
+
+    def _write_encoded(self, path: Path, source: SourceImage, fmt: str, quality: Optional[int] = None) -> None:
+        quality = quality if quality is not None else self.config.webp_quality
+        atomic_write_bytes(path, encode_image(source, fmt, self.config.encode_preset, quality))
 
-        return out_png
+    def _generate_backend(
+        self, prompt: str, width: int, height: int, metrics: Metrics = NULL_METRICS, budget: Optional[RunTracker] = None
+    ) -> Tuple[SourceImage, bool]:
+        """The image from the backend, or a placeholder (``False``) once retries are exhausted.
 
-    def _generate_openai(self, prompt: str, width: int, height: int, out_path: Path) -> None:
-        size = f"{width}x{height}"
+        With a run budget every attempt is charged and carries the time left as its timeout;
+        :class:`BudgetExceeded` is raised when the budget, not the API, stopped the request.
+        """
         try:
-            assert self._client is not None
-            resp = self._client.images.generate(
-                model=self.config.image_model,
-                prompt=prompt,
-                size=size,
-            )
-            b64 = resp.data[0].b64_json
-            image_bytes = base64.b64decode(b64)
-            out_path.write_bytes(image_bytes)
-        except Exception as e:  # Fallback to placeholder
-            self._generate_placeholder(prompt=prompt, width=width, height=height, out_path=out_path)
+            backend = self.backend
+            assert backend is not None
+
+            # Ask for the nearest size the model accepts, then crop/resize to the exact target.
+            sizes = self.config.api_sizes or supported_sizes(self.config.image_model)
+            api_width, api_height = nearest_size(width, height, sizes)
+
+            def request() -> bytes:
+                if budget is None:
+                    return backend.generate_image(self.config.image_model, prompt, api_width, api_height)
+                budget.charge("image")
+                return backend.generate_image(
+                    self.config.image_model, prompt, api_width, api_height, timeout=budget.timeout("image")
+                )
+
+            deadline = budget.deadline if budget is not None and budget.has_deadline else None
+            if self.scheduler is not None:
+                data = self.scheduler.call(request, images=1, metrics=metrics, deadline=deadline)
+            else:
+                data = request()
+            source = SourceImage(data=data)
+            if source.size != (width, height):
+                with metrics.span("generate.fit"):
+                    source = SourceImage(image=fit_image(source.image, width, height))
+                metrics.incr("images.fitted")
+            return source, True
+        except BudgetExceeded:
+            raise
+        except Exception as e:  # Fallback to placeholder once retries are exhausted
+            if budget is not None and budget.has_deadline and budget.remaining() <= 0:
+                raise BudgetExceeded("deadline") from e
+            return SourceImage(image=self._generate_placeholder(prompt=prompt, width=width, height=height)), False
+
+    def _generate_placeholder(self, prompt: str, width: int, height: int) -> Image.Image:
+        from PIL import Image, ImageDraw, ImageFont
 
-    def _generate_placeholder(self, prompt: str, width: int, height: int, out_path: Path) -> None:
         image = Image.new("RGB", (width, height), color=(240, 243, 247))
         draw = ImageDraw.Draw(image)
 
@@ -97,16 +604,7 @@ class ImageGenerator:
             draw.text((margin, y), line, fill=(60, 60, 60), font=font)
             y += 16
 
-        image.save(out_path)
-
-    def _to_webp(self, png_path: Path, quality: int) -> Optional[Path]:
-        try:
-            image = Image.open(png_path)
-            webp_path = png_path.with_suffix(".webp")
-            image.save(webp_path, format="WEBP", quality=quality, method=6)
-            return webp_path
-        except Exception:
-            return None
+        return image
 
 
 def _wrap_text(text: str, line_length: int = 40):
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .markdown_utils import Anchor, Document
+from .planner import Placement
+
+STATE_VERSION = 1
+
+# (hash of the enclosing section's text, index of the anchor within that section)
+Fingerprint = Tuple[str, int]
+
+
+def state_path_for(input_path: Path) -> Path:
+    return input_path.with_name(input_path.name + ".ai-images.json")
+
+
+def section_fingerprints(doc: Document) -> List[Fingerprint]:
+    """Fingerprint every anchor by the text of the section (heading to next heading) it lives in."""
+    anchors = doc.anchors
+    starts = [a.start_line for a in anchors if a.kind == "heading"]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(doc.lines)]
+
+    section_hashes: List[str] = []
+    for start, end in zip(bounds, bounds[1:]):
+        text = doc.line_span(start, end).strip()
+        section_hashes.append(hashlib.sha256(text.encode("utf-8")).hexdigest()[:20])
+
+    fingerprints: List[Fingerprint] = []
+    section = 0
+    offset = 0
+    for a in anchors:
+        while section + 1 < len(starts) and a.start_line >= starts[section + 1]:
+            section += 1
+            offset = 0
+        fingerprints.append((section_hashes[section], offset))
+        offset += 1
+    return fingerprints
+
+
+@dataclass
+class PriorPlacement:
+    section_hash: str
+    offset: int
+    placement: Placement
+    image_path: str  # relative to the post's folder
+
+
+@dataclass
+class IncrementalState:
+    settings: Dict[str, object]
+    sections: List[str] = field(default_factory=list)
+    placements: List[PriorPlacement] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IncrementalState"]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != STATE_VERSION:
+                return None
+            return cls(
+                settings=data["settings"],
+                sections=list(data["sections"]),
+                placements=[
+                    PriorPlacement(
+                        section_hash=p["section_hash"],
+                        offset=int(p["offset"]),
+                        placement=Placement(**p["placement"]),
+                        image_path=p["image_path"],
+                    )
+                    for p in data["placements"]
+                ],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "version": STATE_VERSION,
+            "settings": self.settings,
+            "sections": self.sections,
+            "placements": [
+                {
+                    "section_hash": p.section_hash,
+                    "offset": p.offset,
+                    "placement": asdict(p.placement),
+                    "image_path": p.image_path,
+                }
+                for p in self.placements
+            ],
+        }
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+@dataclass
+class IncrementalDiff:
+    # Prior placements whose section is unchanged, re-pointed at the current anchor ids.
+    reused: List[PriorPlacement]
+    # Anchors in new or edited sections that still need planning.
+    dirty_anchors: List[Anchor]
+
+
+def diff_against_state(state: IncrementalState, anchors: List[Anchor], fingerprints: List[Fingerprint]) -> IncrementalDiff:
+    current = {fp: a for fp, a in zip(fingerprints, anchors)}
+    known_sections = set(state.sections)
+
+    reused: List[PriorPlacement] = []
+    for prior in state.placements:
+        anchor = current.get((prior.section_hash, prior.offset))
+        if anchor is None:
+            continue
+        placement = Placement(**{**asdict(prior.placement), "anchor_id": anchor.anchor_id})
+        reused.append(PriorPlacement(prior.section_hash, prior.offset, placement, prior.image_path))
+
+    dirty = [a for fp, a in zip(fingerprints, anchors) if fp[0] not in known_sections]
+    return IncrementalDiff(reused=reused, dirty_anchors=dirty)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import html
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
-from .markdown_utils import Anchor, insert_block_after_line
+from .markdown_utils import Anchor, insert_blocks_after_lines
 
 
 @dataclass
@@ -13,8 +14,68 @@ class ImageBlock:
     insertion_line: int
 
 
-def _build_image_block(image_rel_path: str, alt_text: str, caption: str | None, anchor_id: str) -> str:
-    md_img = f"![{alt_text}]({image_rel_path}) <!-- ai-image anchor:{anchor_id} -->"
+@dataclass
+class ImageSource:
+    """An image emitted as HTML: the full-size file plus optional responsive variants and placeholder.
+
+    Paths are relative to the post.
+    """
+
+    src: str
+    width: int
+    height: int
+    # Candidates per format, widest first and including the full size,
+    # e.g. {"webp": [("assets/img-x.webp", 1280), ("assets/img-x-480w.webp", 480)]}
+    srcsets: dict[str, List[Tuple[str, int]]] = field(default_factory=dict)
+    # LQIP: an inline "data:" URI or a BlurHash string
+    placeholder: Optional[str] = None
+    placeholder_style: str = "attribute"  # "attribute" (data-lqip/data-blurhash) or "style" (inline background)
+
+
+_MIME_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg", "jpg": "image/jpeg", "avif": "image/avif"}
+
+
+def _srcset_attr(candidates: List[Tuple[str, int]]) -> str:
+    return ", ".join(f"{html.escape(path)} {width}w" for path, width in candidates)
+
+
+def _placeholder_attr(image: ImageSource) -> str:
+    if not image.placeholder:
+        return ""
+    if not image.placeholder.startswith("data:"):
+        return f' data-blurhash="{html.escape(image.placeholder)}"'
+    if image.placeholder_style == "style":
+        return f' style="background-size:cover;background-image:url({image.placeholder})"'
+    return f' data-lqip="{image.placeholder}"'
+
+
+def _build_picture(image: ImageSource, alt_text: str) -> str:
+    src_ext = image.src.rsplit(".", 1)[-1].lower()
+    attrs = (
+        f'alt="{html.escape(alt_text)}" width="{image.width}" height="{image.height}" '
+        f'loading="lazy" decoding="async"{_placeholder_attr(image)}'
+    )
+    if not image.srcsets:
+        return f'<img src="{html.escape(image.src)}" {attrs}>'
+
+    sizes = f"(max-width: {image.width}px) 100vw, {image.width}px"
+    sources = "".join(
+        f'<source type="{_MIME_TYPES.get(fmt, "image/" + fmt)}" srcset="{_srcset_attr(candidates)}" sizes="{sizes}">'
+        for fmt, candidates in image.srcsets.items()
+        if fmt != src_ext
+    )
+    img_srcset = _srcset_attr(image.srcsets.get(src_ext, [(image.src, image.width)]))
+    img = f'<img src="{html.escape(image.src)}" srcset="{img_srcset}" sizes="{sizes}" {attrs}>'
+    return f"<picture>{sources}{img}</picture>"
+
+
+def _build_image_block(
+    image_rel_path: Union[str, ImageSource], alt_text: str, caption: str | None, anchor_id: str
+) -> str:
+    if isinstance(image_rel_path, ImageSource):
+        md_img = f"{_build_picture(image_rel_path, alt_text)} <!-- ai-image anchor:{anchor_id} -->"
+    else:
+        md_img = f"![{alt_text}]({image_rel_path}) <!-- ai-image anchor:{anchor_id} -->"
     if caption:
         return md_img + "\n" + f"*{caption}*"
     return md_img
@@ -23,8 +84,9 @@ def _build_image_block(image_rel_path: str, alt_text: str, caption: str | None,
 def plan_insertions(
     original_markdown: str,
     anchors: List[Anchor],
-    placements: List[tuple[str, str, str | None]],
-    # Each placement: (anchor_id, image_rel_path, caption)
+    placements: List[tuple[str, Union[str, ImageSource], str | None]],
+    # Each placement: (anchor_id, image_rel_path or ImageSource, caption)
+    lines: Optional[List[str]] = None,
 ) -> str:
     anchor_map = {a.anchor_id: a for a in anchors}
 
@@ -36,11 +98,4 @@ def plan_insertions(
         block_text = _build_image_block(image_rel_path=image_rel_path, alt_text=f"{anchor.text[:120]}", caption=caption, anchor_id=anchor_id)
         blocks.append(ImageBlock(markdown=block_text, insertion_line=anchor.end_line))
 
-    # Sort by insertion line descending to avoid shifting as we mutate the doc
-    blocks.sort(key=lambda b: b.insertion_line, reverse=True)
-
-    result = original_markdown
-    for block in blocks:
-        result = insert_block_after_line(result, block.insertion_line, block.markdown)
-
-    return result
\ No newline at end of file
+    return insert_blocks_after_lines(original_markdown, ((b.insertion_line, b.markdown) for b in blocks), lines=lines)
\ No newline at end of file
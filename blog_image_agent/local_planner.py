@@ -0,0 +1,119 @@
+"""Offline planner: scores every anchor of a post at once with NumPy and picks placements
+greedily under a spacing constraint. No API calls, so it suits bulk backfills.
+
+NumPy is an optional dependency and is imported on first use.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Dict, List
+
+from .digest import content_terms
+from .markdown_utils import Anchor
+
+if TYPE_CHECKING:
+    from .planner import Placement
+
+# Prompt templates per anchor kind; {text} is the anchor text, {title} the post title.
+PROMPT_TEMPLATES: Dict[str, str] = {
+    "heading": (
+        "Illustrative concept art for: {text}, in a post about {title}. "
+        "Clean, editorial, modern, high-detail, soft lighting, depth of field."
+    ),
+    "paragraph": (
+        "Diagrammatic illustration of: {text}. Minimalist, editorial, vector-art style, white background."
+    ),
+}
+ASPECT_RATIOS: Dict[str, str] = {"heading": "16:9", "paragraph": "4:3"}
+
+# Score weights: structure, section length, title keyword density, and the penalty for
+# landing close to an already chosen image (relative to an even spread).
+W_STRUCTURE = 1.0
+W_LENGTH = 0.8
+W_KEYWORDS = 0.6
+W_SPREAD = 0.7
+# Paragraphs shorter than this (raw words of the anchor text, which is cut at 220 characters,
+# about 35 words) would sandwich an image between two sentences.
+MIN_PARAGRAPH_WORDS = 20
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:  # pragma: no cover - optional dependency
+        raise RuntimeError(
+            "numpy is not installed; pip install 'blog-image-agent[local-planner]' (or numpy), or use PLANNER=llm"
+        ) from e
+    return np
+
+
+def plan_local(anchors: List[Anchor], blog_title: str, max_images: int, min_gap: int = 2) -> List[Placement]:
+    """Pick up to ``max_images`` anchors to illustrate, in document order.
+
+    Headings are scored by level, by the length of the section they open and by how often it
+    mentions the title's keywords; long paragraphs score on length and keywords. Choices are
+    made greedily, never within ``min_gap`` anchors of each other (no back-to-back images), and
+    each pick lowers the score of anchors near it so images spread over the post.
+    """
+    from .planner import Placement
+
+    if max_images <= 0 or not anchors:
+        return []
+    np = _numpy()
+
+    n = len(anchors)
+    is_heading = np.fromiter((a.kind == "heading" for a in anchors), dtype=bool, count=n)
+    level = np.fromiter((a.level or 0 for a in anchors), dtype=np.int64, count=n)
+    terms = [content_terms(a.text) for a in anchors]
+    words = np.fromiter((len(t) for t in terms), dtype=np.float64, count=n)
+    title_terms = set(content_terms(blog_title))
+    hits = np.fromiter((sum(1 for w in t if w in title_terms) for t in terms), dtype=np.float64, count=n)
+
+    # Sections start at each H1-H3 heading; sum words and keyword hits per section.
+    starts = is_heading & (level <= 3)
+    section = np.cumsum(starts) - int(starts[0])
+    section_words = np.bincount(section, weights=words)
+    section_hits = np.bincount(section, weights=hits)
+    body_words = np.where(starts, section_words[section] - words, words)
+    density = np.where(starts, section_hits[section], hits) / np.maximum(1.0, np.where(starts, section_words[section], words))
+
+    structure = np.where(is_heading, np.select([level == 2, level == 3, level == 1], [1.0, 0.7, 0.2], 0.3), 0.35)
+    length = np.log1p(body_words) / math.log1p(max(1.0, float(body_words.max())))
+    keywords = density / max(1e-9, float(density.max())) if density.max() > 0 else density
+    score = W_STRUCTURE * structure + W_LENGTH * length + W_KEYWORDS * keywords
+
+    # Anchors nothing can follow usefully: the title, empty headings, and short paragraphs
+    # (including a short intro). Counted in raw words: stopword-free terms are about half that.
+    raw_words = np.fromiter((len(a.text.split()) for a in anchors), dtype=np.int64, count=n)
+    eligible = np.where(is_heading, (level >= 2) & (words > 0), raw_words >= MIN_PARAGRAPH_WORDS)
+    eligible[0] &= not (is_heading[0] and level[0] == 1)
+    score = np.where(eligible, score, -np.inf)
+
+    position = np.arange(n, dtype=np.float64)
+    scale = n / (max_images + 1)
+    penalty = np.zeros(n)
+    chosen: List[int] = []
+    for _ in range(min(max_images, n)):
+        i = int(np.argmax(score - penalty))
+        if not np.isfinite(score[i]):
+            break
+        chosen.append(i)
+        score[max(0, i - min_gap + 1) : i + min_gap] = -np.inf
+        penalty = np.maximum(penalty, W_SPREAD * np.exp(-np.abs(position - i) / scale))
+
+    title = blog_title.strip() or "this post"
+    placements = []
+    for i in sorted(chosen):
+        a = anchors[i]
+        text = a.text if a.kind == "heading" else a.text[:120].rstrip() + ("…" if len(a.text) > 120 else "")
+        placements.append(
+            Placement(
+                anchor_id=a.anchor_id,
+                position="after",
+                prompt=PROMPT_TEMPLATES[a.kind].format(text=text, title=title),
+                alt_text=f"Illustration: {a.text}"[:120] if a.kind == "heading" else "Editorial diagram",
+                caption=None,
+                aspect_ratio=ASPECT_RATIOS[a.kind],
+            )
+        )
+    return placements
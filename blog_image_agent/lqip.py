@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import base64
+import io
+import math
+from typing import List, Tuple
+
+from PIL import Image
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+_SRGB_TO_LINEAR = [
+    (v / 255) / 12.92 if v / 255 <= 0.04045 else (((v / 255) + 0.055) / 1.055) ** 2.4 for v in range(256)
+]
+
+
+def _thumbnail(image: Image.Image, width: int) -> Image.Image:
+    height = max(1, round(image.height * width / max(1, image.width)))
+    # BOX is the cheapest filter that still averages every source pixel.
+    return image.convert("RGB").resize((width, height), Image.BOX)
+
+
+def webp_placeholder(image: Image.Image, width: int = 20, quality: int = 40) -> str:
+    """A tiny blurred WebP preview as a ``data:`` URI (typically well under 1 KB)."""
+    buf = io.BytesIO()
+    _thumbnail(image, width).save(buf, format="WEBP", quality=quality, method=0)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(_BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exp: float) -> float:
+    return math.copysign(abs(value) ** exp, value)
+
+
+def blurhash(image: Image.Image, x_components: int = 4, y_components: int = 3, sample_width: int = 32) -> str:
+    """Encode a BlurHash (https://blurha.sh) from a small downscaled copy of ``image``."""
+    small = _thumbnail(image, sample_width)
+    width, height = small.size
+    data = small.tobytes()
+    pixels = [
+        (_SRGB_TO_LINEAR[data[k]], _SRGB_TO_LINEAR[data[k + 1]], _SRGB_TO_LINEAR[data[k + 2]]) for k in range(0, len(data), 3)
+    ]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(y_components):
+        for i in range(x_components):
+            norm = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                cy = cos_y[j][y]
+                row = pixels[y * width : (y + 1) * width]
+                cx = cos_x[i]
+                for x, (pr, pg, pb) in enumerate(row):
+                    basis = cx[x] * cy
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * norm, g * norm, b * norm))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        max_ac = max(abs(c) for f in ac for c in f)
+        quantized_max = max(0, min(82, int(math.floor(max_ac * 166 - 0.5))))
+        max_value = (quantized_max + 1) / 166
+        result += _encode83(quantized_max, 1)
+    else:
+        max_value = 1.0
+        result += _encode83(0, 1)
+
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for f in ac:
+        q = [max(0, min(18, int(math.floor(_sign_pow(c / max_value, 0.5) * 9 + 9.5)))) for c in f]
+        result += _encode83(q[0] * 19 * 19 + q[1] * 19 + q[2], 2)
+    return result
+
+
+def compute_placeholder(image: Image.Image, kind: str) -> str | None:
+    if kind == "webp":
+        return webp_placeholder(image)
+    if kind == "blurhash":
+        return blurhash(image)
+    return None
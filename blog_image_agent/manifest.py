@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .cache import atomic_write_bytes
+
+
+class AssetManifest:
+    """Per-assets-dir record of generated images (prompt, size, placeholder, ...), keyed by file name.
+
+    Updates are kept in memory and written by :meth:`flush`, which merges with the file on disk
+    so several processes can share one assets dir.
+    """
+
+    FILE_NAME = "assets-manifest.json"
+
+    def __init__(self, assets_dir: str | Path):
+        self.path = Path(assets_dir) / self.FILE_NAME
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._read()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("images", {}) if isinstance(data, dict) else {}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def record(self, name: str, **fields: Any) -> None:
+        with self._lock:
+            entry = {**self._entries.get(name, {}), **fields}
+            self._entries[name] = entry
+            self._dirty[name] = entry
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read()
+            merged.update(self._dirty)
+            self._entries = {**merged, **self._entries}
+            self._dirty = {}
+            payload = json.dumps({"version": 1, "images": self._entries}, indent=2, sort_keys=True, ensure_ascii=False)
+            atomic_write_bytes(self.path, payload.encode("utf-8"))
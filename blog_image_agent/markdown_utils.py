@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Literal, Optional, Tuple
+from functools import lru_cache
+from itertools import accumulate
+from typing import TYPE_CHECKING, Dict, Iterable, List, Literal, Optional, Sequence, Tuple
 
-from markdown_it import MarkdownIt
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+    from markdown_it.token import Token
 
 
-@dataclass
+@dataclass(slots=True)
 class Anchor:
     anchor_id: str
     kind: Literal["heading", "paragraph"]
@@ -16,14 +20,52 @@ class Anchor:
     end_line: int
 
 
+@lru_cache(maxsize=1)
 def build_markdown_parser() -> MarkdownIt:
+    # Parsing does not mutate the parser, so one instance per process is shared by every call.
+    from markdown_it import MarkdownIt
+
     return MarkdownIt()
 
 
+class Document:
+    """A Markdown post parsed once and shared by extraction, planning and insertion."""
+
+    __slots__ = ("text", "lines", "tokens", "title", "anchors", "_line_offsets")
+
+    def __init__(self, text: str, lines: List[str], tokens: List[Token], title: str, anchors: List[Anchor]):
+        self.text = text
+        self.lines = lines
+        self.tokens = tokens
+        self.title = title
+        self.anchors = anchors
+        self._line_offsets: Optional[List[int]] = None
+
+    @classmethod
+    def parse(cls, text: str, default_title: str = "") -> "Document":
+        lines = text.splitlines()
+        tokens = build_markdown_parser().parse(text)
+        # Blog title is the first line when it is a heading
+        first_line = lines[0] if lines else ""
+        title = first_line.lstrip("# ").strip() if first_line.startswith("#") else default_title
+        return cls(text=text, lines=lines, tokens=tokens, title=title, anchors=anchors_from_tokens(tokens))
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """Character offset at which each line starts."""
+        if self._line_offsets is None:
+            self._line_offsets = [0, *accumulate(len(line) for line in self.text.splitlines(keepends=True))][: len(self.lines)]
+        return self._line_offsets
+
+    def line_span(self, start_line: int, end_line: int) -> str:
+        return "\n".join(self.lines[start_line:end_line])
+
+
 def extract_anchors(markdown_text: str) -> List[Anchor]:
-    md = build_markdown_parser()
-    tokens = md.parse(markdown_text)
+    return anchors_from_tokens(build_markdown_parser().parse(markdown_text))
+
 
+def anchors_from_tokens(tokens: Sequence[Token]) -> List[Anchor]:
     anchors: List[Anchor] = []
     running_index = 1
 
@@ -84,4 +126,58 @@ def insert_block_after_line(original_text: str, insertion_line: int, block: str)
     suffix_blank = [""] if insertion_index < len(lines) and (insertion_index >= len(lines) or lines[insertion_index].strip() != "") else []
 
     new_lines = lines[:insertion_index] + prefix_blank + [block] + suffix_blank + lines[insertion_index:]
-    return "\n".join(new_lines) + ("\n" if original_text.endswith("\n") else "")
\ No newline at end of file
+    return "\n".join(new_lines) + ("\n" if original_text.endswith("\n") else "")
+
+
+def insert_blocks_after_lines(
+    original_text: str,
+    blocks: Iterable[Tuple[int, str]],
+    lines: Optional[List[str]] = None,
+) -> str:
+    """Insert every ``(insertion_line, block)`` pair in a single pass.
+
+    Gives the same text as calling :func:`insert_block_after_line` once per block in
+    descending line order (ties keep their given order), but splits and joins the
+    document only once instead of once per block. ``lines`` may be passed when the
+    caller already holds ``original_text.splitlines()``.
+    """
+    ordered = sorted(blocks, key=lambda b: b[0], reverse=True)
+    if not ordered:
+        return original_text
+
+    if lines is None:
+        lines = original_text.splitlines()
+    n = len(lines)
+    # Lines spliced in front of original line i, and after the last original line.
+    before: Dict[int, List[str]] = {}
+    tail: List[str] = []
+
+    for insertion_line, block in ordered:
+        # A block is re-split on the next pass of the one-at-a-time algorithm, so treat it as its lines.
+        block_lines = (block + "\n").splitlines()
+        insertion_line = max(0, insertion_line)
+        if insertion_line >= n:
+            # Blocks past the end are handled first (descending order), so only the tail has grown.
+            pos = min(len(tail), insertion_line - n)
+            prev = tail[pos - 1] if pos > 0 else (lines[n - 1] if n else None)
+            nxt = tail[pos] if pos < len(tail) else None
+            target, at = tail, pos
+        else:
+            pos = insertion_line
+            target, at = before.setdefault(pos, []), 0
+            prev = lines[pos - 1] if pos > 0 else None
+            nxt = target[0] if target else lines[pos]
+
+        # Ensure surrounding blank line for readability
+        prefix_blank = [""] if prev is not None and prev.strip() != "" else []
+        suffix_blank = [""] if nxt is not None and nxt.strip() != "" else []
+        target[at:at] = prefix_blank + block_lines + suffix_blank
+
+    new_lines: List[str] = []
+    for i, line in enumerate(lines):
+        group = before.get(i)
+        if group:
+            new_lines.extend(group)
+        new_lines.append(line)
+    new_lines.extend(tail)
+    return "\n".join(new_lines) + ("\n" if original_text.endswith("\n") else "")
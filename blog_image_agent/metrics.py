@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import io
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+
+class Metrics:
+    """Stage spans and counters for one pipeline run; safe to share across worker threads.
+
+    Spans with the same name accumulate (e.g. one ``generate`` span per image), so the report
+    shows count, total and max time per stage.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.setdefault(name, []).append(seconds)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"count": len(d), "total_ms": sum(d) * 1000, "max_ms": max(d) * 1000}
+                    for name, d in self.spans.items()
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+def merge_metrics(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine several :meth:`Metrics.to_dict` reports (e.g. one per post of a batch)."""
+    spans: Dict[str, Dict[str, float]] = {}
+    counters: Dict[str, int] = {}
+    for report in reports:
+        for name, s in report.get("spans", {}).items():
+            agg = spans.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            agg["count"] += s["count"]
+            agg["total_ms"] += s["total_ms"]
+            agg["max_ms"] = max(agg["max_ms"], s["max_ms"])
+        for name, value in report.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+    return {"spans": spans, "counters": dict(sorted(counters.items()))}
+
+
+class _NullMetrics(Metrics):
+    """Disabled metrics: every call is a no-op returning shared objects, so instrumented code pays ~nothing."""
+
+    enabled = False
+    _NULL_SPAN: ContextManager[None] = nullcontext()
+
+    def __init__(self) -> None:
+        pass
+
+    def span(self, name: str) -> ContextManager[None]:  # type: ignore[override]
+        return self._NULL_SPAN
+
+    def add_span(self, name: str, seconds: float) -> None:
+        pass
+
+    def incr(self, name: str, value: int = 1) -> None:
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"spans": {}, "counters": {}}
+
+
+NULL_METRICS: Metrics = _NullMetrics()
+
+
+@contextmanager
+def profiled(kind: Optional[str], output: Optional[str] = None) -> Iterator[None]:
+    """Run the enclosed block under cProfile or pyinstrument (optional dependency).
+
+    With ``output`` the profile is saved there (pstats file, or pyinstrument HTML/text by
+    extension); otherwise a short report goes to stderr.
+    """
+    if not kind:
+        yield
+        return
+    if kind == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if output:
+                profiler.dump_stats(output)
+            else:
+                buf = io.StringIO()
+                pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(25)
+                sys.stderr.write(buf.getvalue())
+        return
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler  # type: ignore
+        except ImportError as e:  # pragma: no cover - optional dependency
+            raise RuntimeError("pyinstrument is not installed; pip install pyinstrument or use --profile cprofile") from e
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html() if output.endswith(".html") else profiler.output_text())
+            else:
+                sys.stderr.write(profiler.output_text())
+        return
+    raise ValueError(f"Unknown profiler: {kind} (expected cprofile or pyinstrument)")
@@ -1,21 +1,203 @@
 from __future__ import annotations
 
+import asyncio
+import glob
 import os
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, astuple, dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
+from .backends import Backend, get_backend
+from .budget import RunBudget, RunTracker
 from .config import AgentConfig
-from .image_gen import ImageGenConfig, ImageGenerator
-from .markdown_utils import extract_anchors
-from .planner import Placement, plan_placements
-from .inserter import plan_insertions
+from .events import AnchorsExtracted, Event, ImageGenerated, MarkdownWritten, PlanReady
+from .image_gen import GeneratedImage, ImageGenConfig, ImageGenerator
+from .incremental import IncrementalState, PriorPlacement, diff_against_state, section_fingerprints, state_path_for
+from .markdown_utils import Anchor, Document
+from .metrics import NULL_METRICS, Metrics
+from .plan_cache import PlanCache, default_plan_cache_dir
+from .planner import Placement, _heuristic_plan, plan_placements, spread_placements
+from .scheduler import RequestScheduler, get_scheduler
+from .sizes import parse_sizes
+from .inserter import ImageSource, plan_insertions
 
 
 @dataclass
 class PipelineResult:
     output_markdown_path: Path
     image_paths: List[Path]
+    plan_cache_hits: int = 0
+    plan_cache_misses: int = 0
+    reused_placements: int = 0
+    # Stage spans and counters (see metrics.Metrics.to_dict); None unless config.metrics is on
+    metrics: Optional[Dict[str, Any]] = None
+    # What a run budget cut short: {"stage": "plan" | "image", "reason": ..., "anchor_id": ...}
+    degraded: List[Dict[str, Any]] = field(default_factory=list)
+    # Time, calls and estimated cost spent (see budget.RunTracker.summary); None without a budget
+    run_budget: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class BatchItemResult:
+    input_path: Path
+    output_markdown_path: Optional[Path] = None
+    image_paths: List[Path] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    plan_cache_hits: int = 0
+    metrics: Optional[Dict[str, Any]] = None
+    degraded: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Generators are cached per process so repeated posts (batch workers, long-lived callers)
+# reuse one warm OpenAI client instead of constructing a new one per post. The key holds the
+# scheduler and backend themselves (not their id(), which can be recycled once one is freed),
+# and the least recently used generators are dropped beyond MAX_CACHED_GENERATORS.
+MAX_CACHED_GENERATORS = 16
+_GENERATORS: OrderedDict[Tuple[str, tuple, RequestScheduler, Optional[Backend]], ImageGenerator] = OrderedDict()
+_GENERATORS_LOCK = threading.Lock()
+
+
+def _get_generator(
+    gen_config: ImageGenConfig, assets_root: str, scheduler: RequestScheduler, backend: Optional[Backend] = None
+) -> ImageGenerator:
+    key = (str(Path(assets_root).resolve()), astuple(gen_config), scheduler, backend)
+    with _GENERATORS_LOCK:
+        gen = _GENERATORS.get(key)
+        if gen is not None:
+            _GENERATORS.move_to_end(key)
+            return gen
+    gen = ImageGenerator(config=gen_config, assets_dir=assets_root, scheduler=scheduler, backend=backend)
+    with _GENERATORS_LOCK:
+        gen = _GENERATORS.setdefault(key, gen)
+        while len(_GENERATORS) > MAX_CACHED_GENERATORS:
+            _GENERATORS.popitem(last=False)
+    return gen
+
+
+def _get_scheduler(config: AgentConfig) -> RequestScheduler:
+    return get_scheduler(
+        config.requests_per_minute,
+        config.images_per_minute,
+        config.api_max_retries,
+        config.retry_base_delay,
+        config.retry_max_delay,
+    )
+
+
+_PLAN_CACHES: Dict[Tuple[str, int, int], PlanCache] = {}
+
+
+def _get_plan_cache(config: AgentConfig) -> Optional[PlanCache]:
+    if not config.plan_cache:
+        return None
+    key = (config.plan_cache_dir or default_plan_cache_dir(), config.plan_cache_ttl_seconds, config.plan_cache_max_entries)
+    cache = _PLAN_CACHES.get(key)
+    if cache is None:
+        cache = PlanCache(*key)
+        _PLAN_CACHES[key] = cache
+    return cache
+
+
+def _iter_generated_images(
+    gen: ImageGenerator,
+    placements: List[Placement],
+    max_concurrency: int,
+    metrics: Metrics = NULL_METRICS,
+    budget: Optional[RunTracker] = None,
+) -> Iterator[Tuple[int, GeneratedImage, float]]:
+    """Yield ``(index, image, elapsed_ms)`` for each placement as its image completes.
+
+    With a deadline, requests start in planner order while time allows and carry the time left
+    as their timeout, so in-flight calls end by the deadline and their workers write placeholders.
+    """
+
+    def render(p: Placement) -> Tuple[GeneratedImage, float]:
+        started = time.perf_counter()
+        with metrics.span("generate.image"):
+            image = gen.render(
+                prompt=p.prompt, aspect_ratio=p.aspect_ratio, alt_text=p.alt_text, metrics=metrics, budget=budget
+            )
+        return image, (time.perf_counter() - started) * 1000
+
+    timed = budget is not None and budget.has_deadline
+    if (max_concurrency <= 1 or len(placements) <= 1) and not timed:
+        for i, p in enumerate(placements):
+            yield (i, *render(p))
+        return
+
+    # Identical (prompt, aspect_ratio) pairs map to the same file, so submit each once
+    # to avoid two workers writing the same path.
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(placements))))
+    try:
+        futures: Dict[Tuple[str, str], Future[Tuple[GeneratedImage, float]]] = {}
+        indices: Dict[Future[Tuple[GeneratedImage, float]], List[int]] = {}
+        for i, p in enumerate(placements):
+            key = (p.prompt, p.aspect_ratio)
+            if key not in futures:
+                futures[key] = pool.submit(render, p)
+            indices.setdefault(futures[key], []).append(i)
+        pending = set(indices)
+        started = time.perf_counter()
+        while pending:
+            # Workers get part of the reserve to turn a timed-out request into a placeholder.
+            timeout = budget.remaining() + budget.budget.reserve_seconds / 2 if timed and budget is not None else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for f in done:
+                image, elapsed_ms = f.result()
+                for i in indices[f]:
+                    yield i, image, elapsed_ms
+            if not done:
+                # A backend that ignored its timeout: stop waiting so the Markdown is still on time.
+                for f in sorted(pending, key=lambda f: indices[f][0]):
+                    f.cancel()
+                    p = placements[indices[f][0]]
+                    image = gen.render_degraded(p.prompt, p.aspect_ratio, "deadline", metrics=metrics)
+                    for i in indices[f]:
+                        yield i, image, (time.perf_counter() - started) * 1000
+                pending = set()
+    finally:
+        # Also drops queued images when the consumer stops iterating early.
+        pool.shutdown(wait=not timed, cancel_futures=True)
+
+
+def _is_finished_image(gen: ImageGenerator, path: Path) -> bool:
+    """Whether an incremental run can keep ``path`` instead of rendering its placement again.
+
+    DRY_RUN and fallback placeholders share the normal file name, so the assets manifest's
+    ``source`` decides: real images (API or image cache) are kept, placeholders only while this
+    run would draw placeholders too, and run-budget placeholders never.
+    """
+    if not path.exists() or path.parent.resolve() != gen.assets_dir.resolve():
+        return False
+    source = (gen.manifest.get(path.name) or {}).get("source")
+    return source in {"api", "cache"} or (source == "placeholder" and gen.backend is None)
+
+
+def _image_source(image: GeneratedImage, start: Path, placeholder_style: str) -> ImageSource:
+    def rel(path: Path) -> str:
+        return os.path.relpath(path, start=start)
+
+    srcsets = {
+        fmt: [(rel(image.path.with_suffix(f".{fmt}")), image.width)] + [(rel(path), w) for w, path in variants]
+        for fmt, variants in image.variants.items()
+    }
+    return ImageSource(
+        src=rel(image.path),
+        width=image.width,
+        height=image.height,
+        srcsets=srcsets,
+        placeholder=image.placeholder,
+        placeholder_style=placeholder_style,
+    )
 
 
 def process_blog(
@@ -24,56 +206,345 @@ def process_blog(
     config: AgentConfig,
     max_images_override: int | None = None,
 ) -> PipelineResult:
+    *_, written = process_blog_iter(input_markdown_path, assets_dir, config, max_images_override)
+    assert isinstance(written, MarkdownWritten)
+    return written.result
+
+
+def process_blog_iter(
+    input_markdown_path: str,
+    assets_dir: str | None,
+    config: AgentConfig,
+    max_images_override: int | None = None,
+) -> Iterator[Event]:
+    """Run the pipeline, yielding progress events; the last one is :class:`MarkdownWritten`.
+
+    Image events arrive as each image is written, so callers can upload assets while the
+    rest of the post is still being generated.
+    """
     input_path = Path(input_markdown_path)
     if not input_path.exists():
         raise FileNotFoundError(f"Input markdown not found: {input_markdown_path}")
 
-    raw = input_path.read_text(encoding="utf-8")
-
-    # Extract blog title (first heading) if present
-    first_line = raw.splitlines()[0] if raw.splitlines() else ""
-    blog_title = first_line.lstrip("# ").strip() if first_line.startswith("#") else input_path.stem
+    metrics = Metrics() if config.metrics else NULL_METRICS
+    # The deadline covers the whole post, so it starts before anything is read.
+    run_budget = RunBudget(
+        deadline_seconds=config.run_deadline_seconds,
+        max_api_calls=config.run_max_api_calls,
+        max_cost=config.run_max_cost,
+        image_cost=config.image_call_cost,
+        plan_cost=config.plan_call_cost,
+        reserve_seconds=config.run_reserve_seconds,
+    )
+    tracker = RunTracker(run_budget) if run_budget.enabled else None
+    with metrics.span("read"):
+        raw = input_path.read_text(encoding="utf-8")
 
-    anchors = extract_anchors(raw)
+    # Parse once: tokens, lines, title (first heading, else file stem) and anchors
+    with metrics.span("parse"):
+        doc = Document.parse(raw, default_title=input_path.stem)
+    blog_title = doc.title
+    anchors = doc.anchors
+    yield AnchorsExtracted(input_path=input_path, title=blog_title, anchors=len(anchors))
 
     max_images = max_images_override or config.max_images
 
-    placements: List[Placement] = plan_placements(
-        text_model=config.text_model, anchors=anchors, blog_title=blog_title, max_images=max_images
-    )
+    # Incremental mode: keep placements for sections unchanged since the previous run
+    # and only plan over anchors in new or edited sections.
+    state_path = state_path_for(input_path)
+    settings = {"text_model": config.text_model, "image_model": config.image_model, "max_images": max_images}
+    if config.planner != "llm":
+        settings["planner"] = config.planner
+    with metrics.span("incremental.diff"):
+        fingerprints = section_fingerprints(doc) if config.incremental else []
+        prior = IncrementalState.load(state_path) if config.incremental else None
+        diff = diff_against_state(prior, anchors, fingerprints) if prior is not None and prior.settings == settings else None
+
+    scheduler = _get_scheduler(config)
+    backend = get_backend(config)
+    plan_cache = _get_plan_cache(config)
+    hits_before, misses_before = (plan_cache.hits, plan_cache.misses) if plan_cache else (0, 0)
+
+    def plan(plan_anchors: List[Anchor], limit: int) -> List[Placement]:
+        # With a run budget, each plan request is charged and cut off at the plan deadline;
+        # what could not be afforded is planned heuristically and listed in tracker.degraded.
+        return plan_placements(
+            text_model=config.text_model,
+            anchors=plan_anchors,
+            blog_title=blog_title,
+            max_images=limit,
+            cache=plan_cache,
+            scheduler=scheduler,
+            metrics=metrics,
+            backend=backend,
+            chunk_anchors=config.plan_chunk_anchors,
+            concurrency=config.max_concurrency,
+            token_budget=config.plan_token_budget,
+            mode=config.planner,
+            budget=tracker,
+        )
+
+    reused: List[PriorPlacement] = []
+    with metrics.span("plan"):
+        if diff is None:
+            placements: List[Placement] = plan(anchors, max_images)
+        else:
+            reused = diff.reused[:max_images]
+            budget = max_images - len(reused)
+            new_placements: List[Placement] = []
+            if diff.dirty_anchors and budget > 0:
+                new_placements = plan(diff.dirty_anchors, budget)
+            # Reused placements are kept as they are; a new one next to a kept placement is
+            # dropped, as when merging chunk plans, so an edit never puts two images back-to-back.
+            placements = spread_placements(new_placements, anchors, max_images, fixed=[r.placement for r in reused])
+    plan_cache_hits = plan_cache.hits - hits_before if plan_cache else 0
+    plan_cache_misses = plan_cache.misses - misses_before if plan_cache else 0
+    yield PlanReady(placements=[asdict(p) for p in placements], reused=len(reused))
 
     # Prepare image generator
     assets_root = assets_dir or config.assets_dir or str(input_path.parent / "assets")
-    gen = ImageGenerator(
-        config=ImageGenConfig(
+    cache_dir = (config.image_cache_dir or str(Path(assets_root) / ".cache")) if config.image_cache else None
+    gen = _get_generator(
+        ImageGenConfig(
             image_model=config.image_model,
             default_width=config.default_width,
             default_height=config.default_height,
             compress_webp=config.compress_webp,
             webp_quality=config.webp_quality,
+            image_format=config.image_format,
+            encode_preset=config.encode_preset,
+            responsive_widths=tuple(config.responsive_widths),
+            lqip=config.lqip,
+            cache_dir=cache_dir,
+            cache_max_bytes=config.image_cache_max_bytes,
+            reuse_threshold=config.prompt_reuse_threshold,
+            byte_budget=config.byte_budget,
+            min_quality=config.min_quality,
+            budget_formats=tuple(config.budget_formats),
+            encode_workers=config.encode_workers,
+            api_sizes=parse_sizes(config.image_api_sizes),
         ),
-        assets_dir=assets_root,
+        assets_root,
+        scheduler,
+        backend,
     )
 
-    # Generate images
-    generated_paths: List[Path] = []
-    rel_paths: List[str] = []
-
-    for p in placements:
-        image_path = gen.generate(prompt=p.prompt, aspect_ratio=p.aspect_ratio, alt_text=p.alt_text)
-        generated_paths.append(image_path)
-        rel_path = os.path.relpath(image_path, start=input_path.parent)
-        rel_paths.append(rel_path)
+    # Generate images (concurrently, results stay in planner order); reused placements
+    # keep their previous image when it is still on disk. Responsive variants and placeholders
+    # are not tracked in the incremental state, so with those on reuse goes through the image cache.
+    html_output = bool(config.responsive_widths) or config.lqip != "none"
+    existing = {
+        r.placement.anchor_id: input_path.parent / r.image_path
+        for r in reused
+        if not html_output and _is_finished_image(gen, input_path.parent / r.image_path)
+    }
+    total = len(placements)
+    slots: List[Optional[GeneratedImage]] = [None] * total
+    for i, p in enumerate(placements):
+        if p.anchor_id in existing:
+            slots[i] = GeneratedImage(path=existing[p.anchor_id], width=0, height=0)
+            yield ImageGenerated(p.anchor_id, existing[p.anchor_id], i, total, 0, 0, 0.0, reused=True)
+    todo = [i for i, p in enumerate(placements) if p.anchor_id not in existing]
+    with metrics.span("generate"):
+        for j, image, elapsed_ms in _iter_generated_images(
+            gen, [placements[i] for i in todo], max_concurrency=config.max_concurrency, metrics=metrics, budget=tracker
+        ):
+            i = todo[j]
+            slots[i] = image
+            variants = [path for paths in image.variants.values() for _, path in paths]
+            yield ImageGenerated(
+                placements[i].anchor_id,
+                image.path,
+                i,
+                total,
+                image.width,
+                image.height,
+                elapsed_ms,
+                variants=variants,
+                encodings=image.encodings,
+                degraded=image.degraded,
+            )
+    degraded = list(tracker.degraded) if tracker is not None else []
+    degraded += [
+        {"stage": "image", "reason": image.degraded, "anchor_id": p.anchor_id}
+        for p, image in zip(placements, slots)
+        if image is not None and image.degraded is not None
+    ]
+    metrics.incr("images.placements", len(placements))
+    metrics.incr("images.reused", len(existing))
+    images = [image for image in slots if image is not None]
+    generated_paths = [image.path for image in images]
+    rel_paths: List[str] = [os.path.relpath(path, start=input_path.parent) for path in generated_paths]
 
-    # Prepare insertions
-    placement_tuples: List[tuple[str, str, str | None]] = []
-    for p, rel in zip(placements, rel_paths):
-        placement_tuples.append((p.anchor_id, rel, p.caption))
+    # Prepare insertions; images with variants or a placeholder are emitted as HTML
+    placement_tuples: List[tuple[str, str | ImageSource, str | None]] = []
+    for p, image, rel in zip(placements, images, rel_paths):
+        source = rel
+        if image.variants or image.placeholder:
+            source = _image_source(image, input_path.parent, config.lqip_style)
+        placement_tuples.append((p.anchor_id, source, p.caption))
 
-    new_markdown = plan_insertions(original_markdown=raw, anchors=anchors, placements=placement_tuples)
+    with metrics.span("insert"):
+        new_markdown = plan_insertions(original_markdown=raw, anchors=anchors, placements=placement_tuples, lines=doc.lines)
 
     output_path = input_path.with_suffix("")
     output_path = output_path.with_name(output_path.name + config.output_suffix)
-    output_path.write_text(new_markdown, encoding="utf-8")
+    with metrics.span("write"):
+        output_path.write_text(new_markdown, encoding="utf-8")
+        gen.manifest.flush()
+        if gen.prompt_index is not None:
+            gen.prompt_index.flush()
+        if gen.cache is not None:
+            gen.cache.flush()
+
+    if config.incremental:
+        fp_by_anchor = {a.anchor_id: fp for a, fp in zip(anchors, fingerprints)}
+        IncrementalState(
+            settings=settings,
+            sections=sorted({fp[0] for fp in fingerprints}),
+            placements=[
+                PriorPlacement(*fp_by_anchor[p.anchor_id], placement=p, image_path=rel)
+                for p, rel in zip(placements, rel_paths)
+                if p.anchor_id in fp_by_anchor
+            ],
+        ).save(state_path)
+
+    result = PipelineResult(
+        output_markdown_path=output_path,
+        image_paths=generated_paths,
+        plan_cache_hits=plan_cache_hits,
+        plan_cache_misses=plan_cache_misses,
+        reused_placements=len(existing),
+        metrics=metrics.to_dict() if metrics.enabled else None,
+        degraded=degraded,
+        run_budget=tracker.summary() if tracker is not None else None,
+    )
+    yield MarkdownWritten(output_path=output_path, result=result)
+
+
+async def aprocess_blog_iter(
+    input_markdown_path: str,
+    assets_dir: str | None,
+    config: AgentConfig,
+    max_images_override: int | None = None,
+    max_pending: int = 8,
+) -> AsyncIterator[Event]:
+    """Async variant of :func:`process_blog_iter`; the pipeline runs in a worker thread.
+
+    At most ``max_pending`` events wait for the consumer; the worker blocks until there is room.
+    When the consumer stops early (``break``, ``aclose()`` or cancellation), the worker stops at
+    its next event: images not yet started are dropped and no Markdown is written.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max(1, max_pending))
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Any) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def run() -> None:
+        events = process_blog_iter(input_markdown_path, assets_dir, config, max_images_override)
+        try:
+            for event in events:
+                if stop.is_set():
+                    break
+                put(event)
+        except BaseException as e:
+            if not stop.is_set():
+                put(e)
+        finally:
+            events.close()
+            if not stop.is_set():
+                put(done)
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while (item := await queue.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Make room for a put the worker may be blocked on, so it can see the flag and exit.
+        while not queue.empty():
+            queue.get_nowait()
+        await worker
+
+
+def iter_markdown_files(target: str, output_suffix: str) -> List[Path]:
+    """Resolve a directory (searched recursively) or a glob pattern to input Markdown files."""
+    path = Path(target)
+    if path.is_dir():
+        candidates = path.rglob("*.md")
+    else:
+        candidates = (Path(p) for p in glob.glob(target, recursive=True))
+    return sorted(p for p in candidates if p.is_file() and not p.name.endswith(output_suffix))
+
+
+_WORKER_CONFIG: Optional[AgentConfig] = None
+
+
+def _init_batch_worker(config: AgentConfig) -> None:
+    global _WORKER_CONFIG
+    _WORKER_CONFIG = config
+
+
+def _process_one(input_path: str, assets_dir: str | None, max_images_override: int | None) -> BatchItemResult:
+    assert _WORKER_CONFIG is not None
+    started = time.perf_counter()
+    try:
+        result = process_blog(
+            input_markdown_path=input_path,
+            assets_dir=assets_dir,
+            config=_WORKER_CONFIG,
+            max_images_override=max_images_override,
+        )
+    except Exception as e:
+        return BatchItemResult(
+            input_path=Path(input_path),
+            error=f"{type(e).__name__}: {e}",
+            elapsed_seconds=time.perf_counter() - started,
+        )
+    return BatchItemResult(
+        input_path=Path(input_path),
+        output_markdown_path=result.output_markdown_path,
+        image_paths=result.image_paths,
+        elapsed_seconds=time.perf_counter() - started,
+        plan_cache_hits=result.plan_cache_hits,
+        metrics=result.metrics,
+        degraded=result.degraded,
+    )
+
+
+def process_directory(
+    inputs: List[Path],
+    assets_dir: str | None,
+    config: AgentConfig,
+    max_images_override: int | None = None,
+    workers: int | None = None,
+) -> List[BatchItemResult]:
+    """Process many posts across worker processes; a failing post is reported, not raised."""
+    workers = max(1, workers or os.cpu_count() or 1)
+    paths = [str(p) for p in inputs]
+    if workers > 1 and len(paths) > 1:
+        # Each worker process has its own scheduler, so split the API budget between them.
+        share = min(workers, len(paths))
+        config = config.model_copy(
+            update={
+                "requests_per_minute": config.requests_per_minute / share,
+                "images_per_minute": config.images_per_minute / share,
+            }
+        )
+
+    if workers == 1 or len(paths) <= 1:
+        _init_batch_worker(config)
+        return [_process_one(p, assets_dir, max_images_override) for p in paths]
 
-    return PipelineResult(output_markdown_path=output_path, image_paths=generated_paths)
\ No newline at end of file
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)),
+        initializer=_init_batch_worker,
+        initargs=(config,),
+    ) as pool:
+        futures = [pool.submit(_process_one, p, assets_dir, max_images_override) for p in paths]
+        return [f.result() for f in futures]
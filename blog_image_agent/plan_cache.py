@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+def default_plan_cache_dir() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return str(Path(base) / "blog-image-agent")
+
+
+def plan_cache_key(system_prompt: str, text_model: str, user_prompt: dict) -> str:
+    # user_prompt carries the anchor digest, title, max_images and instructions.
+    payload = {"system": system_prompt, "model": text_model, "user": user_prompt}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """SQLite-backed memo of planner responses with a TTL and a bounded number of entries."""
+
+    DB_NAME = "plans.sqlite3"
+
+    def __init__(self, cache_dir: str | Path, ttl_seconds: int, max_entries: int):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / self.DB_NAME
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_accessed ON plans (accessed)")
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                with conn:
+                    row = conn.execute("SELECT value, created FROM plans WHERE key = ?", (key,)).fetchone()
+                    if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                        self.misses += 1
+                        return None
+                    conn.execute("UPDATE plans SET accessed = ? WHERE key = ?", (now, key))
+            finally:
+                conn.close()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO plans (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value, ensure_ascii=False), now, now),
+                    )
+                    if self.ttl_seconds > 0:
+                        conn.execute("DELETE FROM plans WHERE created < ?", (now - self.ttl_seconds,))
+                    if self.max_entries > 0:
+                        conn.execute(
+                            "DELETE FROM plans WHERE key IN ("
+                            "SELECT key FROM plans ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                            (self.max_entries,),
+                        )
+            finally:
+                conn.close()
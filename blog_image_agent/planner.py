@@ -1,16 +1,20 @@
 from __future__ import annotations
 
 import json
+import math
 import os
-from dataclasses import dataclass
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
 
+from .backends import Backend, get_backend
+from .budget import BudgetExceeded, RunTracker
+from .digest import build_anchor_digest
+from .local_planner import plan_local
 from .markdown_utils import Anchor
-
-try:
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover - optional dependency for DRY_RUN
-    OpenAI = None  # type: ignore
+from .metrics import NULL_METRICS, Metrics
+from .plan_cache import PlanCache, plan_cache_key
+from .scheduler import RequestScheduler
 
 
 @dataclass
@@ -35,27 +39,28 @@ def _llm_plan(
     anchors: List[Anchor],
     blog_title: str,
     max_images: int,
+    cache: Optional[PlanCache] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    metrics: Metrics = NULL_METRICS,
+    backend: Optional[Backend] = None,
+    token_budget: int = 0,
+    budget: Optional[RunTracker] = None,
 ) -> List[Placement]:
-    if os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"} or OpenAI is None:
+    dry_run = os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"}
+    backend = None if dry_run else backend or get_backend()
+    if backend is None or not backend.available():
+        metrics.incr("plan.heuristic")
         return _heuristic_plan(anchors, blog_title, max_images)
 
-    client = OpenAI()
-
-    anchor_digest = [
-        {
-            "anchor_id": a.anchor_id,
-            "kind": a.kind,
-            "level": a.level,
-            "text_excerpt": (a.text[:200] + ("…" if len(a.text) > 200 else "")),
-            "start_line": a.start_line,
-        }
-        for a in anchors
-    ]
+    # Only the best-ranked anchors go to the LLM; `anchors` stays complete for the fallback.
+    digest = build_anchor_digest(anchors, token_budget, max_images)
+    metrics.incr("plan.prompt_tokens", digest.estimated_tokens)
+    metrics.incr("plan.prompt_tokens_saved", digest.tokens_saved)
 
     user_prompt = {
         "blog_title": blog_title,
         "max_images": max_images,
-        "anchors": anchor_digest,
+        "anchors": digest.entries,
         "instructions": (
             "Choose up to max_images anchors. Prefer placing images AFTER anchor. "
             "Avoid the very first short intro paragraph unless a hero image is needed. "
@@ -64,17 +69,40 @@ def _llm_plan(
         ),
     }
 
-    response = client.chat.completions.create(
-        model=text_model,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": json.dumps(user_prompt)},
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.6,
-    )
-
-    content = response.choices[0].message.content or "{}"
+    # Plans from a simulated backend must never be served to a real run.
+    model_key = text_model if backend.name == "openai" else f"{backend.name}:{text_model}"
+    cache_key = plan_cache_key(SYSTEM_PROMPT, model_key, user_prompt) if cache is not None else ""
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics.incr("plan.cache_hits")
+            return [Placement(**p) for p in cached][:max_images]
+        metrics.incr("plan.cache_misses")
+
+    def request() -> str:
+        if budget is None:
+            return backend.complete_json(text_model, SYSTEM_PROMPT, json.dumps(user_prompt))
+        # Every attempt, retries included, is charged and must end by the plan deadline.
+        budget.charge("plan")
+        return backend.complete_json(text_model, SYSTEM_PROMPT, json.dumps(user_prompt), timeout=budget.timeout("plan"))
+
+    deadline = budget.deadline_for("plan") if budget is not None and budget.has_deadline else None
+    try:
+        with metrics.span("plan.api"):
+            content = scheduler.call(request, metrics=metrics, deadline=deadline) if scheduler is not None else request()
+    except Exception as e:
+        # Out of budget (or a request cut off by the deadline): plan these anchors heuristically.
+        if budget is None:
+            raise
+        if isinstance(e, BudgetExceeded):
+            reason = e.reason
+        elif budget.has_deadline and budget.remaining("plan") <= 0:
+            reason = "deadline"
+        else:
+            raise
+        metrics.incr("plan.degraded")
+        budget.degrade("plan", reason)
+        return _heuristic_plan(anchors, blog_title, max_images)
     try:
         data = json.loads(content)
     except json.JSONDecodeError:
@@ -113,7 +141,10 @@ def _llm_plan(
     if not placements:
         return _heuristic_plan(anchors, blog_title, max_images)
 
-    return placements[:max_images]
+    placements = placements[:max_images]
+    if cache is not None:
+        cache.put(cache_key, [asdict(p) for p in placements])
+    return placements
 
 
 def _heuristic_plan(anchors: List[Anchor], blog_title: str, max_images: int) -> List[Placement]:
@@ -154,10 +185,152 @@ def _heuristic_plan(anchors: List[Anchor], blog_title: str, max_images: int) ->
     return placements[:max_images]
 
 
+def split_into_chunks(anchors: List[Anchor], max_anchors: int) -> List[List[Anchor]]:
+    """Group anchors into windows of whole H1/H2 sections, each at most ``max_anchors`` long.
+
+    Consecutive small sections share a window; a section longer than ``max_anchors`` is cut
+    into consecutive slices.
+    """
+    sections: List[List[Anchor]] = []
+    for a in anchors:
+        if not sections or (a.kind == "heading" and (a.level or 0) <= 2):
+            sections.append([])
+        sections[-1].append(a)
+
+    chunks: List[List[Anchor]] = []
+    current: List[Anchor] = []
+    for section in sections:
+        if current and len(current) + len(section) > max_anchors:
+            chunks.append(current)
+            current = []
+        while len(section) > max_anchors:
+            chunks.append(section[:max_anchors])
+            section = section[max_anchors:]
+        current += section
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_chunk_plans(chunk_plans: List[List[Placement]], anchors: List[Anchor], max_images: int) -> List[Placement]:
+    """Merge per-chunk plans in document order, keeping at most ``max_images`` and never two
+    placements on neighbouring anchors (which would put two images back-to-back)."""
+    ordered = sorted(anchors, key=lambda a: (a.start_line, a.end_line))
+    position = {a.anchor_id: i for i, a in enumerate(ordered)}
+
+    # Each chunk's own order is its preference; rank placements round-robin across chunks
+    # so the global cut keeps images spread over the whole post.
+    rank: Dict[str, int] = {}
+    candidates: Dict[str, Placement] = {}
+    for depth in range(max((len(plan) for plan in chunk_plans), default=0)):
+        for plan in chunk_plans:
+            if depth < len(plan):
+                p = plan[depth]
+                if p.anchor_id in position and p.anchor_id not in candidates:
+                    candidates[p.anchor_id] = p
+                    rank[p.anchor_id] = len(rank)
+
+    ranked = [candidates[anchor_id] for anchor_id in sorted(candidates, key=rank.__getitem__)]
+    return spread_placements(ranked, anchors, max_images)
+
+
+def spread_placements(
+    ranked: List[Placement], anchors: List[Anchor], max_images: int, fixed: Sequence[Placement] = ()
+) -> List[Placement]:
+    """Keep ``ranked`` placements in order, skipping any next to an already kept one, until
+    ``max_images`` are placed; ``fixed`` placements are always kept and count towards the cap.
+    Returns document order."""
+    ordered = sorted(anchors, key=lambda a: (a.start_line, a.end_line))
+    position = {a.anchor_id: i for i, a in enumerate(ordered)}
+
+    kept: List[Placement] = list(fixed)
+    taken = {position[p.anchor_id] for p in fixed if p.anchor_id in position}
+    for p in ranked:
+        if len(kept) >= max_images:
+            break
+        pos = position.get(p.anchor_id)
+        if pos is None or pos in taken or pos - 1 in taken or pos + 1 in taken:
+            continue
+        taken.add(pos)
+        kept.append(p)
+    return sorted(kept, key=lambda p: position.get(p.anchor_id, len(position)))
+
+
+def _chunked_plan(
+    text_model: str,
+    anchors: List[Anchor],
+    blog_title: str,
+    max_images: int,
+    chunk_anchors: int,
+    concurrency: int,
+    cache: Optional[PlanCache],
+    scheduler: Optional[RequestScheduler],
+    metrics: Metrics,
+    backend: Optional[Backend],
+    token_budget: int = 0,
+    budget: Optional[RunTracker] = None,
+) -> List[Placement]:
+    chunks = split_into_chunks(anchors, chunk_anchors)
+    metrics.incr("plan.chunks", len(chunks))
+    # Quota proportional to chunk size (rounded up); the merge enforces the global max_images.
+    quotas = [max(1, math.ceil(max_images * len(chunk) / len(anchors))) for chunk in chunks]
+
+    def plan_chunk(chunk: List[Anchor], quota: int) -> List[Placement]:
+        return _llm_plan(text_model, chunk, blog_title, quota, cache, scheduler, metrics, backend, token_budget, budget)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks)))) as pool:
+        chunk_plans = list(pool.map(plan_chunk, chunks, quotas))
+    return merge_chunk_plans(chunk_plans, anchors, max_images)
+
+
 def plan_placements(
     text_model: str,
     anchors: List[Anchor],
     blog_title: str,
     max_images: int,
+    cache: Optional[PlanCache] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    metrics: Metrics = NULL_METRICS,
+    backend: Optional[Backend] = None,
+    chunk_anchors: int = 0,
+    concurrency: int = 1,
+    token_budget: int = 0,
+    mode: str = "llm",
+    budget: Optional[RunTracker] = None,
 ) -> List[Placement]:
-    return _llm_plan(text_model=text_model, anchors=anchors, blog_title=blog_title, max_images=max_images)
\ No newline at end of file
+    # "local" scores anchors offline (NumPy) and never calls the backend or the plan cache.
+    if mode == "local":
+        with metrics.span("plan.local"):
+            return plan_local(anchors, blog_title, max_images)
+    if mode != "llm":
+        raise ValueError(f"Unknown planner mode {mode!r}; expected 'llm' or 'local'")
+    # Long posts are planned in H2-aligned windows of at most chunk_anchors anchors (0 = never),
+    # which keeps prompts small and lets windows be planned in parallel.
+    dry_run = os.getenv("DRY_RUN", "").lower() in {"1", "true", "yes"}
+    if chunk_anchors > 0 and len(anchors) > chunk_anchors and max_images > 0 and not dry_run:
+        return _chunked_plan(
+            text_model,
+            anchors,
+            blog_title,
+            max_images,
+            chunk_anchors,
+            concurrency,
+            cache,
+            scheduler,
+            metrics,
+            backend,
+            token_budget,
+            budget,
+        )
+    return _llm_plan(
+        text_model=text_model,
+        anchors=anchors,
+        blog_title=blog_title,
+        max_images=max_images,
+        cache=cache,
+        scheduler=scheduler,
+        metrics=metrics,
+        backend=backend,
+        token_budget=token_budget,
+        budget=budget,
+    )
\ No newline at end of file
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .cache import atomic_write_bytes
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an the and or of for to in on with at by from as is are".split())
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs at Jaccard >= ~0.5 almost always share a bucket
+_ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMS: List[Tuple[int, int]] = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def prompt_shingles(prompt: str) -> Set[str]:
+    """Normalized word unigrams and bigrams; punctuation, case and filler words are ignored."""
+    words = [w for w in _WORD_RE.findall(prompt.lower()) if w not in _STOPWORDS]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(prompt: str) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in prompt_shingles(prompt)]
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two prompts' shingle sets."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(group: str, sig: List[int]) -> List[str]:
+    return [f"{group}:{i}:" + ",".join(map(str, sig[i * _ROWS : (i + 1) * _ROWS])) for i in range(BANDS)]
+
+
+class PromptIndex:
+    """MinHash/LSH index of prompts already rendered into an assets dir.
+
+    Entries are keyed by image cache key and grouped by everything except the prompt (model,
+    size, output formats), so a match can always be served from the same files. Persisted as
+    ``prompt-index.json`` next to the assets; :meth:`flush` merges with the file on disk.
+    """
+
+    FILE_NAME = "prompt-index.json"
+
+    def __init__(self, assets_dir: str | Path):
+        self.path = Path(assets_dir) / self.FILE_NAME
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[str, List[str]] = {}
+        self._removed: Set[str] = set()
+        self._dirty = False
+        for key, entry in self._read().items():
+            self._insert(key, entry)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("prompts", {}) if isinstance(data, dict) else {}
+
+    def _insert(self, key: str, entry: Dict[str, Any]) -> None:
+        if key in self._entries:
+            return
+        self._entries[key] = entry
+        for band in _bands(entry["group"], entry["sig"]):
+            self._buckets.setdefault(band, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, group: str, prompt: str) -> None:
+        sig = minhash(prompt)
+        with self._lock:
+            if key not in self._entries:
+                self._removed.discard(key)
+                self._insert(key, {"group": group, "prompt": prompt, "sig": sig})
+                self._dirty = True
+
+    def lookup(self, prompt: str, group: str, threshold: float) -> Optional[Tuple[str, str, float]]:
+        """Best ``(key, prompt, similarity)`` in ``group`` at or above ``threshold``, if any."""
+        sig = minhash(prompt)
+        best: Optional[Tuple[str, str, float]] = None
+        with self._lock:
+            candidates = {key for band in _bands(group, sig) for key in self._buckets.get(band, ())}
+            for key in candidates:
+                entry = self._entries[key]
+                score = similarity(sig, entry["sig"])
+                if score >= threshold and (best is None or score > best[2]):
+                    best = (key, entry["prompt"], score)
+        return best
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            for band in _bands(entry["group"], entry["sig"]):
+                keys = self._buckets.get(band, [])
+                if key in keys:
+                    keys.remove(key)
+            self._removed.add(key)
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            for key, entry in self._read().items():
+                if key not in self._removed:
+                    self._insert(key, entry)
+            self._dirty = False
+            payload = json.dumps({"version": 1, "prompts": self._entries}, sort_keys=True, ensure_ascii=False)
+            atomic_write_bytes(self.path, payload.encode("utf-8"))
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from .budget import BudgetExceeded
+from .metrics import NULL_METRICS, Metrics
+
+T = TypeVar("T")
+
+_RETRYABLE_STATUS = {408, 409, 429}
+_RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``; ``<= 0`` means unlimited."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` if available and return 0, otherwise return the seconds to wait."""
+        if self.rate_per_second <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate_per_second
+
+    def acquire(self, tokens: float = 1.0, sleep: Callable[[float], None] = time.sleep) -> None:
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            sleep(wait)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in _RETRYABLE_STATUS or status >= 500
+    return type(exc).__name__ in _RETRYABLE_ERROR_NAMES or isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read ``retry-after-ms`` / ``retry-after`` (seconds or HTTP date) from an error's response."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            return max(0.0, parsed.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Shared rate limiter and retry loop for planner and image API calls.
+
+    One instance is shared by every thread in a process, so concurrent image workers draw
+    from the same requests-per-minute and images-per-minute budgets. A ``Retry-After`` from
+    any call pauses all callers until it has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        images_per_minute: float,
+        max_retries: int,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.images = TokenBucket(images_per_minute, clock=clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # "Equal jitter": half the exponential delay is fixed, half is random.
+        cap = min(self.max_delay, self.base_delay * (2**attempt))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def _wait_for_pause(self) -> None:
+        while True:
+            with self._lock:
+                wait = self._paused_until - self._clock()
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+    def call(
+        self, fn: Callable[[], T], images: int = 0, metrics: Metrics = NULL_METRICS, deadline: Optional[float] = None
+    ) -> T:
+        # ``deadline`` (scheduler clock time): a retry that could not start before it is not attempted.
+        attempt = 0
+        while True:
+            with metrics.span("api.wait"):
+                self._wait_for_pause()
+                self.requests.acquire(1, sleep=self._sleep)
+                if images:
+                    self.images.acquire(images, sleep=self._sleep)
+            with self._lock:
+                self.calls += 1
+            metrics.incr("api.calls")
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    metrics.incr("api.errors")
+                    raise
+                delay = self._backoff(attempt)
+                retry_after = retry_after_seconds(e)
+                if deadline is not None and self._clock() + max(delay, retry_after or 0.0) >= deadline:
+                    metrics.incr("api.errors")
+                    metrics.incr("api.deadline_exceeded")
+                    raise BudgetExceeded("deadline") from e
+                metrics.incr("api.retries")
+                with self._lock:
+                    self.retries += 1
+                    if _status_code(e) == 429:
+                        self.rate_limited += 1
+                        metrics.incr("api.rate_limited")
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                        self._paused_until = max(self._paused_until, self._clock() + retry_after)
+                attempt += 1
+                self._sleep(delay)
+
+
+_SCHEDULERS: Dict[Tuple[float, float, int, float, float], RequestScheduler] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(
+    requests_per_minute: float,
+    images_per_minute: float,
+    max_retries: int,
+    base_delay: float,
+    max_delay: float,
+) -> RequestScheduler:
+    """Process-wide scheduler for the given limits, shared by the planner and every image generator."""
+    key = (requests_per_minute, images_per_minute, max_retries, base_delay, max_delay)
+    with _SCHEDULERS_LOCK:
+        scheduler = _SCHEDULERS.get(key)
+        if scheduler is None:
+            scheduler = RequestScheduler(*key)
+            _SCHEDULERS[key] = scheduler
+        return scheduler
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import json
+import os
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .backends import get_backend
+from .config import AgentConfig
+from .markdown_utils import build_markdown_parser
+from .pipeline import _get_scheduler, process_blog
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    job_id: str
+    input_path: str
+    assets_dir: Optional[str]
+    max_images: Optional[int]
+    status: str = "queued"  # queued -> running -> done | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    output_markdown_path: Optional[str] = None
+    image_paths: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "input": self.input_path,
+            "assets_dir": self.assets_dir,
+            "max_images": self.max_images,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "output": self.output_markdown_path,
+            "images": self.image_paths,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Runs ``process_blog`` jobs on a bounded worker pool inside one warm process."""
+
+    def __init__(self, config: AgentConfig, workers: int = 2, max_queue: int = 64, keep_finished: int = 1000):
+        self.config = config
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blog-job")
+        # Bounds queued + running jobs; submit fails fast instead of piling up work.
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, input_path: str, assets_dir: Optional[str] = None, max_images: Optional[int] = None) -> Job:
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull("Job queue is full")
+        job = Job(job_id=uuid.uuid4().hex, input_path=input_path, assets_dir=assets_dir, max_images=max_images)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self.jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in {"done", "failed"}]
+        for jid in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[jid]
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = process_blog(
+                input_markdown_path=job.input_path,
+                assets_dir=job.assets_dir,
+                config=self.config,
+                max_images_override=job.max_images,
+            )
+            job.output_markdown_path = str(result.output_markdown_path)
+            job.image_paths = [str(p) for p in result.image_paths]
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+
+
+def warm_up(config: AgentConfig) -> None:
+    """Build the per-process parser, scheduler and backend client before the first job arrives."""
+    build_markdown_parser()
+    _get_scheduler(config)
+    if os.getenv("DRY_RUN", "").lower() not in {"1", "true", "yes"}:
+        try:
+            get_backend(config).warm_up()
+        except Exception:
+            pass
+
+
+def is_loopback(host: str) -> bool:
+    """True when ``host`` only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _make_handler(queue: JobQueue, token: Optional[str] = None):
+    expected = f"Bearer {token}".encode("utf-8") if token else None
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - keep stdout clean for the CLI
+            pass
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            # Every endpoint but /healthz needs "Authorization: Bearer <token>" when a token is set.
+            if expected is None:
+                return True
+            given = (self.headers.get("Authorization") or "").encode("utf-8")
+            if hmac.compare_digest(given, expected):
+                return True
+            self._send_json(401, {"error": "missing or invalid token"})
+            return False
+
+        def do_GET(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/healthz":
+                self._send_json(200, {"status": "ok", "jobs": queue.stats()})
+            elif not self._authorized():
+                return
+            elif path == "/jobs":
+                self._send_json(200, {"jobs": [j.to_dict() for j in queue.jobs()]})
+            elif path.startswith("/jobs/"):
+                job = queue.get(path[len("/jobs/") :])
+                if job is None:
+                    self._send_json(404, {"error": "unknown job"})
+                else:
+                    self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if not self._authorized():
+                return
+            if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                input_path = str(body["input"])
+                max_images = body.get("max_images")
+                job = queue.submit(
+                    input_path=input_path,
+                    assets_dir=body.get("assets_dir"),
+                    max_images=int(max_images) if max_images is not None else None,
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                self._send_json(400, {"error": f"invalid request: {e}"})
+                return
+            except QueueFull as e:
+                self._send_json(503, {"error": str(e)})
+                return
+            self._send_json(202, job.to_dict())
+
+    return Handler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (host, port)-style client address.
+        return request, ("local", 0)
+
+
+def make_server(
+    queue: JobQueue,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+    token: Optional[str] = None,
+) -> socketserver.BaseServer:
+    handler = _make_handler(queue, token=token)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
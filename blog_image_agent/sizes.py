@@ -0,0 +1,64 @@
+"""Image sizes each model accepts, and fitting an API image to the exact size a post needs.
+
+The Images API rejects any ``size`` not on the model's list, so the generator asks for the
+nearest supported size and crops/resizes locally instead of paying for a failed request.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+Size = Tuple[int, int]
+
+# Sizes accepted by the Images API per model. Models not listed (or prefixed by a listed name)
+# are sent the exact target size, as before.
+SUPPORTED_SIZES: Dict[str, Tuple[Size, ...]] = {
+    "gpt-image-1": ((1024, 1024), (1536, 1024), (1024, 1536)),
+    "dall-e-3": ((1024, 1024), (1792, 1024), (1024, 1792)),
+    "dall-e-2": ((256, 256), (512, 512), (1024, 1024)),
+}
+
+
+def parse_sizes(values: Sequence[str]) -> Tuple[Size, ...]:
+    """``["1024x1024", "1536x1024"]`` -> ``((1024, 1024), (1536, 1024))``."""
+    sizes = []
+    for value in values:
+        w, _, h = value.strip().lower().partition("x")
+        sizes.append((int(w), int(h)))
+    return tuple(sizes)
+
+
+def supported_sizes(model: str) -> Optional[Tuple[Size, ...]]:
+    # Longest matching prefix, so dated or mini variants ("gpt-image-1-mini") share their family's list.
+    matches = [name for name in SUPPORTED_SIZES if model == name or model.startswith(name + "-")]
+    return SUPPORTED_SIZES[max(matches, key=len)] if matches else None
+
+
+def nearest_size(width: int, height: int, sizes: Optional[Sequence[Size]]) -> Size:
+    """The supported size to request for a ``width`` x ``height`` target.
+
+    Closest aspect ratio first (least cropped away), then the smallest size that covers the
+    target (no upscaling), else the largest one.
+    """
+    if not sizes or (width, height) in sizes:
+        return width, height
+    target = math.log(width / max(1, height))
+
+    def rank(size: Size) -> Tuple[float, bool, int]:
+        w, h = size
+        covers = w >= width and h >= height
+        return (round(abs(math.log(w / h) - target), 6), not covers, w * h if covers else -w * h)
+
+    return min(sizes, key=rank)
+
+
+def fit_image(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Center-crop ``image`` to the target aspect ratio and resize it to exactly ``width`` x ``height``."""
+    from PIL import Image, ImageOps
+
+    if image.size == (width, height):
+        return image
+    return ImageOps.fit(image, (width, height), Image.LANCZOS)
@@ -0,0 +1,172 @@
+"""A local OpenAI-compatible HTTP server for the tests and ``benchmarks/bench_pipeline.py``.
+
+Serves ``/v1/chat/completions`` and ``/v1/images/generations`` with configurable latency and
+rate limiting, so retries, concurrency and throughput can be exercised without spending money.
+Like the real API, image requests for a size the model does not support fail with a 400::
+
+    with FakeOpenAIServer(latency=0.2, fail_first=2) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test")
+"""
+from __future__ import annotations
+
+import base64
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from blog_image_agent.backends import simulated_placements
+from blog_image_agent.sizes import supported_sizes
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fail_first: int = 0,
+        failure_rate: float = 0.0,
+        failure_status: int = 429,
+        retry_after: Optional[float] = 0.05,
+        strict_sizes: bool = True,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_first = fail_first
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.strict_sizes = strict_sizes
+        self.invalid_sizes = 0
+        self.requests: Dict[str, int] = {}
+        self.failures = 0
+        self.request_times: List[float] = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                self.failures += 1
+                return True
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                self.failures += 1
+                return True
+            return False
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - silence default stderr logging
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?", 1)[0]
+                with server._lock:
+                    server.requests[path] = server.requests.get(path, 0) + 1
+                    server.request_times.append(time.monotonic())
+
+                delay = server.latency + (server._rng.uniform(-server.jitter, server.jitter) if server.jitter else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if server._should_fail():
+                    headers = {"retry-after": str(server.retry_after)} if server.retry_after is not None else {}
+                    self._send_json(
+                        server.failure_status,
+                        {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                        headers,
+                    )
+                    return
+
+                if path.endswith("/images/generations"):
+                    if server.strict_sizes and not _size_supported(request):
+                        with server._lock:
+                            server.invalid_sizes += 1
+                        message = f"Invalid size {request.get('size')!r} for model {request.get('model')!r}"
+                        self._send_json(400, {"error": {"message": message, "type": "invalid_request_error", "param": "size"}})
+                        return
+                    self._send_json(200, _image_response(request))
+                elif path.endswith("/chat/completions"):
+                    self._send_json(200, _chat_response(request))
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+        return Handler
+
+
+def _size_supported(request: dict) -> bool:
+    sizes = supported_sizes(str(request.get("model", "")))
+    return sizes is None or str(request.get("size", "1024x1024")) in {f"{w}x{h}" for w, h in sizes}
+
+
+def _image_response(request: dict) -> dict:
+    try:
+        width, height = (int(v) for v in str(request.get("size", "1024x1024")).split("x"))
+    except ValueError:
+        width, height = 1024, 1024
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color=(90, 120, 160)).save(buf, format="PNG", compress_level=1)
+    return {"created": int(time.time()), "data": [{"b64_json": base64.b64encode(buf.getvalue()).decode("ascii")}]}
+
+
+def _chat_response(request: dict) -> dict:
+    # Plan the first max_images headings (or anchors) found in the planner's user message.
+    try:
+        user = request["messages"][-1]["content"]
+    except (KeyError, IndexError, TypeError):
+        user = "{}"
+    content = json.dumps({"placements": simulated_placements(user)})
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
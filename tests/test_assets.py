@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+from blog_image_agent.assets import AssetIndex, collect_garbage, references_in
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.pipeline import process_blog
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def test_references_cover_markdown_and_picture_blocks():
+    md = (
+        "![a](assets/img-0123456789abcdef.png) <!-- ai-image anchor:a1 -->\n"
+        '<picture><source type="image/webp" srcset="assets/img-1111111111111111.webp 1280w, '
+        'assets/img-1111111111111111-480w.webp 480w" sizes="x"><img src="assets/img-1111111111111111.png" '
+        'alt="" width="1" height="1"></picture> <!-- ai-image anchor:a2 -->\n'
+        "![not ours](assets/other.png)\n"
+    )
+    assert references_in(md) == [
+        "assets/img-0123456789abcdef.png",
+        "assets/img-1111111111111111.png",
+        "assets/img-1111111111111111.webp",
+        "assets/img-1111111111111111-480w.webp",
+    ]
+
+
+def test_references_keep_spaces_and_parentheses():
+    md = (
+        "![a](../Blog Assets/img-0123456789abcdef.png) <!-- ai-image anchor:a1 -->\n"
+        "![b (draft)](assets (old)/img-1111111111111111.png) <!-- ai-image anchor:a2 -->\n"
+        "![x](notes.png) and ![c](img dir/img-2222222222222222.png)  <!-- ai-image anchor:a3 -->\n"
+    )
+    assert references_in(md) == [
+        "../Blog Assets/img-0123456789abcdef.png",
+        "assets (old)/img-1111111111111111.png",
+        "img dir/img-2222222222222222.png",
+    ]
+
+
+def test_gc_matches_references_in_paths_with_spaces(tmp_path: Path):
+    assets = tmp_path / "Blog Assets"
+    assets.mkdir()
+    kept = assets / "img-0123456789abcdef.png"
+    kept.write_bytes(b"kept")
+    orphan = assets / "img-ffffffffffffffff.png"
+    orphan.write_bytes(b"orphan")
+    posts = tmp_path / "posts"
+    posts.mkdir()
+    (posts / "p.illustrated.md").write_text(f"![a](../Blog Assets/{kept.name}) <!-- ai-image anchor:a1 -->\n")
+
+    report = collect_garbage(posts, [assets], min_age_seconds=0)
+
+    assert kept.exists() and report.removed == [orphan]
+
+
+def test_gc_removes_orphans_and_links_duplicates(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    posts = tmp_path / "posts"
+    posts.mkdir()
+    post = posts / "post.md"
+    post.write_text(SAMPLE.read_text(encoding="utf-8"), encoding="utf-8")
+    assets = posts / "assets"
+    result = process_blog(str(post), None, AgentConfig(plan_cache=False, image_cache=False), 2)
+    referenced = result.image_paths[0]
+
+    orphan = assets / "img-ffffffffffffffff.png"
+    orphan.write_bytes(b"old")
+    companion = referenced.with_suffix(".webp")  # other encodings of a referenced image are kept
+    companion.write_bytes(b"webp")
+    copy = assets / "copied" / "img-eeeeeeeeeeeeeeee.png"
+    copy.parent.mkdir()
+    copy.write_bytes(referenced.read_bytes())
+    illustrated = result.output_markdown_path
+    illustrated.write_text(illustrated.read_text() + f"\n![x](assets/copied/{copy.name}) <!-- ai-image anchor:zz -->\n")
+
+    authored = assets / "diagram.png"  # hand-authored, referenced by a plain Markdown link
+    authored.write_bytes(b"diagram")
+    post.write_text(post.read_text() + "\n![diagram](assets/diagram.png)\n")
+
+    preview = collect_garbage(posts, dry_run=True, min_age_seconds=0)
+    assert preview.removed == [orphan] and orphan.exists()
+
+    report = collect_garbage(posts, min_age_seconds=0)
+
+    assert report.removed == [orphan]
+    assert not orphan.exists()
+    assert authored.exists()
+    assert companion.exists()
+    assert all(p.exists() for p in result.image_paths)
+    assert (assets / "assets-manifest.json").exists()
+    assert os.stat(copy).st_ino == os.stat(referenced).st_ino
+    assert len(report.linked) == 1
+
+    # Unchanged files are not hashed again on the next run.
+    again = collect_garbage(posts, min_age_seconds=0)
+    assert again.hashed == 0 and not again.removed and not again.linked
+    assert len(AssetIndex(assets).entries) == report.scanned - 1
+
+
+def test_gc_keeps_recent_files(tmp_path: Path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    fresh = assets / "img-aaaaaaaaaaaaaaaa.png"
+    fresh.write_bytes(b"x")
+
+    report = collect_garbage(tmp_path, [assets])
+
+    assert fresh.exists() and not report.removed
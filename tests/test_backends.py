@@ -0,0 +1,75 @@
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from blog_image_agent.backends import ImageRequest, LocalBackend, SimulatedAPIError, clear_backends, get_backend
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.pipeline import process_blog
+
+
+@pytest.fixture
+def fresh_backends():
+    # get_backend caches instances per process; start from (and leave behind) an empty cache so
+    # tweaking the instance below cannot leak into other tests.
+    clear_backends()
+    yield
+    clear_backends()
+
+
+def test_local_backend_sync_async_and_batch():
+    backend = LocalBackend(latency=0.0, image_latency=0.0)
+    png = backend.generate_image("m", "a prompt", 64, 36)
+    assert Image.open(io.BytesIO(png)).size == (64, 36)
+
+    batch = backend.generate_images("m", [ImageRequest("a", 32, 32), ImageRequest("b", 48, 27)])
+    assert [Image.open(io.BytesIO(b)).size for b in batch] == [(32, 32), (48, 27)]
+
+    content = asyncio.run(backend.acomplete_json("m", "system", '{"max_images": 1, "anchors": [{"anchor_id": "h1", "kind": "heading"}]}'))
+    assert '"anchor_id": "h1"' in content
+    assert backend.calls == {"plan": 1, "image": 3}
+
+
+def test_local_backend_failures_are_retryable():
+    backend = LocalBackend(latency=0.0, image_latency=0.0, failure_rate=1.0, retry_after=0.5)
+    with pytest.raises(SimulatedAPIError) as excinfo:
+        backend.generate_image("m", "p", 8, 8)
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers == {"retry-after": "0.5"}
+
+
+def test_pipeline_runs_offline_on_local_backend(tmp_path: Path, monkeypatch, fresh_backends):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    post = tmp_path / "post.md"
+    post.write_text(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+    cfg = AgentConfig(
+        backend="local",
+        local_backend_latency=0.01,
+        local_backend_image_latency=0.02,
+        local_backend_failure_rate=0.3,
+        retry_base_delay=0.001,
+        retry_max_delay=0.002,
+        requests_per_minute=0,
+        images_per_minute=0,
+        plan_cache=False,
+        default_width=64,
+        default_height=36,
+        metrics=True,
+    )
+    backend = get_backend(cfg)
+    assert isinstance(backend, LocalBackend)
+    backend.retry_after = None
+
+    result = process_blog(str(post), str(tmp_path / "assets"), cfg, 3)
+
+    assert len(result.image_paths) == 3
+    assert result.metrics["counters"]["api.calls"] == backend.calls["plan"] + backend.calls["image"]
+    assert "images.fallback_placeholder" not in result.metrics["counters"]
+    assert "plan.heuristic" not in result.metrics["counters"]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        get_backend(AgentConfig(backend="nope"))
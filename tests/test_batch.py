@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from blog_image_agent import pipeline
+from blog_image_agent.cli import app
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.pipeline import iter_markdown_files, process_directory
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _posts(root: Path) -> None:
+    text = SAMPLE.read_text(encoding="utf-8")
+    (root / "nested").mkdir(parents=True)
+    (root / "a.md").write_text(text, encoding="utf-8")
+    (root / "nested" / "b.md").write_text(text, encoding="utf-8")
+    (root / "a.illustrated.md").write_text(text, encoding="utf-8")
+    (root / "notes.txt").write_text(text, encoding="utf-8")
+
+
+def _config(**overrides) -> AgentConfig:
+    return AgentConfig(**{**dict(image_cache=False, plan_cache=False, max_concurrency=1), **overrides})
+
+
+def test_iter_markdown_files_resolves_directories_and_globs(tmp_path: Path):
+    _posts(tmp_path)
+
+    assert iter_markdown_files(str(tmp_path), ".illustrated.md") == [tmp_path / "a.md", tmp_path / "nested" / "b.md"]
+    assert iter_markdown_files(str(tmp_path / "*.md"), ".illustrated.md") == [tmp_path / "a.md"]
+    assert iter_markdown_files(str(tmp_path / "**" / "*.md"), ".illustrated.md") == [
+        tmp_path / "a.md",
+        tmp_path / "nested" / "b.md",
+    ]
+    assert iter_markdown_files(str(tmp_path / "missing"), ".illustrated.md") == []
+
+
+def test_failing_post_does_not_abort_the_batch(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    _posts(tmp_path)
+    broken = tmp_path / "broken.md"
+    broken.write_bytes(b"# Title\n\n\xff\xfe not utf-8\n")
+    inputs = [tmp_path / "a.md", broken, tmp_path / "nested" / "b.md"]
+
+    results = process_directory(inputs, str(tmp_path / "assets"), _config(), max_images_override=1, workers=1)
+
+    assert [r.input_path for r in results] == inputs
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[1].error.startswith("UnicodeDecodeError")
+    assert results[0].output_markdown_path.exists() and len(results[2].image_paths) == 1
+
+
+class _InlinePool:
+    """Stands in for ProcessPoolExecutor: runs the initializer and jobs in this process."""
+
+    created = []
+
+    def __init__(self, max_workers, initializer, initargs):
+        self.max_workers = max_workers
+        self.config = initargs[0]
+        initializer(*initargs)
+        _InlinePool.created.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_rate_limits_are_split_across_workers(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", _InlinePool)
+    monkeypatch.setattr(_InlinePool, "created", [])
+    _posts(tmp_path)
+    inputs = [tmp_path / "a.md", tmp_path / "nested" / "b.md"]
+    config = _config(requests_per_minute=60, images_per_minute=10)
+
+    results = process_directory(inputs, str(tmp_path / "assets"), config, max_images_override=1, workers=8)
+
+    assert all(r.ok for r in results)
+    (pool,) = _InlinePool.created
+    # Only as many workers as posts, each with an equal share of the per-minute budget.
+    assert pool.max_workers == 2
+    assert (pool.config.requests_per_minute, pool.config.images_per_minute) == (30, 5)
+    assert (config.requests_per_minute, config.images_per_minute) == (60, 10)
+
+
+def test_cli_process_dir_reports_failures_and_exits_non_zero(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    _posts(tmp_path)
+    (tmp_path / "nested" / "broken.md").write_bytes(b"\xff\xfe")
+    args = ["process-dir", "--input", str(tmp_path), "--workers", "1", "--max-images", "1", "--no-plan-cache"]
+
+    result = CliRunner().invoke(app, [*args, "--assets-dir", str(tmp_path / "assets")])
+
+    assert result.exit_code == 1
+    assert "Processed 3 post(s), 1 failed" in " ".join(result.output.split())
+    assert (tmp_path / "nested" / "b.illustrated.md").exists()
+    assert not (tmp_path / "a.illustrated.illustrated.md").exists()
@@ -0,0 +1,57 @@
+from blog_image_agent.backends import LocalBackend
+from blog_image_agent.markdown_utils import Anchor, extract_anchors
+from blog_image_agent.metrics import Metrics
+from blog_image_agent.planner import Placement, merge_chunk_plans, plan_placements, split_into_chunks
+
+
+def _post(sections: int, paragraphs: int) -> str:
+    parts = ["# Title", ""]
+    for s in range(sections):
+        parts += [f"## Section {s}", ""]
+        parts += [f"Paragraph {s}.{p} " + "words " * 20 + "\n" for p in range(paragraphs)]
+    return "\n".join(parts)
+
+
+def _placement(anchor_id: str) -> Placement:
+    return Placement(anchor_id=anchor_id, position="after", prompt=anchor_id, alt_text="", caption=None, aspect_ratio="16:9")
+
+
+def test_chunks_follow_h2_sections_and_size_limit():
+    anchors = extract_anchors(_post(sections=6, paragraphs=4))
+    chunks = split_into_chunks(anchors, max_anchors=12)
+
+    assert [a for chunk in chunks for a in chunk] == anchors
+    assert all(len(chunk) <= 12 for chunk in chunks)
+    # Every chunk after the first starts at an H2 heading.
+    assert all(chunk[0].kind == "heading" and chunk[0].level == 2 for chunk in chunks[1:])
+
+    oversized = split_into_chunks(anchors[1:7], max_anchors=2)
+    assert [len(c) for c in oversized] == [2, 2, 2]
+
+
+def test_merge_enforces_global_cap_and_no_back_to_back():
+    anchors = [Anchor(f"a{i}", "paragraph", None, "text", i * 2, i * 2 + 1) for i in range(10)]
+    # a3/a4 are neighbours across a chunk boundary; a4 is the second chunk's first choice
+    # and outranks a3 (the first chunk's second choice), so a3 is dropped.
+    merged = merge_chunk_plans([[_placement("a1"), _placement("a3")], [_placement("a4"), _placement("a8")]], anchors, 5)
+    assert [p.anchor_id for p in merged] == ["a1", "a4", "a8"]
+
+    capped = merge_chunk_plans([[_placement("a1"), _placement("a3")], [_placement("a6"), _placement("a8")]], anchors, 2)
+    assert [p.anchor_id for p in capped] == ["a1", "a6"]
+
+
+def test_long_post_is_planned_in_parallel_chunks(monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    anchors = extract_anchors(_post(sections=20, paragraphs=5))
+    backend = LocalBackend(latency=0.0)
+    metrics = Metrics()
+
+    placements = plan_placements("m", anchors, "Title", 6, backend=backend, metrics=metrics, chunk_anchors=25, concurrency=4)
+
+    chunks = len(split_into_chunks(anchors, 25))
+    assert chunks > 1
+    assert backend.calls["plan"] == chunks
+    assert metrics.counters["plan.chunks"] == chunks
+    assert 1 < len(placements) <= 6
+    lines = [next(a.start_line for a in anchors if a.anchor_id == p.anchor_id) for p in placements]
+    assert lines == sorted(lines)
@@ -0,0 +1,96 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from blog_image_agent.backends import LocalBackend
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator
+from blog_image_agent import pipeline
+from blog_image_agent.pipeline import _get_generator, _iter_generated_images
+from blog_image_agent.planner import Placement
+from blog_image_agent.scheduler import RequestScheduler
+
+
+class _SlowFirstBackend(LocalBackend):
+    """Counts image requests per prompt; earlier prompts in ``order`` take longer to finish."""
+
+    def __init__(self, order: List[str]):
+        super().__init__(latency=0.0, image_latency=0.0, jitter=0.0)
+        self.order = order
+        self.prompts: Dict[str, int] = {}
+        self._prompts_lock = threading.Lock()
+
+    def generate_image(self, model: str, prompt: str, width: int, height: int, timeout: Optional[float] = None) -> bytes:
+        with self._prompts_lock:
+            self.prompts[prompt] = self.prompts.get(prompt, 0) + 1
+        time.sleep(0.1 * (len(self.order) - self.order.index(prompt)))
+        return super().generate_image(model, prompt, width, height, timeout=timeout)
+
+
+def _generator(tmp_path: Path, backend: LocalBackend) -> ImageGenerator:
+    config = ImageGenConfig(
+        image_model="local-test", default_width=64, default_height=64, compress_webp=False, webp_quality=80
+    )
+    return ImageGenerator(config, str(tmp_path / "assets"), backend=backend)
+
+
+def _placement(anchor_id: str, prompt: str, aspect_ratio: str = "16:9") -> Placement:
+    return Placement(anchor_id, "after", prompt, f"alt {anchor_id}", None, aspect_ratio)
+
+
+def test_images_keep_planner_order_when_generated_in_parallel(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    prompts = ["first", "second", "third", "fourth"]
+    placements = [_placement(f"a{i}", prompt) for i, prompt in enumerate(prompts)]
+    gen = _generator(tmp_path, _SlowFirstBackend(prompts))
+
+    yielded = list(_iter_generated_images(gen, placements, max_concurrency=4))
+
+    # Completion order is reversed (the first prompt is slowest) ...
+    assert [i for i, _, _ in yielded] == [3, 2, 1, 0]
+    # ... but every image lands in its planner slot.
+    by_slot = {i: image for i, image, _ in yielded}
+    expected = [gen.render(p.prompt, p.aspect_ratio, p.alt_text).path for p in placements]
+    assert [by_slot[i].path for i in range(len(placements))] == expected
+
+
+def test_duplicate_prompts_are_generated_once_and_fill_every_slot(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    placements = [
+        _placement("a0", "harbour"),
+        _placement("a1", "lighthouse"),
+        _placement("a2", "harbour"),
+        _placement("a3", "harbour", aspect_ratio="1:1"),
+        _placement("a4", "lighthouse"),
+    ]
+    backend = _SlowFirstBackend(["harbour", "lighthouse"])
+    gen = _generator(tmp_path, backend)
+
+    yielded = list(_iter_generated_images(gen, placements, max_concurrency=3))
+
+    assert sorted(i for i, _, _ in yielded) == [0, 1, 2, 3, 4]
+    # Same (prompt, aspect_ratio) -> one request; another aspect ratio is its own image.
+    assert backend.prompts == {"harbour": 2, "lighthouse": 1}
+    by_slot = {i: image.path for i, image, _ in yielded}
+    assert by_slot[0] == by_slot[2] != by_slot[3]
+    assert by_slot[1] == by_slot[4]
+
+
+def test_generator_cache_is_keyed_on_the_objects_and_bounded(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(pipeline, "_GENERATORS", type(pipeline._GENERATORS)())
+    monkeypatch.setattr(pipeline, "MAX_CACHED_GENERATORS", 2)
+    config = ImageGenConfig(
+        image_model="local-test", default_width=64, default_height=64, compress_webp=False, webp_quality=80
+    )
+    assets = str(tmp_path / "assets")
+    scheduler, backend = RequestScheduler(60, 60, 0), LocalBackend()
+
+    gen = _get_generator(config, assets, scheduler, backend)
+    assert _get_generator(config, assets, scheduler, backend) is gen
+    assert gen.scheduler is scheduler
+    # An equal-looking but distinct backend never picks up a generator bound to another object.
+    assert _get_generator(config, assets, scheduler, LocalBackend()) is not gen
+
+    _get_generator(config, assets, RequestScheduler(60, 60, 0), backend)
+    assert len(pipeline._GENERATORS) == 2
+    assert _get_generator(config, assets, scheduler, backend) is not gen
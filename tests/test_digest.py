@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from blog_image_agent.backends import LocalBackend
+from blog_image_agent.digest import build_anchor_digest, score_anchors
+from blog_image_agent.markdown_utils import Anchor, extract_anchors
+from blog_image_agent.metrics import Metrics
+from blog_image_agent.planner import plan_placements
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _long_post(sections: int) -> str:
+    parts = ["# Title", ""]
+    for s in range(sections):
+        parts += [f"## Section {s}", ""]
+        parts += ["Common filler words repeated across the whole post again and again. " * 6, ""]
+        parts += [f"Unique topic{s} discusses quasar{s} telemetry and lattice{s} scheduling. " * 3, ""]
+    return "\n".join(parts)
+
+
+def test_small_post_is_sent_unchanged():
+    anchors = extract_anchors(SAMPLE.read_text(encoding="utf-8"))
+    digest = build_anchor_digest(anchors, max_tokens=100_000)
+
+    assert [e["anchor_id"] for e in digest.entries] == [a.anchor_id for a in anchors]
+    assert digest.tokens_saved == 0
+    assert [e["text_excerpt"] for e in digest.entries] == [a.text[:200] + ("…" if len(a.text) > 200 else "") for a in anchors]
+
+
+def test_budget_keeps_best_ranked_anchors_in_document_order():
+    anchors = extract_anchors(_long_post(sections=40))
+    digest = build_anchor_digest(anchors, max_tokens=1500, max_images=5)
+
+    assert digest.estimated_tokens <= 1500
+    assert digest.tokens_saved > 0
+    assert digest.dropped
+    lines = [e["start_line"] for e in digest.entries]
+    assert lines == sorted(lines)
+    assert len(digest.entries) >= 20
+    # Repeated filler is the least distinctive text in the post and is dropped first.
+    assert not any(e["text_excerpt"].startswith("Common filler") for e in digest.entries)
+
+
+def test_tfidf_prefers_distinctive_paragraphs():
+    words = "alpha beta gamma delta " * 20
+    anchors = [
+        Anchor("a1", "paragraph", None, words, 0, 1),
+        Anchor("a2", "paragraph", None, words, 2, 3),
+        Anchor("a3", "paragraph", None, "zebra quokka narwhal axolotl " * 20, 4, 5),
+    ]
+    scores = score_anchors(anchors)
+    assert scores["a3"] > scores["a1"] == scores["a2"]
+
+
+def test_planner_reports_tokens_saved(monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    anchors = extract_anchors(_long_post(sections=40))
+    metrics = Metrics()
+
+    placements = plan_placements("m", anchors, "Title", 3, backend=LocalBackend(latency=0.0), metrics=metrics, token_budget=1500)
+
+    assert placements
+    assert metrics.counters["plan.prompt_tokens"] <= 1500
+    assert metrics.counters["plan.prompt_tokens_saved"] > 0
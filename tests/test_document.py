@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from blog_image_agent.markdown_utils import Document, build_markdown_parser, extract_anchors
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def test_document_parses_once_and_matches_extract_anchors():
+    text = SAMPLE.read_text(encoding="utf-8")
+    doc = Document.parse(text, default_title="fallback")
+
+    assert doc.title == "The Art of Writing Maintainable Code"
+    assert doc.anchors == extract_anchors(text)
+    assert doc.lines == text.splitlines()
+    assert [text[o:].split("\n", 1)[0] for o in doc.line_offsets] == doc.lines
+    assert build_markdown_parser() is build_markdown_parser()
+
+
+def test_document_title_falls_back_without_heading():
+    assert Document.parse("plain text\n", default_title="post").title == "post"
@@ -0,0 +1,96 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from blog_image_agent import image_gen
+from blog_image_agent.backends import LocalBackend, simulated_png
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator, format_supported, search_encoding
+
+needs_avif = pytest.mark.skipif(not format_supported("avif"), reason="Pillow cannot encode AVIF (needs >= 11.2)")
+
+
+def _photo(width: int = 320, height: int = 180) -> Image.Image:
+    return Image.open(io.BytesIO(simulated_png(width, height))).convert("RGB")
+
+
+def test_search_finds_highest_quality_under_budget():
+    image = _photo()
+
+    tight = search_encoding(image, ["webp"], max_bytes=8_000, min_quality=20)
+    loose = search_encoding(image, ["webp"], max_bytes=30_000, min_quality=20)
+
+    assert tight.within_budget and len(tight.data) <= 8_000
+    assert loose.within_budget and len(loose.data) <= 30_000
+    assert 20 <= tight.quality < loose.quality <= 95
+
+    impossible = search_encoding(image, ["webp", "jpeg"], max_bytes=100, min_quality=50)
+    assert not impossible.within_budget and impossible.quality == 50
+
+
+def test_search_picks_the_smallest_fit_among_formats():
+    image = _photo()
+    formats = [f for f in ("jpeg", "webp", "avif") if format_supported(f)]
+    best = search_encoding(image, formats, max_bytes=10_000, min_quality=20, preset="speed")
+
+    assert best.within_budget and len(best.data) <= 10_000
+    for fmt in formats:
+        alone = search_encoding(image, [fmt], max_bytes=10_000, min_quality=20, preset="speed")
+        assert len(best.data) <= len(alone.data)
+
+
+def test_unsupported_budget_format_is_dropped_with_a_warning(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(image_gen, "format_supported", lambda fmt: fmt != "avif")
+    config = ImageGenConfig(
+        image_model="m",
+        default_width=64,
+        default_height=64,
+        compress_webp=True,
+        webp_quality=80,
+        byte_budget=5_000,
+        budget_formats=("avif", "jpeg"),
+    )
+
+    with pytest.warns(RuntimeWarning, match="avif"):
+        gen = ImageGenerator(config, str(tmp_path / "assets"))
+
+    assert gen.config.budget_formats == ("jpeg",)
+
+
+@needs_avif
+def test_generator_writes_budgeted_companion(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    config = ImageGenConfig(
+        image_model="gpt-image-1",
+        default_width=320,
+        default_height=180,
+        compress_webp=True,
+        webp_quality=90,
+        cache_dir=str(tmp_path / "cache"),
+        encode_preset="speed",
+        responsive_widths=(160,),
+        byte_budget=12_000,
+        min_quality=20,
+        budget_formats=("avif", "webp"),
+        encode_workers=2,
+    )
+    backend = LocalBackend(latency=0.0, image_latency=0.0)
+    first = ImageGenerator(config, str(tmp_path / "assets"), backend=backend)
+    image = first.render("a harbour", "16:9", "")
+
+    (fmt, summary), = image.encodings.items()
+    assert fmt in {"avif", "webp"} and summary["within_budget"]
+    companion = image.path.with_suffix(f".{fmt}")
+    assert companion.stat().st_size == summary["bytes"] <= 12_000
+    assert [p.suffix for _, p in image.variants[fmt]] == [f".{fmt}"]
+    first.manifest.flush()
+    manifest = json.loads((tmp_path / "assets" / "assets-manifest.json").read_text())
+    assert manifest["images"][image.path.name]["encodings"] == image.encodings
+
+    # A cache hit finds the companion under whichever format the search picked.
+    again = ImageGenerator(config, str(tmp_path / "other"), backend=backend).render("a harbour", "16:9", "")
+    assert backend.calls["image"] == 1
+    assert again.path.name == image.path.name
+    assert again.path.with_suffix(f".{fmt}").exists()
@@ -0,0 +1,80 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+from pydantic import ValidationError
+from typer.testing import CliRunner
+
+from blog_image_agent.cli import app
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.image_gen import ENCODE_PRESETS, SourceImage, encode_image
+from blog_image_agent.pipeline import process_blog
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _image() -> Image.Image:
+    image = Image.radial_gradient("L").resize((320, 180)).convert("RGB")
+    ImageDraw.Draw(image).ellipse((40, 30, 200, 150), fill=(200, 40, 90))
+    return image
+
+
+@pytest.mark.parametrize("fmt", ["png", "webp", "jpeg"])
+def test_every_preset_encodes_from_the_decoded_image(fmt: str):
+    source = SourceImage(image=_image())
+    sizes = {}
+    for preset in ENCODE_PRESETS:
+        data = encode_image(source, fmt, preset, 80)
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.format == fmt.upper() and decoded.size == (320, 180)
+        sizes[preset] = len(data)
+    assert sizes["size"] <= sizes["balanced"] <= sizes["speed"]
+
+
+def test_png_bytes_from_the_api_are_written_as_is():
+    buf = io.BytesIO()
+    _image().save(buf, format="PNG")
+    source = SourceImage(data=buf.getvalue())
+    assert all(encode_image(source, "png", preset, 80) == buf.getvalue() for preset in ENCODE_PRESETS)
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError, match="encode preset"):
+        encode_image(SourceImage(image=_image()), "webp", "fastest", 80)
+
+
+def test_webp_format_links_webp_files(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = tmp_path / "post.md"
+    post.write_text(SAMPLE.read_text(encoding="utf-8"), encoding="utf-8")
+    config = AgentConfig(image_format="webp", image_cache=False, plan_cache=False)
+
+    result = process_blog(str(post), str(tmp_path / "assets"), config, 2)
+
+    markdown = result.output_markdown_path.read_text(encoding="utf-8")
+    assert len(result.image_paths) == 2
+    for path in result.image_paths:
+        assert path.suffix == ".webp" and f"](assets/{path.name})" in markdown
+        with Image.open(path) as saved:
+            assert saved.format == "WEBP"
+    assert ".png)" not in markdown
+
+
+def test_invalid_settings_fail_before_any_work(tmp_path: Path):
+    with pytest.raises(ValidationError):
+        AgentConfig(encode_preset="fastest")
+    config = AgentConfig()
+    with pytest.raises(ValidationError):
+        config.planner = "lcoal"
+    with pytest.raises(ValidationError, match="Unknown backend"):
+        AgentConfig(backend="lcoal")
+
+    assets = tmp_path / "assets"
+    options = [("--image-format", "gif"), ("--planner", "lcoal"), ("--encode-preset", "fastest"), ("--backend", "opnai")]
+    for option, value in options:
+        args = ["process", "--input", str(SAMPLE), "--assets-dir", str(assets), option, value]
+        result = CliRunner().invoke(app, args)
+        assert result.exit_code == 2, result.output
+        assert "Invalid value" in result.output
+    assert not assets.exists()
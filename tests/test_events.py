@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+import json
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from blog_image_agent.cli import app
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.events import AnchorsExtracted, ImageGenerated, MarkdownWritten, PlanReady, event_to_dict
+from blog_image_agent.pipeline import aprocess_blog_iter, process_blog_iter
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _post(tmp_path: Path) -> Path:
+    post = tmp_path / "post.md"
+    post.write_text(SAMPLE.read_text(encoding="utf-8"), encoding="utf-8")
+    return post
+
+
+def test_events_arrive_in_pipeline_order(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = _post(tmp_path)
+    cfg = AgentConfig(plan_cache=False, max_concurrency=3)
+
+    events = list(process_blog_iter(str(post), str(tmp_path / "assets"), cfg, 3))
+
+    assert isinstance(events[0], AnchorsExtracted) and events[0].anchors > 0
+    assert isinstance(events[1], PlanReady) and len(events[1].placements) == 3
+    images = [e for e in events if isinstance(e, ImageGenerated)]
+    assert sorted(e.index for e in images) == [0, 1, 2]
+    # Each image is on disk by the time its event is yielded.
+    assert all(e.path.exists() and e.total == 3 for e in images)
+    written = events[-1]
+    assert isinstance(written, MarkdownWritten)
+    assert written.output_path.exists()
+    assert sorted(written.result.image_paths) == sorted(e.path for e in images)
+    assert json.loads(json.dumps(event_to_dict(written)))["event"] == "written"
+
+
+def test_async_iterator_yields_the_same_events(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = _post(tmp_path)
+
+    async def collect():
+        return [e async for e in aprocess_blog_iter(str(post), str(tmp_path / "assets"), AgentConfig(plan_cache=False), 2)]
+
+    kinds = [e.event for e in asyncio.run(collect())]
+    assert kinds == ["anchors", "plan", "image", "image", "written"]
+
+
+def test_async_consumer_can_stop_early(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = _post(tmp_path)
+    config = AgentConfig(plan_cache=False, image_cache=False, max_concurrency=1)
+
+    async def first_event():
+        events = aprocess_blog_iter(str(post), str(tmp_path / "assets"), config, 3, max_pending=1)
+        async with contextlib.aclosing(events):
+            async for event in events:
+                return event
+
+    assert asyncio.run(first_event()).event == "anchors"
+    # The worker saw the stop flag before the last image and never wrote the Markdown.
+    assert not post.with_name("post.illustrated.md").exists()
+    assert len(list((tmp_path / "assets").glob("img-*.png"))) < 3
+
+
+def test_cli_streams_ndjson(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = _post(tmp_path)
+
+    result = CliRunner().invoke(
+        app, ["process", "--input", str(post), "--assets-dir", str(tmp_path / "assets"), "--max-images", "2", "--events", "ndjson"]
+    )
+
+    assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert [line["event"] for line in lines] == ["anchors", "plan", "image", "image", "written"]
+    assert Path(lines[2]["path"]).exists()
@@ -0,0 +1,100 @@
+import base64
+import io
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+from blog_image_agent.backends import OpenAIBackend
+from blog_image_agent.cache import ImageCache
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator
+
+
+class _FakeImages:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, size):
+        self.calls += 1
+        width, height = (int(v) for v in size.split("x"))
+        buf = io.BytesIO()
+        Image.new("RGB", (width, height), color=(10, 20, 30)).save(buf, format="PNG")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(buf.getvalue()).decode())])
+
+
+def _generator(assets_dir: Path, cache_dir: Path, model: str = "gpt-image-1") -> ImageGenerator:
+    return ImageGenerator(
+        config=ImageGenConfig(
+            image_model=model,
+            default_width=64,
+            default_height=48,
+            compress_webp=True,
+            webp_quality=80,
+            cache_dir=str(cache_dir),
+        ),
+        assets_dir=str(assets_dir),
+        backend=OpenAIBackend(client=SimpleNamespace(images=_FakeImages())),
+    )
+
+
+def test_rerun_hits_shared_cache(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    cache_dir = tmp_path / "cache"
+
+    first = _generator(tmp_path / "post-a", cache_dir)
+    path = first.generate(prompt="a lighthouse", aspect_ratio="4:3", alt_text="")
+    assert first.backend.client.images.calls == 1
+
+    second = _generator(tmp_path / "post-b", cache_dir)
+    again = second.generate(prompt="a lighthouse", aspect_ratio="4:3", alt_text="")
+    assert second.backend.client.images.calls == 0
+    assert again.name == path.name
+    assert again.read_bytes() == path.read_bytes()
+    assert again.with_suffix(".webp").exists()
+
+
+def test_key_includes_model(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    cache_dir = tmp_path / "cache"
+
+    a = _generator(tmp_path / "assets", cache_dir, model="model-a").generate("same prompt", "16:9", "")
+    b = _generator(tmp_path / "assets", cache_dir, model="model-b").generate("same prompt", "16:9", "")
+    assert a != b
+
+
+def test_lru_eviction(tmp_path: Path):
+    cache = ImageCache(tmp_path / "cache", max_bytes=25)
+    out = tmp_path / "out"
+    out.mkdir()
+    for name in ("a.png", "b.png", "c.png"):
+        src = tmp_path / name
+        src.write_bytes(b"x" * 10)
+        cache.put(src)
+        if name == "b.png":
+            # Touch "a" so "b" becomes the least recently used entry.
+            assert cache.restore(["a.png"], out)
+
+    remaining = {p.name for p in (tmp_path / "cache").glob("*.png")}
+    assert remaining == {"a.png", "c.png"}
+    assert cache.total_bytes() <= 25
+
+
+def test_manifest_is_written_on_flush_and_merged(tmp_path: Path):
+    cache_dir = tmp_path / "cache"
+    first, second = ImageCache(cache_dir, max_bytes=1000), ImageCache(cache_dir, max_bytes=1000)
+    for cache, name in ((first, "a.png"), (first, "b.png"), (second, "c.png")):
+        src = tmp_path / name
+        src.write_bytes(b"x" * 10)
+        cache.put(src)
+    manifest = cache_dir / ImageCache.MANIFEST_NAME
+    assert not manifest.exists()
+
+    first.flush()
+    written = manifest.stat().st_mtime_ns
+    first.flush()  # nothing new: no rewrite
+    assert manifest.stat().st_mtime_ns == written
+    second.flush()
+
+    entries = json.loads(manifest.read_text(encoding="utf-8"))["entries"]
+    assert set(entries) == {"a.png", "b.png", "c.png"}
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+from blog_image_agent import pipeline
+from blog_image_agent.backends import clear_backends, get_backend
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.image_gen import ImageGenerator
+from blog_image_agent.manifest import AssetManifest
+from blog_image_agent.pipeline import process_blog
+from blog_image_agent.planner import Placement
+
+
+def test_incremental_rerun_only_regenerates_edited_section(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    calls: list[str] = []
+    original_render = ImageGenerator.render
+
+    def counting_render(self, prompt, aspect_ratio, alt_text, **kwargs):
+        calls.append(prompt)
+        return original_render(self, prompt, aspect_ratio, alt_text, **kwargs)
+
+    monkeypatch.setattr(ImageGenerator, "render", counting_render)
+
+    post = tmp_path / "post.md"
+    post.write_text(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+    cfg = AgentConfig(incremental=True, image_cache=False)
+
+    first = process_blog(str(post), str(tmp_path / "assets"), cfg)
+    assert len(calls) == len(first.image_paths) > 1
+
+    calls.clear()
+    again = process_blog(str(post), str(tmp_path / "assets"), cfg)
+    assert calls == []
+    assert again.output_markdown_path.read_text(encoding="utf-8") == first.output_markdown_path.read_text(encoding="utf-8")
+
+    post.write_text(post.read_text(encoding="utf-8").replace("form of empathy", "form of kindness"), encoding="utf-8")
+    edited = process_blog(str(post), str(tmp_path / "assets"), cfg)
+    assert len(calls) == 1
+    assert "Testing and Tooling" in calls[0]
+    assert edited.reused_placements == len(first.image_paths) - 1
+
+
+def test_incremental_merge_never_puts_images_back_to_back(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+
+    def fake_plan(anchors, max_images, **kwargs):
+        # First run: a4 and a10; after the edit, both anchors of the dirty "Testing and Tooling" section.
+        wanted = ["a10", "a4"] if len(anchors) > 2 else ["a11", "a12"]
+        by_id = {a.anchor_id: a for a in anchors}
+        return [Placement(i, "after", f"image for {by_id[i].text[:20]}", "", None, "16:9") for i in wanted][:max_images]
+
+    monkeypatch.setattr(pipeline, "plan_placements", fake_plan)
+    post = tmp_path / "post.md"
+    post.write_text(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+    cfg = AgentConfig(incremental=True, image_cache=False, plan_cache=False, max_images=4)
+
+    first = process_blog(str(post), str(tmp_path / "assets"), cfg)
+    assert len(first.image_paths) == 2
+
+    post.write_text(post.read_text(encoding="utf-8").replace("form of empathy", "form of kindness"), encoding="utf-8")
+    edited = process_blog(str(post), str(tmp_path / "assets"), cfg)
+
+    # a11 (the edited section's heading) sits right after the reused a10 image, so only a12 is new.
+    markdown = edited.output_markdown_path.read_text(encoding="utf-8")
+    assert [line.split("anchor:")[1].split()[0] for line in markdown.splitlines() if "ai-image anchor:" in line] == [
+        "a4",
+        "a10",
+        "a12",
+    ]
+    assert edited.reused_placements == 2
+
+
+def test_live_incremental_run_replaces_dry_run_placeholders(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = tmp_path / "post.md"
+    post.write_text(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+    cfg = AgentConfig(
+        incremental=True,
+        image_cache=False,
+        plan_cache=False,
+        backend="local",
+        local_backend_latency=0.0,
+        local_backend_image_latency=0.0,
+        local_backend_jitter=0.0,
+        default_width=64,
+        default_height=36,
+    )
+    dry = process_blog(str(post), str(tmp_path / "assets"), cfg, 2)
+    assert process_blog(str(post), str(tmp_path / "assets"), cfg, 2).reused_placements == 2  # still dry: keep them
+
+    monkeypatch.delenv("DRY_RUN")
+    clear_backends()
+    live = process_blog(str(post), str(tmp_path / "assets"), cfg, 2)
+
+    assert live.reused_placements == 0
+    assert get_backend(cfg).calls["image"] == len(live.image_paths) == len(dry.image_paths)
+    manifest = AssetManifest(tmp_path / "assets")
+    assert [manifest.get(p.name)["source"] for p in live.image_paths] == ["api", "api"]
+
+    # Once real images exist, a further live run reuses them.
+    assert process_blog(str(post), str(tmp_path / "assets"), cfg, 2).reused_placements == 2
+    clear_backends()
@@ -0,0 +1,57 @@
+import random
+from pathlib import Path
+
+from blog_image_agent.inserter import plan_insertions
+from blog_image_agent.markdown_utils import extract_anchors, insert_block_after_line, insert_blocks_after_lines
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _one_at_a_time(text, blocks):
+    for line, block in sorted(blocks, key=lambda b: b[0], reverse=True):
+        text = insert_block_after_line(text, line, block)
+    return text
+
+
+def test_single_pass_matches_one_at_a_time():
+    rng = random.Random(1234)
+    pieces = ["# Title", "", "Some paragraph text.", "   ", "- item", "```", "code", "## Heading"]
+    for _ in range(500):
+        lines = [rng.choice(pieces) for _ in range(rng.randint(0, 30))]
+        text = rng.choice(["\n", "\r\n"]).join(lines) + rng.choice(["", "\n"])
+        blocks = [
+            (rng.randint(-2, len(lines) + 3), rng.choice(["![a](x.png) <!-- ai-image anchor:a1 -->", "![b](y.png)\n*caption*"]))
+            for _ in range(rng.randint(0, 8))
+        ]
+        assert insert_blocks_after_lines(text, blocks) == _one_at_a_time(text, blocks)
+
+
+def test_plan_insertions_on_sample():
+    text = SAMPLE.read_text(encoding="utf-8")
+    anchors = extract_anchors(text)
+    placements = [(a.anchor_id, f"assets/{a.anchor_id}.png", "cap" if i % 2 else None) for i, a in enumerate(anchors)]
+    expected = _one_at_a_time(
+        text,
+        [
+            (a.end_line, f"![{a.text[:120]}](assets/{a.anchor_id}.png) <!-- ai-image anchor:{a.anchor_id} -->" + ("\n*cap*" if i % 2 else ""))
+            for i, a in enumerate(anchors)
+        ],
+    )
+    assert plan_insertions(text, anchors, placements) == expected
+
+
+def test_responsive_block_keeps_anchor_comment():
+    from blog_image_agent.inserter import ImageSource, _build_image_block
+
+    image = ImageSource(
+        src="assets/x.png",
+        width=1280,
+        height=720,
+        srcsets={"png": [("assets/x.png", 1280), ("assets/x-480w.png", 480)], "webp": [("assets/x.webp", 1280), ("assets/x-480w.webp", 480)]},
+    )
+    block = _build_image_block(image, alt_text='A "quoted" alt', caption=None, anchor_id="a3")
+
+    assert block.startswith('<picture><source type="image/webp" srcset="assets/x.webp 1280w, assets/x-480w.webp 480w"')
+    assert 'srcset="assets/x.png 1280w, assets/x-480w.png 480w"' in block
+    assert 'alt="A &quot;quoted&quot; alt"' in block
+    assert block.endswith("</picture> <!-- ai-image anchor:a3 -->")
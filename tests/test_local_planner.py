@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from blog_image_agent.backends import LocalBackend  # noqa: E402
+from blog_image_agent.markdown_utils import extract_anchors  # noqa: E402
+from blog_image_agent.local_planner import plan_local  # noqa: E402
+from blog_image_agent.planner import plan_placements  # noqa: E402
+
+
+def _post() -> str:
+    parts = ["# Caching in Python", "", "Short intro.", ""]
+    for s, topic in enumerate(["Setup", "Caching strategies", "Python caching pitfalls", "Deployment", "Wrap-up"]):
+        parts += [f"## {topic}", ""]
+        body = "caching python cache layers " if "aching" in topic else "general notes about the project "
+        parts += [(body * (4 + s)).strip() + " " + "filler words for length " * 6, ""]
+        parts += ["Another paragraph with enough words to be a candidate for an image here. " * 3, ""]
+    return "\n".join(parts)
+
+
+def test_local_plan_is_spaced_ordered_and_skips_title():
+    anchors = extract_anchors(_post())
+    index = {a.anchor_id: i for i, a in enumerate(anchors)}
+
+    placements = plan_local(anchors, "Caching in Python", 4)
+
+    positions = [index[p.anchor_id] for p in placements]
+    assert len(placements) == 4
+    assert positions == sorted(positions)
+    assert all(b - a >= 2 for a, b in zip(positions, positions[1:]))
+    assert anchors[0].anchor_id not in {p.anchor_id for p in placements}
+    assert all(p.prompt and p.aspect_ratio in {"16:9", "4:3"} for p in placements)
+
+
+def test_title_keywords_pull_sections_forward():
+    anchors = extract_anchors(_post())
+    chosen = {a.text for a in anchors if a.anchor_id in {p.anchor_id for p in plan_local(anchors, "Caching in Python", 2)}}
+    assert chosen & {"Caching strategies", "Python caching pitfalls"}
+
+
+def test_local_mode_makes_no_backend_calls(monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    backend = LocalBackend(latency=0.0)
+
+    placements = plan_placements("m", extract_anchors(_post()), "Caching in Python", 3, backend=backend, mode="local")
+
+    assert len(placements) == 3
+    assert backend.calls["plan"] == 0
+    with pytest.raises(ValueError, match="planner mode"):
+        plan_placements("m", [], "", 1, mode="nope")
+
+
+def test_realistic_prose_paragraphs_are_candidates():
+    # One section of ordinary prose: stopwords make up half of every paragraph, so only the
+    # raw word count marks these as real paragraphs rather than one-liners.
+    sample = (Path(__file__).parents[1] / "samples" / "sample.md").read_text(encoding="utf-8")
+    paragraphs = [a.text for a in extract_anchors(sample) if a.kind == "paragraph"]
+    post = "\n\n".join(["# The Art of Writing Maintainable Code", "## Notes", *paragraphs, "Short closing line."])
+    anchors = extract_anchors(post)
+    kinds = {a.anchor_id: a.kind for a in anchors}
+
+    placements = plan_local(anchors, "The Art of Writing Maintainable Code", 3)
+
+    assert len(placements) == 3
+    assert sum(kinds[p.anchor_id] == "paragraph" for p in placements) >= 2
+    assert anchors[-1].anchor_id not in {p.anchor_id for p in placements}
+    assert all(p.aspect_ratio == "4:3" for p in placements if kinds[p.anchor_id] == "paragraph")
@@ -0,0 +1,15 @@
+from PIL import Image
+
+from blog_image_agent.lqip import blurhash, webp_placeholder
+
+
+def test_blurhash_matches_reference_encoder():
+    # Reference value from the upstream `blurhash` package on the same 32px sample.
+    image = Image.effect_mandelbrot((1280, 720), (-2, -1, 1, 1), 100).convert("RGB")
+    assert blurhash(image) == "L025[Ut7IUWBt7j[ayayofM{IU%M"
+
+
+def test_webp_placeholder_is_small_data_uri():
+    uri = webp_placeholder(Image.new("RGB", (1280, 720), color=(200, 100, 50)))
+    assert uri.startswith("data:image/webp;base64,")
+    assert len(uri) < 1024
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from openai import OpenAI
+
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.metrics import NULL_METRICS, Metrics
+from blog_image_agent.pipeline import process_blog
+from blog_image_agent.scheduler import RequestScheduler
+
+from fake_openai import FakeOpenAIServer
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _post(tmp_path: Path) -> Path:
+    post = tmp_path / "post.md"
+    post.write_text(SAMPLE.read_text(encoding="utf-8"), encoding="utf-8")
+    return post
+
+
+def test_process_blog_reports_stage_spans_and_counters(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = _post(tmp_path)
+
+    result = process_blog(str(post), str(tmp_path / "assets"), AgentConfig(metrics=True, plan_cache=False), 2)
+
+    assert result.metrics is not None
+    spans = result.metrics["spans"]
+    for stage in ("parse", "plan", "generate", "encode", "insert", "write"):
+        assert spans[stage]["count"] >= 1
+    assert spans["generate.image"]["count"] == 2
+    assert result.metrics["counters"]["images.placements"] == 2
+    assert result.metrics["counters"]["images.cache_misses"] == 2
+
+    again = process_blog(str(post), str(tmp_path / "assets"), AgentConfig(plan_cache=False), 2)
+    assert again.metrics is None
+
+
+def test_scheduler_counts_calls_and_retries():
+    metrics = Metrics()
+    with FakeOpenAIServer(fail_first=2, retry_after=0.01) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=5, base_delay=0.01, max_delay=0.02)
+        scheduler.call(lambda: client.images.generate(model="m", prompt="p", size="16x16"), images=1, metrics=metrics)
+
+    counters = metrics.to_dict()["counters"]
+    assert counters == {"api.calls": 3, "api.rate_limited": 2, "api.retries": 2}
+
+
+def test_null_metrics_records_nothing():
+    with NULL_METRICS.span("parse"):
+        NULL_METRICS.incr("api.calls")
+    assert NULL_METRICS.to_dict() == {"spans": {}, "counters": {}}
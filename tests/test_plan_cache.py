@@ -0,0 +1,50 @@
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from blog_image_agent import plan_cache, planner
+from blog_image_agent.backends import OpenAIBackend
+from blog_image_agent.markdown_utils import extract_anchors
+from blog_image_agent.plan_cache import PlanCache
+
+
+class _FakeCompletions:
+    def __init__(self, anchor_id: str):
+        self.calls = 0
+        self.anchor_id = anchor_id
+
+    def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps({"placements": [{"anchor_id": self.anchor_id, "prompt": "p", "alt_text": "a"}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_second_plan_is_served_from_cache(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    anchors = extract_anchors(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"))
+    completions = _FakeCompletions(anchors[1].anchor_id)
+    backend = OpenAIBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    cache = PlanCache(tmp_path, ttl_seconds=3600, max_entries=10)
+    first = planner.plan_placements("model", anchors, "Title", 2, cache=cache, backend=backend)
+    second = planner.plan_placements("model", anchors, "Title", 2, cache=cache, backend=backend)
+
+    assert completions.calls == 1
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    planner.plan_placements("model", anchors, "Title", 3, cache=cache, backend=backend)
+    assert completions.calls == 2
+
+
+def test_eviction_and_ttl(tmp_path: Path, monkeypatch):
+    cache = PlanCache(tmp_path, ttl_seconds=3600, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, [key])
+    assert cache.get("a") is None
+    assert cache.get("c") == ["c"]
+
+    now = time.time()
+    monkeypatch.setattr(plan_cache.time, "time", lambda: now + 7200)
+    assert cache.get("c") is None
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+from blog_image_agent.backends import LocalBackend
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator
+from blog_image_agent.prompt_index import PromptIndex, minhash, similarity
+
+
+def _generator(assets_dir: Path, backend: LocalBackend, threshold: float = 0.6, width: int = 64) -> ImageGenerator:
+    return ImageGenerator(
+        config=ImageGenConfig(
+            image_model="gpt-image-1",
+            default_width=width,
+            default_height=36,
+            compress_webp=False,
+            webp_quality=80,
+            reuse_threshold=threshold,
+        ),
+        assets_dir=str(assets_dir),
+        backend=backend,
+    )
+
+
+def test_similarity_ignores_case_punctuation_and_filler():
+    a = minhash("Illustrative concept art for: Testing and Tooling…")
+    assert similarity(a, minhash("illustrative concept art: testing, tooling")) == 1.0
+    assert similarity(a, minhash("Illustrative concept art for: Testing and Tools")) > 0.5
+    assert similarity(a, minhash("A lighthouse at dusk over a stormy sea")) < 0.2
+
+
+def test_near_duplicate_prompt_reuses_image(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    backend = LocalBackend(latency=0.0, image_latency=0.0)
+    gen = _generator(tmp_path, backend)
+
+    first = gen.generate("Illustrative concept art for: Testing and Tooling in Python projects", "16:9", "")
+    second = gen.generate("Illustrative concept art for: testing & tooling in Python projects!", "16:9", "")
+    other = gen.generate("A lighthouse at dusk over a stormy sea", "16:9", "")
+
+    assert second == first
+    assert other != first
+    assert backend.calls["image"] == 2
+    gen.manifest.flush()
+    entry = json.loads((tmp_path / "assets-manifest.json").read_text())["images"][first.name]
+    assert entry["reused_for"][0]["prompt"].endswith("projects!")
+
+    # The index is persisted next to the assets and used by later runs.
+    gen.prompt_index.flush()
+    later = _generator(tmp_path, backend)
+    assert later.generate("Illustrative concept art: Testing and Tooling in Python projects", "16:9", "") == first
+    assert backend.calls["image"] == 2
+
+
+def test_reuse_is_off_by_default_and_never_crosses_sizes(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    backend = LocalBackend(latency=0.0, image_latency=0.0)
+
+    off = _generator(tmp_path / "off", backend, threshold=0.0)
+    off.generate("concept art for testing", "16:9", "")
+    off.generate("concept art for testing!", "16:9", "")
+    assert off.prompt_index is None
+    assert backend.calls["image"] == 2
+
+    gen = _generator(tmp_path / "on", backend)
+    gen.generate("concept art for testing", "16:9", "")
+    gen.generate("concept art for testing", "1:1", "")
+    assert backend.calls["image"] == 4
+
+
+def test_missing_files_are_dropped_from_index(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    backend = LocalBackend(latency=0.0, image_latency=0.0)
+    gen = _generator(tmp_path, backend)
+
+    first = gen.generate("concept art for testing and tooling", "16:9", "")
+    first.unlink()
+    again = gen.generate("concept art for testing & tooling", "16:9", "")
+
+    assert again.exists()
+    assert backend.calls["image"] == 2
+    assert len(gen.prompt_index) == 1
+    gen.prompt_index.flush()
+    assert len(PromptIndex(tmp_path)) == 1
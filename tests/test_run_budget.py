@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from blog_image_agent.backends import LocalBackend
+from blog_image_agent.budget import RunBudget, RunTracker
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.markdown_utils import extract_anchors
+from blog_image_agent.pipeline import process_blog
+from blog_image_agent.planner import plan_placements
+from blog_image_agent.scheduler import RequestScheduler
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "sample.md"
+
+
+def _post(tmp_path: Path) -> Path:
+    post = tmp_path / "post.md"
+    post.write_text(SAMPLE.read_text(encoding="utf-8"), encoding="utf-8")
+    return post
+
+
+def _config(**overrides) -> AgentConfig:
+    settings = dict(
+        backend="local", local_backend_latency=0.0, local_backend_jitter=0.0, plan_cache=False, image_cache=False, max_concurrency=2
+    )
+    return AgentConfig(**{**settings, **overrides})
+
+
+def test_tracker_enforces_calls_cost_and_deadline():
+    now = [0.0]
+    tracker = RunTracker(RunBudget(max_api_calls=3, max_cost=0.09, image_cost=0.04), clock=lambda: now[0])
+    assert [tracker.acquire("image") for _ in range(3)] == [None, None, "cost"]
+    assert tracker.acquire("plan") is None
+    assert tracker.acquire("plan") == "api_calls"
+    assert tracker.summary()["api_calls"] == 3
+
+    timed = RunTracker(RunBudget(deadline_seconds=10, reserve_seconds=1), clock=lambda: now[0])
+    timed.observe("image", 4.0)
+    now[0] = 4.0
+    assert timed.acquire("image") is None
+    now[0] = 5.5  # 5.5 + 4 (typical request) would end past 9
+    assert timed.acquire("image") == "deadline"
+    assert timed.remaining() == 3.5
+
+
+def test_deadline_writes_markdown_on_time_with_placeholders(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    post = _post(tmp_path)
+    config = _config(local_backend_image_latency=5.0, run_deadline_seconds=1.0, run_reserve_seconds=0.3)
+
+    started = time.monotonic()
+    result = process_blog(str(post), str(tmp_path / "assets"), config, 3)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert [d["reason"] for d in result.degraded] == ["deadline"] * 3
+    assert all(p.name.endswith("-degraded.png") and p.exists() for p in result.image_paths)
+    markdown = result.output_markdown_path.read_text(encoding="utf-8")
+    assert all(f"assets/{p.name}" in markdown for p in result.image_paths)
+    assert result.run_budget is not None and result.run_budget["api_calls"] == 3  # plan + two started images
+
+
+def test_call_budget_degrades_later_placements_in_planner_order(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    post = _post(tmp_path)
+    config = _config(local_backend_image_latency=0.0, run_max_api_calls=2, max_concurrency=1, incremental=True)
+
+    result = process_blog(str(post), str(tmp_path / "assets"), config, 3)
+
+    # One call plans, one generates the first placement; the rest become placeholders.
+    assert [d["stage"] for d in result.degraded] == ["image", "image"]
+    anchors = [a.anchor_id for a in extract_anchors(post.read_text(encoding="utf-8"))]
+    degraded_at = [anchors.index(d["anchor_id"]) for d in result.degraded]
+    assert degraded_at == sorted(degraded_at)
+    assert not result.image_paths[0].name.endswith("-degraded.png")
+
+    # An incremental rerun keeps the plan and the real image but regenerates the placeholders.
+    again = process_blog(str(post), str(tmp_path / "assets"), _config(local_backend_image_latency=0.0, incremental=True), 3)
+    assert again.reused_placements == 1
+    assert not again.degraded
+    assert not any(p.name.endswith("-degraded.png") for p in again.image_paths)
+
+
+def test_cli_exits_by_the_deadline(tmp_path: Path):
+    # In-flight image requests carry the time left as their timeout, so no worker thread
+    # outlives the deadline and keeps the process alive.
+    post = _post(tmp_path)
+    env = {**os.environ, "LOCAL_BACKEND_LATENCY": "0", "LOCAL_BACKEND_IMAGE_LATENCY": "8", "PLAN_CACHE": "false"}
+    env.pop("DRY_RUN", None)
+    args = ["--input", str(post), "--backend", "local", "--deadline", "2", "--max-images", "3"]
+
+    started = time.monotonic()
+    subprocess.run([sys.executable, "-m", "blog_image_agent.cli", "process", *args], env=env, check=True, capture_output=True)
+
+    assert time.monotonic() - started < 5.0
+    assert post.with_name("post.illustrated.md").exists()
+
+
+def _long_anchors(sections: int = 6):
+    lines = ["# Title", ""]
+    for s in range(sections):
+        lines += [f"## Section {s}", "", f"Paragraph {s} " * 40, ""]
+    return extract_anchors("\n".join(lines))
+
+
+def test_each_chunk_and_retry_of_the_plan_is_charged(monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    anchors = _long_anchors()
+    backend = LocalBackend(latency=0.0, jitter=0.0)
+    tracker = RunTracker(RunBudget(max_api_calls=2))
+
+    placements = plan_placements("m", anchors, "Title", 3, backend=backend, chunk_anchors=4, budget=tracker)
+
+    assert backend.calls["plan"] == 2
+    assert placements
+    assert tracker.api_calls == 2
+    assert {d["reason"] for d in tracker.degraded} == {"api_calls"}
+
+    failing = LocalBackend(latency=0.0, jitter=0.0, failure_rate=1.0, retry_after=None)
+    scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=5, base_delay=0.001, max_delay=0.001)
+    tracker = RunTracker(RunBudget(max_api_calls=3))
+
+    plan_placements("m", anchors, "Title", 2, backend=failing, scheduler=scheduler, budget=tracker)
+
+    assert failing.calls["plan"] == 3
+    assert tracker.degraded == [{"stage": "plan", "reason": "api_calls"}]
@@ -0,0 +1,75 @@
+import time
+from pathlib import Path
+
+import pytest
+from openai import OpenAI, RateLimitError
+
+from blog_image_agent.backends import OpenAIBackend
+from blog_image_agent.budget import BudgetExceeded
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator
+from blog_image_agent.scheduler import RequestScheduler, TokenBucket
+
+from fake_openai import FakeOpenAIServer
+
+
+def _client(server: FakeOpenAIServer) -> OpenAI:
+    return OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+
+
+def test_retries_429_until_success():
+    with FakeOpenAIServer(fail_first=3, retry_after=0.05) as server:
+        client = _client(server)
+        scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=5, base_delay=0.01, max_delay=0.02)
+
+        resp = scheduler.call(lambda: client.images.generate(model="m", prompt="p", size="16x16"), images=1)
+
+    assert resp.data[0].b64_json
+    assert scheduler.retries == 3
+    assert scheduler.rate_limited == 3
+    assert server.requests["/v1/images/generations"] == 4
+
+
+def test_gives_up_after_max_retries():
+    with FakeOpenAIServer(fail_first=10, retry_after=None) as server:
+        client = _client(server)
+        scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=2, base_delay=0.01, max_delay=0.01)
+        with pytest.raises(RateLimitError):
+            scheduler.call(lambda: client.images.generate(model="m", prompt="p", size="16x16"))
+    assert server.requests["/v1/images/generations"] == 3
+
+
+def test_no_retry_past_deadline():
+    with FakeOpenAIServer(fail_first=10, retry_after=5.0) as server:
+        client = _client(server)
+        scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=5, base_delay=0.01, max_delay=0.01)
+        with pytest.raises(BudgetExceeded) as info:
+            scheduler.call(lambda: client.images.generate(model="m", prompt="p", size="16x16"), deadline=time.monotonic() + 1.0)
+    assert isinstance(info.value.__cause__, RateLimitError)
+    assert server.requests["/v1/images/generations"] == 1
+
+
+def test_generator_survives_rate_limits_without_placeholders(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    with FakeOpenAIServer(fail_first=4, retry_after=0.02) as server:
+        scheduler = RequestScheduler(requests_per_minute=0, images_per_minute=0, max_retries=6, base_delay=0.01, max_delay=0.05)
+        gen = ImageGenerator(
+            ImageGenConfig(image_model="m", default_width=32, default_height=18, compress_webp=False, webp_quality=80),
+            assets_dir=str(tmp_path),
+            scheduler=scheduler,
+            backend=OpenAIBackend(client=_client(server)),
+        )
+        for i in range(3):
+            gen.render(prompt=f"prompt {i}", aspect_ratio="16:9", alt_text="")
+
+    sources = {entry["source"] for entry in gen.manifest._entries.values()}
+    assert sources == {"api"}
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=lambda: now[0])
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(1.0)
+    now[0] += 1.0
+    assert bucket.try_acquire() == 0
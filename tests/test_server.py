@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from blog_image_agent.cli import app
+from blog_image_agent.config import AgentConfig
+from blog_image_agent.server import JobQueue, is_loopback, make_server
+
+
+def _request(url: str, payload: dict | None = None, token: str | None = None) -> tuple[int, dict]:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_serve_processes_submitted_job(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("DRY_RUN", "1")
+    post = tmp_path / "post.md"
+    post.write_text(Path(__file__).parents[1].joinpath("samples", "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+
+    queue = JobQueue(AgentConfig(image_cache=False, plan_cache=False), workers=1, max_queue=1)
+    server = make_server(queue, port=0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        status, job = _request(f"{base}/jobs", {"input": str(post), "assets_dir": str(tmp_path / "assets"), "max_images": 2})
+        assert status == 202
+
+        deadline = time.monotonic() + 30
+        while job["status"] in {"queued", "running"} and time.monotonic() < deadline:
+            time.sleep(0.05)
+            _, job = _request(f"{base}/jobs/{job['id']}")
+        assert job["status"] == "done", job["error"]
+        assert len(job["images"]) == 2
+        assert Path(job["output"]).exists()
+
+        assert _request(f"{base}/jobs", {})[0] == 400
+        assert _request(f"{base}/jobs/missing")[0] == 404
+        assert _request(f"{base}/healthz")[1]["jobs"]["done"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        queue.shutdown()
+
+
+def test_token_is_required_for_jobs_but_not_healthz(tmp_path: Path):
+    queue = JobQueue(AgentConfig(image_cache=False, plan_cache=False), workers=1, max_queue=1)
+    server = make_server(queue, port=0, token="s3cret")
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert _request(f"{base}/healthz")[0] == 200
+        assert _request(f"{base}/jobs")[0] == 401
+        assert _request(f"{base}/jobs", token="wrong")[0] == 401
+        assert _request(f"{base}/jobs", {"input": str(tmp_path / "post.md")})[0] == 401
+        assert queue.stats()["queued"] == 0
+        assert _request(f"{base}/jobs", token="s3cret") == (200, {"jobs": []})
+    finally:
+        server.shutdown()
+        server.server_close()
+        queue.shutdown()
+
+
+def test_serve_refuses_remote_host_without_token_or_opt_in(monkeypatch):
+    monkeypatch.delenv("SERVE_TOKEN", raising=False)
+    assert is_loopback("127.0.0.1") and is_loopback("::1") and is_loopback("localhost")
+    assert not is_loopback("0.0.0.0") and not is_loopback("example.com")
+
+    result = CliRunner().invoke(app, ["serve", "--host", "0.0.0.0"])
+    assert result.exit_code == 2
+    assert "--allow-remote" in result.output
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from openai import OpenAI
+from PIL import Image
+
+from blog_image_agent.backends import OpenAIBackend
+from blog_image_agent.image_gen import ImageGenConfig, ImageGenerator
+from blog_image_agent.metrics import Metrics
+from blog_image_agent.sizes import fit_image, nearest_size, supported_sizes
+
+from fake_openai import FakeOpenAIServer
+
+
+def test_nearest_size_prefers_aspect_then_coverage():
+    gpt = supported_sizes("gpt-image-1")
+    assert supported_sizes("gpt-image-1-mini") == gpt
+    assert nearest_size(1280, 720, gpt) == (1536, 1024)
+    assert nearest_size(720, 1280, gpt) == (1024, 1536)
+    assert nearest_size(1024, 1024, gpt) == (1024, 1024)
+    assert nearest_size(1280, 720, supported_sizes("dall-e-3")) == (1792, 1024)
+    assert nearest_size(300, 300, supported_sizes("dall-e-2")) == (512, 512)
+    assert nearest_size(1280, 720, supported_sizes("some-new-model")) == (1280, 720)
+
+
+def test_fit_image_crops_to_exact_target():
+    fitted = fit_image(Image.new("RGB", (1536, 1024)), 1280, 720)
+    assert fitted.size == (1280, 720)
+
+
+def test_unsupported_target_sizes_cost_no_failed_calls(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    config = ImageGenConfig(
+        image_model="gpt-image-1", default_width=1280, default_height=720, compress_webp=False, webp_quality=80
+    )
+    metrics = Metrics()
+    with FakeOpenAIServer() as server:
+        backend = OpenAIBackend(client=OpenAI(base_url=server.base_url, api_key="test", max_retries=0))
+        gen = ImageGenerator(config, str(tmp_path / "assets"), backend=backend)
+        images = [gen.render(f"prompt {ratio}", ratio, "", metrics=metrics) for ratio in ("16:9", "4:3", "1:1")]
+
+    assert server.requests["/v1/images/generations"] == 3
+    assert server.invalid_sizes == 0
+    assert metrics.to_dict()["counters"].get("images.fallback_placeholder", 0) == 0
+    for image in images:
+        with Image.open(image.path) as saved:
+            assert saved.size == (image.width, image.height)
+    assert [(i.width, i.height) for i in images] == [(1280, 720), (1280, 960), (1280, 1280)]
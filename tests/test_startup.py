@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Cumulative import time of blog_image_agent.cli, in milliseconds. Lazy imports keep it well
+# under 100ms on a laptop; the budget leaves headroom for slow CI machines.
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "400"))
+HEAVY_MODULES = ("openai", "PIL", "markdown_it", "pydantic", "yaml", "rich")
+ROOT = Path(__file__).parents[1]
+
+
+def _run(code: str, *args: str, env: dict | None = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _cli_import_ms() -> float:
+    stderr = _run("import blog_image_agent.cli", "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        if line.rstrip().endswith("| blog_image_agent.cli"):
+            return int(line.split("|")[1]) / 1000
+    raise AssertionError(f"blog_image_agent.cli missing from importtime output:\n{stderr[-2000:]}")
+
+
+def test_cli_cold_import_within_budget():
+    best = min(_cli_import_ms() for _ in range(3))
+    assert best < IMPORT_BUDGET_MS, f"importing blog_image_agent.cli took {best:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)"
+
+
+def test_cli_import_defers_heavy_modules():
+    out = _run(f"import sys, blog_image_agent.cli; print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))").stdout
+    assert out.strip() == "[]"
+
+
+def test_dry_run_never_imports_openai(tmp_path: Path):
+    code = (
+        "import sys\n"
+        "from blog_image_agent.config import AgentConfig\n"
+        "from blog_image_agent.pipeline import process_blog\n"
+        f"process_blog({str(tmp_path / 'post.md')!r}, {str(tmp_path / 'assets')!r}, AgentConfig(plan_cache=False), 1)\n"
+        "print('openai' in sys.modules)\n"
+    )
+    (tmp_path / "post.md").write_text((ROOT / "samples" / "sample.md").read_text(encoding="utf-8"), encoding="utf-8")
+    assert _run(code, env={"DRY_RUN": "1"}).stdout.strip() == "False"